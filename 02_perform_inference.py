@@ -1,19 +1,40 @@
+import argparse
+import cProfile
 import logging
 
 from config.reader import read_json_config, validate_config
-from logger import logger
+from etl.cache import ColumnCache
+from etl.converters import create_converters
+from etl.loader import TimestepLoader
+from logger import instrumentation, logger
+from model.adaptation import create_adaptation
+from model.chains import ChainSummary, create_chain_configs, run_chains
+from model.checkpoint import checkpoint_exists, load_checkpoint, save_checkpoint
+from model.inference import InferenceEngine, create_particle_filter, create_propagator
+from model.pmmh import create_pmmh
+from model.smoother import FixedLagSmoother
+from model.streaming import StreamingInference
+from model.sweep import create_grid, precompute, sweep
 
 # Initialise the module logger
 logger.initialise_logger("perform-inference", log_level=logging.INFO)
 module_logger = logging.getLogger('perform-inference')
 
+# Format of the input CSV files
+DELIMITER = ","
+ENCAPSULATOR = "\""
+ENCODING = "utf-8"
 
-def run_inference(config_path):
+# Number of timesteps of history retained when streaming (unless resuming from a checkpoint)
+DEFAULT_WINDOW = 12
+
+
+def read_config(config_path):
     """
-    Perform inference.
+    Read and validate the config.
 
     :param config_path: Location of the JSON config path.
-    :return:
+    :return: Config.
     """
 
     # Preconditions
@@ -24,16 +45,315 @@ def run_inference(config_path):
     config = read_json_config(config_path)
 
     # Check the config is valid
-    validates = validate_config(config)
+    validates = config is not None and validate_config(config)
     if not validates:
         module_logger.error("Config is invalid")
         exit(-1)
 
+    # Configure the logging of every module from the config
+    logger.configure_logging_from_config(config.logging)
+
+    return config
+
+
+def create_loader(config):
+    """
+    Create the loader of the input files for each timestep.
+
+    :param config: Config.
+    :return: TimestepLoader.
+    """
+
+    # Cache of the parsed input files
+    cache = None
+    if config.cache is not None:
+        cache = ColumnCache(config.cache['directory'], config.cache.get('validation', 'mtime'))
+
+    return TimestepLoader(config.paths['individuals'], config.paths['infections'],
+                          DELIMITER, ENCAPSULATOR, ENCODING, cache=cache,
+                          max_workers=config.loading.get('max_workers'))
+
+
+def create_engine(config, resume, window=None, default_window=None):
+    """
+    Create the inference engine, restoring it from the latest checkpoint if resuming.
+
+    The window of a resumed engine is taken from the checkpoint, so a window that conflicts with it is an error.
+
+    :param config: Config.
+    :param resume: If True, resume from the latest checkpoint (if there is one).
+    :param window: Number of timesteps of infection history and estimates retained (None for the default window).
+    :param default_window: Window of an engine that isn't resumed if no window is given (None to retain every
+        timestep).
+    :return: InferenceEngine.
+    """
+
+    converters = create_converters(config.individuals)
+
+    checkpoint_config = config.checkpoint
+    if resume:
+        if checkpoint_config is None:
+            module_logger.error("Unable to resume as the config has no checkpoint directory")
+            exit(-1)
+
+        if checkpoint_exists(checkpoint_config['directory']):
+            engine = load_checkpoint(checkpoint_config['directory'], converters,
+                                     propagator=create_propagator(config.inference))
+
+            checkpoint_window = engine.infection_history.window
+            if window is not None and window != checkpoint_window:
+                module_logger.error("Unable to resume with a window of %d timesteps as the checkpoint has a window of "
+                                    "%s timesteps" % (window, checkpoint_window))
+                engine.particle_filter.close()
+                exit(-1)
+
+            # The adaptation of the number of particles and the smoother are taken from the config rather than the
+            # checkpoint (the smoother starts afresh from the checkpoint's timestep)
+            engine.particle_filter.adaptation = create_adaptation(config.inference.get('adaptation'))
+            if config.inference.get('smoothing_lag') is not None:
+                engine.smoother = FixedLagSmoother(config.inference['smoothing_lag'])
+            return engine
+
+        module_logger.info("No checkpoint found, starting from the first timestep")
+
+    return InferenceEngine(create_particle_filter(config.inference), converters=converters,
+                           window=default_window if window is None else window, smoothing_lag=config.inference.get('smoothing_lag'))
+
+
+def run_inference(config_path, resume=False):
+    """
+    Perform inference.
+
+    :param config_path: Location of the JSON config path.
+    :param resume: If True, resume from the latest checkpoint.
+    :return: List of (timestep, per-individual infection probability, dict of parameter means) tuples.
+    """
+
+    config = read_config(config_path)
+    loader = create_loader(config)
+    engine = create_engine(config, resume)
+
+    # Timesteps still to be processed
+    timesteps = [timestep for timestep in loader.timesteps
+                 if engine.last_timestep is None or timestep > engine.last_timestep]
+
+    # Process each timestep in order, saving a checkpoint at the configured interval
+    checkpoint_config = config.checkpoint
+    try:
+        for index, data in enumerate(instrumentation.timed_iter('load', loader.load(timesteps))):
+            engine.process(data)
+
+            if checkpoint_config is not None and \
+                    ((index + 1) % checkpoint_config.get('interval', 1) == 0 or index == len(timesteps) - 1):
+                save_checkpoint(checkpoint_config['directory'], engine)
+
+        engine.flush_smoothed()
+    finally:
+        engine.particle_filter.close()
+
+    return list(engine.estimates)
+
+
+def run_chain_inference(config_path, num_chains, num_particles=None, max_workers=None):
+    """
+    Perform inference with independent chains of the particle filter (each with its own seed) to judge the variance
+    of the estimates. The input files are parsed once and shared by the chains.
+
+    :param config_path: Location of the JSON config path.
+    :param num_chains: Number of chains.
+    :param num_particles: Optional number of particles of each chain (defaults to the number in the config).
+    :param max_workers: Maximum number of processes running the chains (defaults to the number of CPUs).
+    :return: ChainSummary.
+    """
+
+    config = read_config(config_path)
+    data = list(create_loader(config).load())
+
+    chain_configs = create_chain_configs(config.inference.to_dict(), num_chains, num_particles)
+    results = run_chains(data, chain_configs, converters=create_converters(config.individuals),
+                         max_workers=max_workers)
+
+    summary = ChainSummary(results)
+    module_logger.info("Summary of the chains: %s" % str(summary))
+
+    return summary
+
+
+def run_sweep(config_path, output_path=None):
+    """
+    Estimate the log marginal likelihood at each point of the grid of parameter values in the sweep section of the
+    config. The input files are parsed and applied once for every point.
+
+    :param config_path: Location of the JSON config path.
+    :param output_path: Optional location of a CSV file in which to save the likelihood surface.
+    :return: LikelihoodSurface.
+    """
+
+    config = read_config(config_path)
+    sweep_config = config.sweep
+    if sweep_config is None:
+        module_logger.error("Unable to sweep as the config has no sweep section")
+        exit(-1)
+
+    timesteps = precompute(create_loader(config).load(), create_converters(config.individuals))
+
+    propagator = create_propagator(config.inference)
+    try:
+        surface = sweep(timesteps, create_grid(sweep_config), sweep_config.get('particles_per_point', 100),
+                        sweep_config.get('batch_size', 16), config.inference, propagator=propagator)
+    finally:
+        if propagator is not None:
+            propagator.close()
+
+    point, log_marginal_likelihood = surface.best()
+    module_logger.info("Highest log marginal likelihood = %.1f at %s" % (log_marginal_likelihood, str(point)))
+
+    if output_path is not None:
+        with open(output_path, 'w') as fp:
+            fp.write("transmission_rate,recovery_probability,log_marginal_likelihood\n")
+            for row in surface.rows():
+                fp.write("%r,%r,%r\n" % row)
+
+    return surface
+
+
+def run_pmmh(config_path, output_path=None):
+    """
+    Sample the posterior of the transmission parameters with particle marginal Metropolis-Hastings, configured by the
+    pmmh section of the config. The input files are parsed and applied once for every iteration.
+
+    :param config_path: Location of the JSON config path.
+    :param output_path: Optional location of a CSV file in which to save the samples (after the burn-in).
+    :return: PMMHResult.
+    """
+
+    config = read_config(config_path)
+    pmmh_config = config.pmmh
+    if pmmh_config is None:
+        module_logger.error("Unable to sample the parameters as the config has no pmmh section")
+        exit(-1)
+
+    timesteps = precompute(create_loader(config).load(), create_converters(config.individuals))
+
+    propagator = create_propagator(config.inference)
+    try:
+        result = create_pmmh(timesteps, pmmh_config, config.inference, propagator=propagator) \
+            .run(pmmh_config.get('iterations', 1000))
+    finally:
+        if propagator is not None:
+            propagator.close()
+
+    burn_in = min(pmmh_config.get('burn_in', 0), result.samples.shape[0] - 1)
+    module_logger.info("Acceptance rate = %.2f, posterior means = %s" %
+                       (result.acceptance_rate, str(result.posterior_means(burn_in))))
+
+    if output_path is not None:
+        with open(output_path, 'w') as fp:
+            fp.write("iteration,transmission_rate,recovery_probability,log_likelihood\n")
+            for iteration in range(burn_in, result.samples.shape[0]):
+                fp.write("%d,%r,%r,%r\n" % ((iteration,) + tuple(result.samples[iteration].tolist()) +
+                                            (float(result.log_likelihoods[iteration]),)))
+
+    return result
+
+
+def run_streaming_inference(config_path, poll_seconds, settle_seconds, window=None, resume=False, max_polls=None):
+    """
+    Perform streaming inference, advancing the particle filter as the files of new timesteps arrive.
+
+    :param config_path: Location of the JSON config path.
+    :param poll_seconds: Number of seconds between checks for new files.
+    :param settle_seconds: Number of seconds since the files of a timestep were last modified before it is processed.
+    :param window: Number of timesteps of infection history and estimates retained (defaults to DEFAULT_WINDOW, or
+        the window of the checkpoint when resuming).
+    :param resume: If True, resume from the latest checkpoint.
+    :param max_polls: Maximum number of checks for new files (None to run indefinitely).
+    :return: StreamingInference.
+    """
+
+    config = read_config(config_path)
+    engine = create_engine(config, resume, window, default_window=DEFAULT_WINDOW)
+    streaming = StreamingInference(create_loader(config), engine, settle_seconds=settle_seconds)
+
+    # Save a checkpoint whenever new timesteps have been processed, so that the state is kept between runs
+    on_advance = None
+    checkpoint_config = config.checkpoint
+    if checkpoint_config is not None:
+        def on_advance(timesteps):
+            save_checkpoint(checkpoint_config['directory'], engine)
+
+    try:
+        streaming.watch(poll_seconds, max_polls=max_polls, on_advance=on_advance)
+    finally:
+        engine.particle_filter.close()
+
+    return streaming
+
 
 if __name__ == '__main__':
 
-    # Location of the config
-    config_path = "./data/simple/config.json"
+    # Configure the logging of every module once
+    logger.configure_logging()
+
+    parser = argparse.ArgumentParser(description="Perform inference")
+    parser.add_argument('config_path', nargs='?', default="./data/simple/config.json",
+                        help="Location of the JSON config")
+    parser.add_argument('--stream', action='store_true',
+                        help="Watch the input folders and process new timesteps as they arrive")
+    parser.add_argument('--poll-seconds', type=float, default=60.0,
+                        help="Number of seconds between checks for new timesteps when streaming")
+    parser.add_argument('--settle-seconds', type=float, default=10.0,
+                        help="Number of seconds since the files of a timestep were last modified before it is "
+                             "processed when streaming (so that files still being written aren't read)")
+    parser.add_argument('--window', type=int,
+                        help="Number of timesteps of history retained when streaming (defaults to %d, or the window "
+                             "of the checkpoint when resuming)" % DEFAULT_WINDOW)
+    parser.add_argument('--resume', action='store_true',
+                        help="Resume from the latest checkpoint in the configured checkpoint directory")
+    parser.add_argument('--chains', type=int,
+                        help="Number of independent chains of the particle filter to run (each with its own seed)")
+    parser.add_argument('--chain-particles', type=int,
+                        help="Number of particles of each chain (defaults to the number in the config)")
+    parser.add_argument('--chain-workers', type=int,
+                        help="Maximum number of processes running the chains (defaults to the number of CPUs)")
+    parser.add_argument('--sweep', action='store_true',
+                        help="Estimate the likelihood at each point of the grid of parameters in the sweep config")
+    parser.add_argument('--sweep-output', help="Location of a CSV file in which to save the likelihood surface")
+    parser.add_argument('--pmmh', action='store_true',
+                        help="Sample the posterior of the parameters with particle marginal Metropolis-Hastings")
+    parser.add_argument('--pmmh-output', help="Location of a CSV file in which to save the PMMH samples")
+    parser.add_argument('--metrics', help="Location of a JSON lines file in which to record the time spent in each "
+                                          "stage, the counters and the peak memory of each timestep")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Trace the memory allocated by Python in the metrics (slows the inference)")
+    parser.add_argument('--profile', help="Location of a file in which to save the cProfile statistics of the run")
+    args = parser.parse_args()
+
+    if args.metrics is not None:
+        instrumentation.start_metrics(args.metrics, trace_memory=args.trace_memory)
+
+    profiler = None
+    if args.profile is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
 
     # Run the inference engine
-    run_inference(config_path)
+    try:
+        if args.stream:
+            run_streaming_inference(args.config_path, args.poll_seconds, args.settle_seconds, window=args.window,
+                                    resume=args.resume)
+        elif args.pmmh:
+            run_pmmh(args.config_path, args.pmmh_output)
+        elif args.sweep:
+            run_sweep(args.config_path, args.sweep_output)
+        elif args.chains is not None:
+            run_chain_inference(args.config_path, args.chains, args.chain_particles, args.chain_workers)
+        else:
+            run_inference(args.config_path, resume=args.resume)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            module_logger.info("Saved the profile to: %s (view with python -m pstats)" % args.profile)
+
+        instrumentation.stop_metrics()
@@ -0,0 +1,116 @@
+# Benchmark of reading an individuals CSV file with the row-dict path of DelimitedSource.read (with the per-row key
+# checks made by the callers) against the columnar path of DelimitedSource.read_columns, and of loading the file into
+# Individuals a row at a time against Individuals.update_from_file.
+#
+# Run from the root of the project with: python -m benchmarks.benchmark_csv_reader
+
+import os
+import tempfile
+import timeit
+
+from etl.csv_reader import DelimitedSource
+from model.individuals import Individuals
+
+# Numbers of rows to benchmark
+NUM_ROWS = [10 ** 4, 10 ** 5, 10 ** 6]
+
+# Number of repeats of each measurement (the fastest is reported)
+REPEATS = 3
+
+# Fields of the individuals file
+FIELD_NAMES = ['id', 'name', 'dob', 'dod', 'location']
+
+
+def write_individuals(filepath, num_rows):
+    """
+    Write a synthetic individuals CSV file.
+
+    :param filepath: Location of the file.
+    :param num_rows: Number of individuals.
+    """
+
+    with open(filepath, 'w', encoding='utf-8') as fp:
+        fp.write(",".join(FIELD_NAMES) + "\n")
+        for i in range(num_rows):
+            fp.write("%07d,Person %d,01/03/1970,None,location-%d\n" % (i, i, i % 100))
+
+
+def read_rows(reader):
+    """
+    Read the file a row at a time, checking the fields of each row as the model's callers do.
+
+    :param reader: DelimitedSource.
+    :return: Number of rows.
+    """
+
+    num_rows = 0
+    for line in reader.read():
+        for name in FIELD_NAMES:
+            assert name in line.keys()
+        num_rows += 1
+
+    return num_rows
+
+
+def read_columns(reader):
+    """
+    Read the file as columns, checking the fields of the header once.
+
+    :param reader: DelimitedSource.
+    :return: Number of rows.
+    """
+
+    columns = reader.read_columns(required_fields=FIELD_NAMES)
+    return len(columns['id'])
+
+
+def load_rows(filepath):
+    """
+    Load the individuals a row at a time.
+
+    :param filepath: Location of the file.
+    """
+
+    individuals = Individuals()
+    for line in DelimitedSource(filepath, ",", "\"", "utf-8").read():
+        individuals.update_individual(line)
+
+
+def load_columns(filepath):
+    """
+    Load the individuals as columns.
+
+    :param filepath: Location of the file.
+    """
+
+    Individuals().update_from_file(0, filepath, ",", "\"", "utf-8")
+
+
+def run_benchmark():
+    """
+    Run the benchmark and print a table of the run times.
+    """
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for num_rows in NUM_ROWS:
+            filepath = os.path.join(folder, "individuals_%d.csv" % num_rows)
+            write_individuals(filepath, num_rows)
+            reader = DelimitedSource(filepath, ",", "\"", "utf-8")
+
+            results.append((num_rows,
+                            min(timeit.repeat(lambda: read_rows(reader), number=1, repeat=REPEATS)),
+                            min(timeit.repeat(lambda: read_columns(reader), number=1, repeat=REPEATS)),
+                            min(timeit.repeat(lambda: load_rows(filepath), number=1, repeat=REPEATS)),
+                            min(timeit.repeat(lambda: load_columns(filepath), number=1, repeat=REPEATS))))
+
+    print("%10s %12s %12s %9s %12s %12s %9s" % ("Rows", "read", "read_columns", "Speed-up",
+                                                 "Load rows", "Load columns", "Speed-up"))
+    for num_rows, row_time, column_time, load_row_time, load_column_time in results:
+        print("%10d %11.3fs %11.3fs %8.1fx %11.3fs %11.3fs %8.1fx" %
+              (num_rows, row_time, column_time, row_time / column_time,
+               load_row_time, load_column_time, load_row_time / load_column_time))
+
+
+if __name__ == '__main__':
+    run_benchmark()
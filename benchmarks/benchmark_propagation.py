@@ -0,0 +1,60 @@
+# Benchmark of the propagation of the particles of model.particle_filter in the main process and sharded across
+# pools of worker processes (model.parallel.ParallelPropagator).
+#
+# Run from the root of the project with: python -m benchmarks.benchmark_propagation
+
+import os
+import timeit
+
+import numpy as np
+
+from model.parallel import ParallelPropagator
+from model.particle_filter import ParticleFilter, propagate_blocks
+from model.subpopulations import SubpopulationIndex
+
+# Number of particles and individuals
+NUM_PARTICLES = 10 ** 5
+NUM_INDIVIDUALS = 100
+
+# Number of locations the individuals are spread across
+NUM_LOCATIONS = 10
+
+# Numbers of worker processes to benchmark
+NUM_WORKERS = [2, 4, 8, 16]
+
+# Number of repeats of each measurement (the fastest is reported)
+REPEATS = 3
+
+
+def run_benchmark():
+    """
+    Run the benchmark and print a table of the run times.
+    """
+
+    rng = np.random.default_rng(0)
+    states = rng.random((NUM_PARTICLES, NUM_INDIVIDUALS)) < 0.1
+    parameters = rng.random((NUM_PARTICLES, 2))
+    subpopulations = SubpopulationIndex(rng.integers(-1, NUM_LOCATIONS, NUM_INDIVIDUALS))
+
+    num_blocks = -(-NUM_PARTICLES // ParticleFilter.PARTICLE_BLOCK_SIZE)
+    block_seeds = np.random.SeedSequence(0).spawn(num_blocks)
+
+    print("%d particles, %d individuals, %d CPUs" % (NUM_PARTICLES, NUM_INDIVIDUALS, os.cpu_count()))
+    print("%10s %12s %10s" % ("workers", "time", "speed-up"))
+
+    serial = min(timeit.repeat(lambda: propagate_blocks(np.array(states), parameters, subpopulations, block_seeds),
+                               number=1, repeat=REPEATS))
+    print("%10s %11.4fs %10.2f" % ("main", serial, 1.0))
+
+    for num_workers in NUM_WORKERS:
+        with ParallelPropagator(num_workers) as propagator:
+            # Start the workers and attach them to the shared memory before timing
+            propagator.propagate(states, parameters, subpopulations, block_seeds)
+
+            parallel = min(timeit.repeat(lambda: propagator.propagate(states, parameters, subpopulations, block_seeds),
+                                         number=1, repeat=REPEATS))
+        print("%10d %11.4fs %10.2f" % (num_workers, parallel, serial / parallel))
+
+
+if __name__ == '__main__':
+    run_benchmark()
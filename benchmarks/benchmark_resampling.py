@@ -0,0 +1,53 @@
+# Benchmark of the resampling schemes in model.resampling against the nested-loop multinomial resampler in
+# particle_filtering_examples.bayesian_ninja.
+#
+# Run from the root of the project with: python -m benchmarks.benchmark_resampling
+
+import timeit
+
+import numpy as np
+
+from model.resampling import SCHEMES
+from particle_filtering_examples import bayesian_ninja
+
+# Numbers of particles to benchmark
+NUM_PARTICLES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+
+# Number of repeats of each measurement (the fastest is reported)
+REPEATS = 3
+
+
+def time_function(function):
+    """
+    Time a function.
+
+    :param function: Function taking no arguments.
+    :return: Fastest run time in seconds.
+    """
+
+    return min(timeit.repeat(function, number=1, repeat=REPEATS))
+
+
+def run_benchmark():
+    """
+    Run the benchmark and print a table of the run times.
+    """
+
+    rng = np.random.default_rng(0)
+
+    print("%10s %18s" % ("N", "bayesian_ninja") + "".join("%14s" % name for name in SCHEMES.keys()))
+
+    for n in NUM_PARTICLES:
+        weights = rng.random(n)
+        weights /= np.sum(weights)
+        x = rng.random(n)
+
+        row = "%10d %17.4fs" % (n, time_function(lambda: bayesian_ninja.resample(x, weights)))
+        for scheme in SCHEMES.values():
+            row += "%13.4fs" % time_function(lambda: x[scheme(weights, rng)])
+
+        print(row)
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,301 @@
+# Benchmark suite of the ingestion of the input files, the inference steps and the resampling, run against a
+# synthetic data set (see synthetic.generator). Each benchmark records its fastest run time, its throughput and the
+# peak memory allocated (traced with tracemalloc in a separate run, so the tracing doesn't affect the timings).
+#
+# The results can be saved as JSON and compared against the results of an earlier run, so that regressions are
+# visible:
+#
+#   python -m benchmarks.suite --size small --output baseline.json
+#   python -m benchmarks.suite --size small --baseline baseline.json
+#
+# The size of the data set (--size) and the number of particles (--particle-size) are chosen separately. The number
+# of particles is capped so that the particle matrices fit within a memory budget for the number of individuals.
+#
+# Run from the root of the project.
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from etl.converters import create_converters
+from etl.csv_reader import DelimitedSource
+from etl.loader import TimestepLoader
+from model.individuals import Individuals
+from model.inference import InferenceEngine, create_particle_filter
+from model.infections import Infections
+from model.parallel import ParallelPropagator
+from model.particle_filter import ParticleFilter
+from model.resampling import SCHEMES
+from model.subpopulations import SubpopulationIndex
+from synthetic.generator import DatasetSpec, generate_dataset
+
+# Sizes of the data set (individuals, timesteps)
+SIZES = {
+    'small': (10 ** 3, 10),
+    'medium': (10 ** 5, 50),
+    'large': (10 ** 6, 200)
+}
+
+# Numbers of particles
+PARTICLE_SIZES = {
+    'small': 10 ** 2,
+    'medium': 10 ** 3,
+    'large': 10 ** 4
+}
+
+# Bytes of memory per particle per individual of the boolean state
+BYTES_PER_STATE = 1
+
+# Bytes of memory per individual of each particle in the block being converted to float64 (the particles are
+# processed in blocks of ParticleFilter.PARTICLE_BLOCK_SIZE, e.g. in the estimate of the infection probabilities)
+BYTES_PER_BLOCK_STATE = 8
+
+# Memory budget of the particle matrices in bytes
+MEMORY_BUDGET = 2 * 10 ** 9
+
+# Format of the generated CSV files
+DELIMITER = ","
+ENCAPSULATOR = "\""
+ENCODING = "utf-8"
+
+# Number of repeats of each measurement (the fastest is reported)
+REPEATS = 3
+
+# Fractional increase in the run time of a benchmark reported as a regression
+TOLERANCE = 0.2
+
+
+def max_particles(num_individuals, memory_budget=MEMORY_BUDGET):
+    """
+    Find the largest number of particles whose matrices fit within a memory budget.
+
+    :param num_individuals: Number of individuals.
+    :param memory_budget: Memory budget in bytes.
+    :return: Number of particles.
+    """
+
+    block_bytes = BYTES_PER_BLOCK_STATE * ParticleFilter.PARTICLE_BLOCK_SIZE
+    return max((memory_budget // max(num_individuals, 1) - block_bytes) // BYTES_PER_STATE, 1)
+
+
+def measure(function, setup=None, repeats=REPEATS, trace_memory=True):
+    """
+    Measure the run time and peak memory of a function.
+
+    :param function: Function taking the result of the setup function (or no arguments if there isn't one).
+    :param setup: Optional function run (untimed) before each run of the function.
+    :param repeats: Number of timed runs.
+    :param trace_memory: If True, run the function once more with tracemalloc to find its peak memory.
+    :return: Tuple of the fastest run time in seconds and the peak memory in bytes (None if not traced).
+    """
+
+    def run():
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        function() if setup is None else function(argument)
+        return time.perf_counter() - start
+
+    seconds = min(run() for _ in range(repeats))
+
+    peak_bytes = None
+    if trace_memory:
+        argument = setup() if setup is not None else None
+        tracemalloc.start()
+        function() if setup is None else function(argument)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return seconds, peak_bytes
+
+
+def run_suite(num_individuals, num_timesteps, num_particles, folder, repeats=REPEATS, trace_memory=True,
+              workers=(1,)):
+    """
+    Run the benchmarks.
+
+    :param num_individuals: Number of individuals in the data set.
+    :param num_timesteps: Number of timesteps in the data set.
+    :param num_particles: Number of particles.
+    :param folder: Folder in which to generate the data set.
+    :param repeats: Number of timed runs of each benchmark.
+    :param trace_memory: If True, find the peak memory of each benchmark.
+    :param workers: Numbers of worker processes with which the prediction step is measured (1 propagates the
+        particles in this process), to show how it scales.
+    :return: Dict of benchmark name -> dict of the results.
+    """
+
+    generate_dataset(folder, DatasetSpec(num_individuals, num_timesteps, seed=0))
+    individuals_file = os.path.join(folder, "individuals", "individual_0000.csv")
+    infections_file = os.path.join(folder, "infections", "infection_0000.csv")
+    converters = create_converters({"dob": {"type": "date"}, "dod": {"type": "date"}})
+
+    def reader(filepath):
+        return DelimitedSource(filepath, DELIMITER, ENCAPSULATOR, ENCODING)
+
+    # Benchmarks of (name, function, setup, number of items processed, unit of the items)
+    benchmarks = [
+        ("DelimitedSource.read", lambda: sum(1 for _ in reader(individuals_file).read()), None,
+         num_individuals, "rows"),
+        ("DelimitedSource.read_columns", lambda: reader(individuals_file).read_columns(), None,
+         num_individuals, "rows"),
+        ("Individuals.update_from_file",
+         lambda: Individuals().update_from_file(0, individuals_file, DELIMITER, ENCAPSULATOR, ENCODING, converters),
+         None, num_individuals, "rows"),
+        ("Infections.update_from_file",
+         lambda: Infections().update_from_file(0, infections_file, DELIMITER, ENCAPSULATOR, ENCODING), None,
+         num_individuals, "rows")
+    ]
+
+    # Inference over every timestep (the files are parsed before the run, so only the inference is measured)
+    loader = TimestepLoader(os.path.join(folder, "individuals"), os.path.join(folder, "infections"),
+                            DELIMITER, ENCAPSULATOR, ENCODING, max_workers=1)
+    data = list(loader.load())
+
+    def create_engine():
+        return InferenceEngine(create_particle_filter({'num_particles': num_particles, 'seed': 0}),
+                               converters=converters, window=2)
+
+    def run_inference(engine):
+        for timestep_data in data:
+            engine.process(timestep_data)
+
+    benchmarks.append(("InferenceEngine.process", run_inference, create_engine, num_timesteps, "timesteps"))
+
+    # Prediction step with each number of workers (the propagators are started before the runs)
+    locations = SubpopulationIndex(np.random.default_rng(0).integers(0, 100, num_individuals))
+    propagators = {num_workers: ParallelPropagator(num_workers) if num_workers > 1 else None
+                   for num_workers in workers}
+
+    def create_particle_filter_with(propagator):
+        particle_filter = ParticleFilter(num_particles, num_individuals, seed=0, propagator=propagator)
+        particle_filter.initialise(np.arange(num_individuals), np.arange(num_individuals) % 10 == 0)
+        return particle_filter
+
+    for num_workers, propagator in propagators.items():
+        benchmarks.append(("ParticleFilter.predict (%d workers)" % num_workers,
+                           lambda particle_filter: particle_filter.predict(locations),
+                           lambda propagator=propagator: create_particle_filter_with(propagator),
+                           num_particles, "particles"))
+
+    # Resampling of each scheme
+    weights = np.random.default_rng(0).random(num_particles)
+    weights /= np.sum(weights)
+    for name, scheme in SCHEMES.items():
+        benchmarks.append(("resampling.%s" % name, lambda scheme=scheme: scheme(weights, np.random.default_rng(0)),
+                           None, num_particles, "particles"))
+
+    results = {}
+    try:
+        for name, function, setup, num_items, unit in benchmarks:
+            seconds, peak_bytes = measure(function, setup, repeats, trace_memory)
+            results[name] = {
+                'seconds': seconds,
+                'throughput': num_items / seconds,
+                'unit': unit,
+                'peak_bytes': peak_bytes
+            }
+    finally:
+        for propagator in propagators.values():
+            if propagator is not None:
+                propagator.close()
+
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Find the benchmarks that are slower than the baseline (which must be of the same sizes).
+
+    :param results: Dict of benchmark name -> dict of results.
+    :param baseline: Dict of benchmark name -> dict of results of an earlier run.
+    :param tolerance: Fractional increase in the run time reported as a regression.
+    :return: List of (benchmark name, baseline seconds, seconds) tuples.
+    """
+
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result['seconds'] > baseline[name]['seconds'] * (1.0 + tolerance):
+            regressions.append((name, baseline[name]['seconds'], result['seconds']))
+
+    return regressions
+
+
+def print_results(results):
+    """
+    Print a table of the results.
+
+    :param results: Dict of benchmark name -> dict of results.
+    """
+
+    print("%-36s %12s %24s %14s" % ("Benchmark", "Time", "Throughput", "Peak memory"))
+    for name, result in results.items():
+        peak = "-" if result['peak_bytes'] is None else "%.1f MB" % (result['peak_bytes'] / 1e6)
+        print("%-36s %11.4fs %14.0f %-9s %14s" % (name, result['seconds'], result['throughput'],
+                                                  result['unit'] + "/s", peak))
+
+    # Maximum resident set size of the process (kilobytes on Linux)
+    print("Peak RSS of the process: %.1f MB" % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument('--size', choices=sorted(SIZES.keys()), default='small',
+                        help="Size of the data set")
+    parser.add_argument('--particle-size', choices=sorted(PARTICLE_SIZES.keys()),
+                        help="Number of particles (defaults to the size of the data set, capped by the memory budget)")
+    parser.add_argument('--individuals', type=int, help="Number of individuals (overrides the size)")
+    parser.add_argument('--timesteps', type=int, help="Number of timesteps (overrides the size)")
+    parser.add_argument('--particles', type=int, help="Number of particles (overrides the size)")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1],
+                        help="Numbers of worker processes with which the prediction step is measured")
+    parser.add_argument('--repeats', type=int, default=REPEATS, help="Number of timed runs of each benchmark")
+    parser.add_argument('--no-memory', action='store_true', help="Don't trace the peak memory of each benchmark")
+    parser.add_argument('--output', help="Location of a JSON file in which to save the results")
+    parser.add_argument('--baseline', help="Location of the JSON results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="Fractional increase in the run time reported as a regression")
+    args = parser.parse_args()
+
+    num_individuals, num_timesteps = SIZES[args.size]
+    num_individuals = args.individuals or num_individuals
+    num_particles = args.particles or min(PARTICLE_SIZES[args.particle_size or args.size],
+                                          max_particles(num_individuals))
+    sizes = {
+        'individuals': num_individuals,
+        'timesteps': args.timesteps or num_timesteps,
+        'particles': num_particles
+    }
+    print("Sizes: %s" % str(sizes))
+
+    with tempfile.TemporaryDirectory() as dataset_folder:
+        suite_results = run_suite(sizes['individuals'], sizes['timesteps'], sizes['particles'], dataset_folder,
+                                  args.repeats, not args.no_memory, args.workers)
+
+    print_results(suite_results)
+
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            json.dump({'sizes': sizes, 'results': suite_results}, output_file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline_run = json.load(baseline_file)
+
+        if baseline_run['sizes'] != sizes:
+            print("The baseline is of different sizes: %s" % str(baseline_run['sizes']))
+            sys.exit(2)
+
+        suite_regressions = compare(suite_results, baseline_run['results'], args.tolerance)
+
+        for benchmark_name, baseline_seconds, benchmark_seconds in suite_regressions:
+            print("Regression in %s: %.4fs -> %.4fs" % (benchmark_name, baseline_seconds, benchmark_seconds))
+
+        sys.exit(1 if len(suite_regressions) > 0 else 0)
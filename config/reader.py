@@ -1,16 +1,139 @@
+import copy
+import functools
 import json
 import logging
 import os
+from collections.abc import Mapping
 from json import JSONDecodeError
 
 from logger import logger
-from jsonschema import validate, ValidationError
 
 logger.initialise_logger("config-reader", log_level=logging.INFO)
 module_logger = logging.getLogger('config-reader')
 
+# Location of the schema of the config (alongside this module, so it doesn't depend on the working directory)
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.schema")
 
-def load_schema(filepath="./config/config.schema"):
+
+class Config(Mapping):
+    """
+    Read-only view of the config.
+
+    Each section is itself a Config (and each list a tuple), so the config can't be changed once it has been read.
+    The sections used by the inference engine are available as properties, which are empty if the section isn't in
+    the config.
+    """
+
+    def __init__(self, data):
+        """
+        Initialise the config.
+
+        :param data: Dict containing the config.
+        """
+
+        # Preconditions
+        assert type(data) == dict
+
+        object.__setattr__(self, '_data', {key: _freeze(value) for key, value in data.items()})
+        object.__setattr__(self, '_raw', copy.deepcopy(data))
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("The config is read-only")
+
+    def __repr__(self):
+        return "Config(%s)" % repr(self._raw)
+
+    @property
+    def paths(self):
+        return self.get('paths', Config({}))
+
+    @property
+    def individuals(self):
+        return self.get('individuals', Config({}))
+
+    @property
+    def cache(self):
+        return self.get('cache')
+
+    @property
+    def checkpoint(self):
+        return self.get('checkpoint')
+
+    @property
+    def loading(self):
+        return self.get('loading', Config({}))
+
+    @property
+    def logging(self):
+        return self.get('logging', Config({}))
+
+    @property
+    def inference(self):
+        return self.get('inference', Config({}))
+
+    @property
+    def sweep(self):
+        return self.get('sweep')
+
+    @property
+    def pmmh(self):
+        return self.get('pmmh')
+
+    def to_dict(self):
+        """
+        :return: Copy of the config as a dict.
+        """
+        return copy.deepcopy(self._raw)
+
+
+def _freeze(value):
+    """
+    Convert a value of the config to its read-only form.
+
+    :param value: Value parsed from JSON.
+    :return: Config for a dict, tuple for a list, otherwise the value.
+    """
+
+    if type(value) == dict:
+        return Config(value)
+    elif type(value) == list:
+        return tuple(_freeze(item) for item in value)
+
+    return value
+
+
+def _read_json(path):
+    """
+    Read a JSON file.
+
+    :param path: Path to the JSON file.
+    :return: Parsed JSON or None if the file doesn't exist or can't be parsed.
+    """
+
+    # Check the path exists
+    if not os.path.exists(path):
+        module_logger.error("Path does not exist: %s" % path)
+        return None
+
+    # Try to read the file
+    try:
+        with open(path, 'r') as fp:
+            return json.load(fp)
+    except JSONDecodeError:
+        module_logger.error("Unable to parse file: %s" % path)
+        return None
+
+
+def load_schema(filepath=SCHEMA_PATH):
     """
     Load the schema.
 
@@ -22,7 +145,30 @@ def load_schema(filepath="./config/config.schema"):
     assert type(filepath) == str
 
     # Read the schema
-    return read_json_config(filepath)
+    return _read_json(filepath)
+
+
+@functools.lru_cache(maxsize=None)
+def get_validator(filepath=SCHEMA_PATH):
+    """
+    Get the validator of the config.
+
+    The schema is read and checked, and the validator built, once for each schema file.
+
+    :param filepath: Location of the schema file.
+    :return: jsonschema validator.
+    """
+
+    # jsonschema is slow to import, so it is only imported when a config is first validated
+    from jsonschema.validators import validator_for
+
+    schema = load_schema(filepath)
+
+    # Build a validator of the draft of JSON Schema the schema uses (checking the schema itself is valid)
+    validator_class = validator_for(schema)
+    validator_class.check_schema(schema)
+
+    return validator_class(schema)
 
 
 def read_json_config(path):
@@ -30,7 +176,7 @@ def read_json_config(path):
     Read the JSON-formatted config file.
 
     :param path: Path to the JSON config.
-    :return: Dict containing the config or None if it is invalid.
+    :return: Config or None if the path doesn't exist.
     """
 
     # Preconditions
@@ -42,40 +188,35 @@ def read_json_config(path):
         return None
 
     # Try to read the config
-    try:
-        with open(path, 'r') as fp:
-            config = json.load(fp)
-    except JSONDecodeError:
-        module_logger.error("Unable to parse file: %s" % path)
+    config = _read_json(path)
+    if config is None:
         config = {}
 
     # Postconditions
     assert type(config) == dict
 
     # Return the config
-    return config
+    return Config(config)
 
 
 def validate_config(config):
     """
-    Validate the config.
+    Validate the config, logging every validation error.
 
-    :param config: Dictionary representing the config.
+    :param config: Config (or a dict representing the config).
     :return: True if the config passes validation, otherwise False.
     """
 
     # Preconditions
-    assert type(config) == dict
+    assert isinstance(config, (Config, dict))
 
-    # Load the schema
-    schema = load_schema()
+    if isinstance(config, Config):
+        config = config.to_dict()
 
     # Perform validation
-    correctly_validated = True
-    try:
-        validate(instance=config, schema=schema)
-    except ValidationError as e:
-        module_logger.error("Config validation error: %s" % str(e.message))
-        correctly_validated = False
+    errors = sorted(get_validator().iter_errors(config), key=lambda error: list(error.absolute_path))
+    for error in errors:
+        location = "/".join(str(part) for part in error.absolute_path) or "(root)"
+        module_logger.error("Config validation error at %s: %s" % (location, error.message))
 
-    return correctly_validated
+    return len(errors) == 0
@@ -1,3 +1,8 @@
+import logging
+
+import pytest
+
+from config import reader
 from config.reader import validate_config, read_json_config
 
 
@@ -14,3 +19,45 @@ def test_invalid1():
 def test_invalid2():
     file_path = "./config/test_data/invalid2.json"
     assert not validate_config(read_json_config(file_path))
+
+
+def test_config_is_read_only():
+    config = read_json_config("./config/test_data/valid1.json")
+
+    assert config.paths["individuals"] == "./data/simple/input/individuals"
+    assert config.inference.get("num_particles", 1000) == 1000
+    assert config.checkpoint is None
+
+    with pytest.raises(TypeError):
+        config.paths["individuals"] = "elsewhere"
+    with pytest.raises(AttributeError):
+        config.paths = {}
+
+
+def test_all_errors_reported(caplog):
+    config = {"paths": {"individuals": "x"}, "inference": {"num_particles": 0}}
+
+    with caplog.at_level(logging.ERROR, logger='config-reader'):
+        assert not validate_config(config)
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 4
+    assert any("inference/num_particles" in message for message in messages)
+
+
+def test_validation_amortised(monkeypatch):
+    reads = []
+    original_read_json = reader._read_json
+    monkeypatch.setattr(reader, "_read_json", lambda path: reads.append(path) or original_read_json(path))
+    reader.get_validator.cache_clear()
+
+    config = read_json_config("./config/test_data/valid1.json")
+    assert validate_config(config)
+    validator = reader.get_validator()
+    for _ in range(100):
+        assert validate_config(config)
+
+    # The schema is read (and the validator built) only for the first validation
+    assert reads.count(reader.SCHEMA_PATH) == 1
+    assert reader.get_validator() is validator
+    assert reader.get_validator.cache_info().misses == 1
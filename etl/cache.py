@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+from logger import logger
+
+# Initialise the module logger
+logger.initialise_logger("cache", log_level=logging.INFO)
+module_logger = logging.getLogger('cache')
+
+
+class ColumnCache(object):
+    """
+    On-disk cache of the columns parsed from delimited files.
+
+    Each file is cached as a .npz file (named after a hash of its path) holding a column per field and the metadata
+    used to decide whether the cached columns are still valid: the size and modification time of the file (or a hash
+    of its content) and the options used to parse it.
+    """
+
+    # Methods of checking a cached file is still valid
+    VALIDATION_METHODS = ('mtime', 'hash')
+
+    # Prefix of the keys of the columns in the .npz file (to separate them from the metadata)
+    COLUMN_PREFIX = 'column:'
+
+    # Size of the blocks read when hashing the content of a file
+    HASH_BLOCK_SIZE = 1 << 20
+
+    def __init__(self, directory, validation='mtime'):
+        """
+        Initialise the cache.
+
+        :param directory: Folder holding the cached files (created if it doesn't exist).
+        :param validation: Method used to check a cached file is still valid ('mtime' for the size and modification
+            time of the file or 'hash' for a hash of its content).
+        """
+
+        # Preconditions
+        assert type(directory) == str
+        if validation not in ColumnCache.VALIDATION_METHODS:
+            raise ValueError("Unknown cache validation method: %s" % validation)
+
+        self.directory = directory
+        self.validation = validation
+        os.makedirs(directory, exist_ok=True)
+
+        module_logger.info("Initialised cache in folder %s with %s validation" % (directory, validation))
+
+    def cache_path(self, filepath):
+        """
+        Get the location of the cached columns of a file.
+
+        :param filepath: Location of the source file.
+        :return: Location of the .npz file.
+        """
+
+        key = hashlib.sha1(os.path.abspath(filepath).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.npz')
+
+    def signature(self, filepath, options):
+        """
+        Get the signature of a file, which changes if the file or the options used to parse it change.
+
+        :param filepath: Location of the source file.
+        :param options: Tuple of strings of the options used to parse the file.
+        :return: String.
+        """
+
+        if self.validation == 'hash':
+            digest = hashlib.sha1()
+            with open(filepath, 'rb') as fp:
+                for block in iter(lambda: fp.read(ColumnCache.HASH_BLOCK_SIZE), b''):
+                    digest.update(block)
+            file_signature = digest.hexdigest()
+        else:
+            stat = os.stat(filepath)
+            file_signature = "%d:%d" % (stat.st_size, stat.st_mtime_ns)
+
+        return "|".join((os.path.abspath(filepath), file_signature) + tuple(options))
+
+    def load(self, filepath, options):
+        """
+        Load the cached columns of a file.
+
+        :param filepath: Location of the source file.
+        :param options: Tuple of strings of the options used to parse the file.
+        :return: Dict of field name -> array of values, or None if the file isn't cached or the cache is stale.
+        """
+
+        cache_path = self.cache_path(filepath)
+        if not os.path.isfile(cache_path):
+            return None
+
+        try:
+            with np.load(cache_path, allow_pickle=False) as data:
+                if str(data['signature']) != self.signature(filepath, options):
+                    module_logger.info("Cached columns are stale for file: %s" % filepath)
+                    return None
+
+                columns = {}
+                for name in data['fields'].tolist():
+                    columns[name] = data[ColumnCache.COLUMN_PREFIX + name].astype(object)
+        except (OSError, ValueError, KeyError):
+            module_logger.warning("Unable to read the cached columns of file: %s" % filepath)
+            return None
+
+        module_logger.info("Loaded cached columns for file: %s" % filepath)
+        return columns
+
+    def save(self, filepath, options, columns):
+        """
+        Save the columns of a file to the cache.
+
+        :param filepath: Location of the source file.
+        :param options: Tuple of strings of the options used to parse the file.
+        :param columns: Dict of field name -> array of string values.
+        """
+
+        arrays = {ColumnCache.COLUMN_PREFIX + name: np.asarray(values).astype(str) for name, values in columns.items()}
+        arrays['fields'] = np.array(list(columns.keys()), dtype=str)
+        arrays['signature'] = np.array(self.signature(filepath, options))
+
+        # Write to a temporary file and then move it, so that a partially written file is never read
+        cache_path = self.cache_path(filepath)
+        temporary_path = cache_path + '.tmp'
+        with open(temporary_path, 'wb') as fp:
+            np.savez(fp, **arrays)
+        os.replace(temporary_path, cache_path)
+
+        module_logger.info("Cached columns for file: %s" % filepath)
+
+    def invalidate(self, filepath):
+        """
+        Remove the cached columns of a file.
+
+        :param filepath: Location of the source file.
+        """
+
+        cache_path = self.cache_path(filepath)
+        if os.path.isfile(cache_path):
+            os.remove(cache_path)
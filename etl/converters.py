@@ -0,0 +1,179 @@
+import datetime
+
+import numpy as np
+
+# Format of a date held as a string
+DATE_FORMAT = '%d/%m/%Y'
+
+# Values of a date that isn't known
+NO_DATES = ('None', '')
+
+# Code points of the characters of a DD/MM/YYYY date
+_DIGIT_POSITIONS = [0, 1, 3, 4, 6, 7, 8, 9]
+_SEPARATOR_POSITIONS = [2, 5]
+
+
+def column_converter(function):
+    """
+    Mark a function as a converter of a whole column of values (rather than of a single value).
+
+    :param function: Function converting a sequence of strings to an array.
+    :return: The function.
+    """
+
+    function.converts_columns = True
+    return function
+
+
+@column_converter
+def to_dates(values):
+    """
+    Convert a column of DD/MM/YYYY strings to dates.
+
+    Each distinct string is parsed once. The strings of the form DD/MM/YYYY are parsed together from their character
+    codes; any other string (e.g. 1/3/1970) is parsed with datetime.strptime.
+
+    :param values: Sequence of strings (None or 'None' if the date isn't known).
+    :return: datetime64[D] array (NaT where the date isn't known).
+    """
+
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = np.where(values == None, NO_DATES[0], values)  # noqa: E711 (element-wise comparison)
+    values = values.astype(str)
+
+    unique_values, inverse = np.unique(values, return_inverse=True)
+    return _parse_dates(unique_values)[inverse]
+
+
+@column_converter
+def to_integers(values):
+    """
+    Convert a column of strings to integers.
+
+    :param values: Sequence of strings.
+    :return: int64 array.
+    """
+
+    return np.asarray(values).astype(str).astype(np.int64)
+
+
+@column_converter
+def to_numbers(values):
+    """
+    Convert a column of strings to floating point numbers.
+
+    :param values: Sequence of strings.
+    :return: float64 array.
+    """
+
+    return np.asarray(values).astype(str).astype(np.float64)
+
+
+@column_converter
+def to_strings(values):
+    """
+    Leave a column of strings unchanged.
+
+    :param values: Sequence of strings.
+    :return: Object array of strings.
+    """
+
+    return np.asarray(values, dtype=object)
+
+
+# Converter of each type name used in the config
+CONVERTERS = {
+    'date': to_dates,
+    'integer': to_integers,
+    'number': to_numbers,
+    'string': to_strings
+}
+
+
+def create_converters(attributes_config):
+    """
+    Create the converters of the attributes of the individuals from the config.
+
+    :param attributes_config: Dict of attribute name -> dict with the 'type' of the attribute.
+    :return: Dict of attribute name -> function converting a column of values.
+    """
+
+    converters = {}
+    for name, attribute_config in attributes_config.items():
+        if attribute_config['type'] not in CONVERTERS:
+            raise ValueError("Unknown type of attribute %s: %s" % (name, attribute_config['type']))
+        converters[name] = CONVERTERS[attribute_config['type']]
+
+    return converters
+
+
+def as_column_converters(converters):
+    """
+    Adapt the converters of single values (e.g. lambda x: int(x)) to converters of whole columns, which apply the
+    function to each value in turn. Converters marked as column converters (see column_converter) are unchanged.
+
+    :param converters: Dict of attribute name -> function converting a column of values or a single value.
+    :return: Dict of attribute name -> function converting a column of values.
+    """
+
+    return {name: converter if getattr(converter, 'converts_columns', False) else _convert_values(converter)
+            for name, converter in converters.items()}
+
+
+def _convert_values(converter):
+    """
+    Create a converter of a column of values from a converter of a single value.
+
+    :param converter: Function converting a single value.
+    :return: Function converting a column of values to an object array.
+    """
+
+    def convert(values):
+        converted = np.empty(len(values), dtype=object)
+        converted[:] = [converter(value) for value in values]
+        return converted
+
+    return column_converter(convert)
+
+
+def _parse_dates(values):
+    """
+    Parse distinct date strings.
+
+    :param values: Array of strings.
+    :return: datetime64[D] array.
+    """
+
+    dates = np.full(values.shape[0], np.datetime64('NaT'), dtype='datetime64[D]')
+
+    # Character codes of the strings of the form DD/MM/YYYY
+    fixed_width = np.char.str_len(values) == len('DD/MM/YYYY')
+    characters = values[fixed_width].astype('U10').view(np.uint32).reshape(-1, 10).astype(np.int64)
+    digits = characters[:, _DIGIT_POSITIONS] - ord('0')
+    well_formed = np.all((digits >= 0) & (digits <= 9), axis=1) & \
+        np.all(characters[:, _SEPARATOR_POSITIONS] == ord('/'), axis=1)
+
+    day = digits[:, 0] * 10 + digits[:, 1]
+    month = digits[:, 2] * 10 + digits[:, 3]
+    year = digits[:, 4] * 1000 + digits[:, 5] * 100 + digits[:, 6] * 10 + digits[:, 7]
+
+    # Only months 1-12 and days within the month are valid
+    well_formed &= (month >= 1) & (month <= 12) & (year >= 1)
+    month_start = ((year - 1970) * 12 + np.clip(month, 1, 12) - 1).astype('datetime64[M]')
+    days_in_month = ((month_start + 1).astype('datetime64[D]') - month_start.astype('datetime64[D]')).astype(np.int64)
+    well_formed &= (day >= 1) & (day <= days_in_month)
+
+    parsed = month_start.astype('datetime64[D]') + (day - 1)
+    rows = np.flatnonzero(fixed_width)
+    dates[rows[well_formed]] = parsed[well_formed]
+
+    # Any other strings are parsed individually (raising a ValueError if the string isn't a date)
+    parsed_rows = np.zeros(values.shape[0], dtype=bool)
+    parsed_rows[rows[well_formed]] = True
+    for row in np.flatnonzero(~parsed_rows):
+        value = values[row]
+        if value not in NO_DATES:
+            dates[row] = datetime.datetime.strptime(value, DATE_FORMAT).date()
+
+    return dates
@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
 import csv
+import itertools
 import logging
+import operator
 import os
+
+import numpy as np
+
 from logger import logger
 
 # Initialise the module logger
@@ -14,12 +19,15 @@ class DelimitedSource(object):
     # Maximum number of characters in a single field
     FIELD_LIMIT = 10000000
 
-    def __init__(self, filepath, delimiter, encapsulator, encoding):
+    def __init__(self, filepath, delimiter, encapsulator, encoding, cache=None):
         self.filepath = filepath
         self.delimiter = delimiter
         self.encapsulator = encapsulator
         self.encoding = encoding
 
+        # Optional ColumnCache of the columns read by read_columns
+        self.cache = cache
+
         module_logger.info("Initialising CSV reader to read: %s" % self.filepath)
         module_logger.info("Delimiter set to: %s" % delimiter)
         module_logger.info("Encapsulator set to: %s" % encapsulator)
@@ -46,3 +54,171 @@ class DelimitedSource(object):
             # Create the generator for reading a line at a time
             for line in reader:
                 yield dict(zip(field_names, line))
+
+    def read_chunks(self, chunk_size, required_fields=()):
+        """
+        Read the file in chunks of rows, where each chunk is held as a column per field.
+
+        The header is validated once rather than on every row. A chunk that doesn't contain the encapsulator is
+        split on the delimiter in a single pass over its text rather than being parsed a row at a time. Otherwise the
+        chunk is parsed into rows with the CSV parser, which reads on past the end of the chunk if its last row has an
+        encapsulated field spanning lines, so a row is never split between chunks.
+
+        :param chunk_size: Maximum number of rows in a chunk.
+        :param required_fields: Fields that must be present in the header.
+        :return: Generator of dicts of field name -> array of the (string) values of the chunk.
+        """
+
+        # Preconditions
+        assert type(chunk_size) == int
+        assert chunk_size > 0
+        if not os.path.isfile(self.filepath):
+            raise ValueError("File path isn't valid: %s" % self.filepath)
+
+        # Change the limit on the size of a field
+        csv.field_size_limit(self.FIELD_LIMIT)
+
+        # Open the file for reading
+        with open(self.filepath, 'r', encoding=self.encoding) as fp:
+
+            # Get and validate the header
+            field_names = next(csv.reader(fp, delimiter=self.delimiter, quotechar=self.encapsulator), None)
+            if field_names is None:
+                raise ValueError("Unable to read the header of the CSV file")
+
+            missing_fields = set(required_fields) - set(field_names)
+            if len(missing_fields) > 0:
+                raise ValueError("Missing fields %s in the header of file: %s" %
+                                 (sorted(missing_fields), self.filepath))
+
+            while True:
+                lines = list(itertools.islice(fp, chunk_size))
+                if len(lines) == 0:
+                    break
+
+                columns = self._split_lines(lines, len(field_names))
+                if columns is None:
+                    columns = self._parse_lines(lines, fp, len(field_names))
+
+                yield {name: _to_array(values) for name, values in zip(field_names, columns)}
+
+    def read_columns(self, required_fields=(), chunk_size=1000000):
+        """
+        Read the whole file as a column per field.
+
+        If the reader has a cache, the columns are loaded from the cache if the file hasn't changed since it was
+        cached, otherwise the file is parsed and the columns are cached.
+
+        :param required_fields: Fields that must be present in the header.
+        :param chunk_size: Number of rows read at a time.
+        :return: Dict of field name -> array of the (string) values.
+        """
+
+        options = (self.delimiter, self.encapsulator, self.encoding)
+        if self.cache is not None:
+            columns = self.cache.load(self.filepath, options)
+            if columns is not None:
+                missing_fields = set(required_fields) - set(columns.keys())
+                if len(missing_fields) > 0:
+                    raise ValueError("Missing fields %s in the header of file: %s" %
+                                     (sorted(missing_fields), self.filepath))
+                return columns
+
+        columns = self._parse_columns(required_fields, chunk_size)
+        if self.cache is not None:
+            self.cache.save(self.filepath, options, columns)
+
+        return columns
+
+    def _parse_columns(self, required_fields, chunk_size):
+        """
+        Parse the whole file as a column per field.
+
+        :param required_fields: Fields that must be present in the header.
+        :param chunk_size: Number of rows read at a time.
+        :return: Dict of field name -> array of the (string) values.
+        """
+
+        chunks = list(self.read_chunks(chunk_size, required_fields))
+        if len(chunks) == 1:
+            return chunks[0]
+
+        # Get the field names from the header if the file has no rows
+        if len(chunks) == 0:
+            with open(self.filepath, 'r', encoding=self.encoding) as fp:
+                field_names = next(csv.reader(fp, delimiter=self.delimiter, quotechar=self.encapsulator))
+            return {name: _to_array(()) for name in field_names}
+
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0].keys()}
+
+    def _split_lines(self, lines, num_fields):
+        """
+        Split lines of the file into columns without the CSV parser.
+
+        :param lines: List of lines of the file.
+        :param num_fields: Number of fields in the header.
+        :return: (fields x rows) array of values or None if the lines require the CSV parser (i.e. they contain the
+            encapsulator or are blank).
+        """
+
+        text = "".join(lines)
+        if self.encapsulator in text or "\n\n" in text or lines[0] == "\n":
+            return None
+
+        # Check each line has a value for each field
+        if set(map(operator.methodcaller('count', self.delimiter), lines)) != {num_fields - 1}:
+            raise ValueError("Rows with the wrong number of fields in file: %s" % self.filepath)
+
+        if text.endswith("\n"):
+            text = text[:-1]
+        values = np.array(text.replace("\n", self.delimiter).split(self.delimiter), dtype=object)
+
+        return values.reshape(-1, num_fields).T
+
+    def _parse_lines(self, lines, fp, num_fields):
+        """
+        Parse lines of the file into columns with the CSV parser.
+
+        The rows that start within the lines are parsed. If the last of them has an encapsulated field containing a
+        newline, the rest of the row is read from the file.
+
+        :param lines: List of lines of the file.
+        :param fp: File from which the lines were read.
+        :param num_fields: Number of fields in the header.
+        :return: List of the values of each field.
+        """
+
+        reader = csv.reader(itertools.chain(lines, fp), delimiter=self.delimiter, quotechar=self.encapsulator)
+
+        rows = []
+        while reader.line_num < len(lines):
+            row = next(reader, None)
+            if row is None:
+                break
+            if len(row) > 0:
+                rows.append(row)
+
+        # Check each row has a value for each field
+        if len(rows) > 0 and set(map(len, rows)) != {num_fields}:
+            raise ValueError("Rows with the wrong number of fields in file: %s" % self.filepath)
+
+        if len(rows) == 0:
+            return [[] for _ in range(num_fields)]
+
+        return list(zip(*rows))
+
+
+def _to_array(values):
+    """
+    Convert a sequence of strings to a NumPy object array.
+
+    :param values: Sequence of strings.
+    :return: Array.
+    """
+
+    if isinstance(values, np.ndarray):
+        return np.ascontiguousarray(values)
+
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
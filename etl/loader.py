@@ -0,0 +1,211 @@
+import collections
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from etl.csv_reader import DelimitedSource
+from etl.timestep_files import find_timestep_files, INDIVIDUALS_FILE_PATTERN, INFECTIONS_FILE_PATTERN
+from logger import logger
+
+# Initialise the module logger
+logger.initialise_logger("loader", log_level=logging.INFO)
+module_logger = logging.getLogger('loader')
+
+
+class TimestepData(object):
+    """
+    Parsed input data of a single timestep.
+    """
+
+    def __init__(self, timestep, individuals=None, infections=None):
+        """
+        Initialise the data of a timestep.
+
+        :param timestep: Timestep.
+        :param individuals: Dict of field name -> array of values of the individuals file (None if there isn't one).
+        :param infections: Dict of field name -> array of values of the infections file (None if there isn't one).
+        """
+
+        self.timestep = timestep
+        self.individuals = individuals
+        self.infections = infections
+
+
+class TimestepLoader(object):
+    """
+    Loader of the per-timestep individuals and infections files.
+
+    The files of each timestep are independent, so they are parsed concurrently by a pool of processes. Each worker
+    returns the columns of a file as fixed-width string arrays (which are transferred between processes as a single
+    buffer per column rather than as pickled rows). When the files are parsed in this process, the columns are used
+    as parsed. The parsed timesteps are returned in timestep order so they can be applied to the state objects in
+    turn.
+    """
+
+    # Number of files parsed ahead of the one being consumed, per worker (bounds the memory of the parsed files)
+    LOOKAHEAD_PER_WORKER = 2
+
+    def __init__(self, individuals_folder, infections_folder, delimiter, encapsulator, encoding, cache=None,
+                 max_workers=None):
+        """
+        Initialise the loader.
+
+        :param individuals_folder: Folder containing an individuals file per timestep.
+        :param infections_folder: Folder containing an infections file per timestep.
+        :param delimiter: Delimiter used in the CSV files.
+        :param encapsulator: Encapsulator used in the CSV files.
+        :param encoding: Encoding of the CSV files.
+        :param cache: Optional ColumnCache of the parsed files.
+        :param max_workers: Maximum number of worker processes (defaults to the number of CPUs). If 1, the files are
+            parsed in this process.
+        """
+
+        # Preconditions
+        assert max_workers is None or (type(max_workers) == int and max_workers > 0)
+
+        self.delimiter = delimiter
+        self.encapsulator = encapsulator
+        self.encoding = encoding
+        self.cache = cache
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.individuals_folder = individuals_folder
+        self.infections_folder = infections_folder
+
+        # Find the files of each timestep
+        self.refresh()
+
+    def refresh(self):
+        """
+        Find the files of each timestep in the folders (e.g. after new files have been added).
+        """
+
+        self.individuals_files = find_timestep_files(self.individuals_folder, INDIVIDUALS_FILE_PATTERN)
+        self.infections_files = find_timestep_files(self.infections_folder, INFECTIONS_FILE_PATTERN)
+
+    @property
+    def timesteps(self):
+        return sorted(set(self.individuals_files.keys()) | set(self.infections_files.keys()))
+
+    def files(self, timestep):
+        """
+        Get the files of a timestep.
+
+        :param timestep: Timestep.
+        :return: List of the file paths.
+        """
+
+        return [files[timestep] for files in [self.individuals_files, self.infections_files] if timestep in files]
+
+    def load(self, timesteps=None):
+        """
+        Parse the files of each timestep.
+
+        The files are parsed ahead of the timestep being consumed, so the caller can process a timestep whilst later
+        timesteps are parsed.
+
+        :param timesteps: Timesteps to load (defaults to all of the timesteps in the folders).
+        :return: Generator of TimestepData in timestep order.
+        """
+
+        timesteps = self.timesteps if timesteps is None else sorted(timesteps)
+
+        # One task per file
+        tasks = []
+        for timestep in timesteps:
+            if timestep in self.individuals_files:
+                tasks.append((timestep, 'individuals', self.individuals_files[timestep]))
+            if timestep in self.infections_files:
+                tasks.append((timestep, 'infections', self.infections_files[timestep]))
+
+        module_logger.info("Loading %d files for %d timesteps with %d workers" %
+                           (len(tasks), len(timesteps), self.max_workers))
+
+        arguments = [(filepath, self.delimiter, self.encapsulator, self.encoding, self.cache)
+                     for _, _, filepath in tasks]
+
+        if self.max_workers == 1 or len(tasks) <= 1:
+            results = map(_read_file, arguments)
+            yield from _group_by_timestep(timesteps, tasks, results)
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                results = _bounded_map(executor, _read_file_for_transfer, arguments,
+                                       self.max_workers * TimestepLoader.LOOKAHEAD_PER_WORKER)
+                yield from _group_by_timestep(timesteps, tasks, map(_from_transfer, results))
+
+
+def _read_file(arguments):
+    """
+    Read a file as columns.
+
+    :param arguments: Tuple of the file path, delimiter, encapsulator, encoding and cache.
+    :return: Dict of field name -> array of the (string) values.
+    """
+
+    filepath, delimiter, encapsulator, encoding, cache = arguments
+    return DelimitedSource(filepath, delimiter, encapsulator, encoding, cache=cache).read_columns()
+
+
+def _read_file_for_transfer(arguments):
+    """
+    Read a file as columns to be returned to the parent process (run by a worker process).
+
+    :param arguments: Tuple of the file path, delimiter, encapsulator, encoding and cache.
+    :return: Dict of field name -> fixed-width string array.
+    """
+
+    return {name: values.astype(str) for name, values in _read_file(arguments).items()}
+
+
+def _from_transfer(columns):
+    """
+    Convert the columns returned by a worker process back to the arrays of values used by the state objects.
+
+    :param columns: Dict of field name -> fixed-width string array.
+    :return: Dict of field name -> object array.
+    """
+
+    return {name: values.astype(object) for name, values in columns.items()}
+
+
+def _bounded_map(executor, function, arguments, lookahead):
+    """
+    Apply a function to each argument using an executor, with a bounded number of results pending at once.
+
+    :param executor: Executor.
+    :param function: Function taking a single argument.
+    :param arguments: List of arguments.
+    :param lookahead: Maximum number of tasks submitted but not yet consumed.
+    :return: Generator of the results in the order of the arguments.
+    """
+
+    pending = collections.deque()
+    for argument in arguments:
+        pending.append(executor.submit(function, argument))
+        if len(pending) >= lookahead:
+            yield pending.popleft().result()
+
+    while len(pending) > 0:
+        yield pending.popleft().result()
+
+
+def _group_by_timestep(timesteps, tasks, results):
+    """
+    Group the parsed files by timestep.
+
+    :param timesteps: Sorted list of timesteps.
+    :param tasks: List of (timestep, kind, file path) tuples in timestep order.
+    :param results: Iterator of the columns of each task (in the order of the tasks).
+    :return: Generator of TimestepData in timestep order.
+    """
+
+    results = iter(results)
+    task_index = 0
+
+    for timestep in timesteps:
+        data = TimestepData(timestep)
+        while task_index < len(tasks) and tasks[task_index][0] == timestep:
+            setattr(data, tasks[task_index][1], next(results))
+            task_index += 1
+
+        yield data
+
@@ -0,0 +1,58 @@
+import os
+import shutil
+
+from etl.cache import ColumnCache
+from etl.csv_reader import DelimitedSource
+
+
+def copy_test_data(tmp_path):
+    filepath = str(tmp_path / "test_data_1.csv")
+    shutil.copy("./etl/test_data/test_data_1.csv", filepath)
+    return filepath
+
+
+def test_cache_round_trip(tmp_path):
+    filepath = copy_test_data(tmp_path)
+    cache = ColumnCache(str(tmp_path / "cache"))
+
+    columns = DelimitedSource(filepath, ",", "|", "utf-8", cache=cache).read_columns()
+    assert os.path.isfile(cache.cache_path(filepath))
+
+    cached_columns = cache.load(filepath, (",", "|", "utf-8"))
+    assert list(cached_columns.keys()) == list(columns.keys())
+    for name in columns.keys():
+        assert cached_columns[name].tolist() == columns[name].tolist()
+        assert cached_columns[name].dtype == object
+
+
+def test_cache_invalidated_by_change(tmp_path):
+    filepath = copy_test_data(tmp_path)
+    cache = ColumnCache(str(tmp_path / "cache"), validation='hash')
+    DelimitedSource(filepath, ",", "|", "utf-8", cache=cache).read_columns()
+
+    # Different parsing options
+    assert cache.load(filepath, (";", "|", "utf-8")) is None
+
+    # Changed content
+    with open(filepath, 'a') as fp:
+        fp.write("\nBlue Sky,Strymon,Reverb")
+    assert cache.load(filepath, (",", "|", "utf-8")) is None
+
+    columns = DelimitedSource(filepath, ",", "|", "utf-8", cache=cache).read_columns()
+    assert columns['Pedal name'].tolist()[-1] == 'Blue Sky'
+
+    cache.invalidate(filepath)
+    assert not os.path.isfile(cache.cache_path(filepath))
+
+
+def test_cache_missing_field(tmp_path):
+    filepath = copy_test_data(tmp_path)
+    cache = ColumnCache(str(tmp_path / "cache"))
+    reader = DelimitedSource(filepath, ",", "|", "utf-8", cache=cache)
+    reader.read_columns()
+
+    try:
+        reader.read_columns(required_fields=['Price'])
+        assert False
+    except ValueError:
+        pass
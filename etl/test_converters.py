@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import pytest
+
+from etl.converters import CONVERTERS, as_column_converters, create_converters, to_dates, to_integers
+
+
+def test_to_dates():
+    dates = to_dates(np.array(["01/03/1970", "None", None, "29/02/2016", "1/3/1970", "01/03/1970"], dtype=object))
+
+    assert dates.dtype == np.dtype('datetime64[D]')
+    assert dates[0] == np.datetime64('1970-03-01')
+    assert np.isnat(dates[1]) and np.isnat(dates[2])
+    assert dates[3] == np.datetime64('2016-02-29')
+    assert dates[4] == np.datetime64('1970-03-01')
+    assert dates[5] == dates[0]
+
+
+def test_to_dates_invalid():
+    with pytest.raises(ValueError):
+        to_dates(["29/02/2017"])
+
+    with pytest.raises(ValueError):
+        to_dates(["13/13/2017"])
+
+
+def test_to_dates_matches_strptime():
+    rng = np.random.default_rng(1)
+    dates = np.datetime64('1900-01-01') + rng.integers(0, 60000, 1000)
+    strings = [date.astype(object).strftime("%d/%m/%Y") for date in dates]
+
+    assert np.array_equal(to_dates(strings), dates)
+
+
+def test_create_converters():
+    converters = create_converters({"dob": {"type": "date"}, "age": {"type": "integer"}})
+    assert converters["dob"] is to_dates
+    assert to_integers(["1", "23"]).tolist() == [1, 23]
+
+    with pytest.raises(ValueError):
+        create_converters({"dob": {"type": "datetime"}})
+
+
+def test_as_column_converters():
+    converters = as_column_converters({"dob": to_dates, "age": lambda x: int(x)})
+
+    # Column converters are unchanged and converters of single values are applied to each value
+    assert converters["dob"] is to_dates
+    assert converters["age"](np.array(["1", "23"])).tolist() == [1, 23]
+
+
+def test_schema_types_match_converters():
+    with open("./config/config.schema") as fp:
+        schema = json.load(fp)
+
+    types = schema["properties"]["individuals"]["additionalProperties"]["properties"]["type"]["enum"]
+    assert sorted(types) == sorted(CONVERTERS.keys())
@@ -14,4 +14,49 @@ def test_csv_reader_parse():
     data = list(csv_reader.read())
     assert data == [{'Pedal name': 'TS-808', 'Manufacturer': 'Ibanez', 'Type of effect': 'Overdrive'},
                     {'Pedal name': 'Timeline', 'Manufacturer': 'Strymon', 'Type of effect': 'Delay'},
-                    {'Pedal name': 'BigSky', 'Manufacturer': 'Strymon', 'Type of effect': 'Reverb'}]
\ No newline at end of file
+                    {'Pedal name': 'BigSky', 'Manufacturer': 'Strymon', 'Type of effect': 'Reverb'}]
+
+def test_csv_reader_read_columns():
+    csv_reader = DelimitedSource("./etl/test_data/test_data_1.csv", ",", "|", "utf-8")
+
+    columns = csv_reader.read_columns(required_fields=['Pedal name'])
+    assert list(columns.keys()) == ['Pedal name', 'Manufacturer', 'Type of effect']
+    assert columns['Pedal name'].tolist() == ['TS-808', 'Timeline', 'BigSky']
+    assert columns['Manufacturer'].tolist() == ['Ibanez', 'Strymon', 'Strymon']
+
+
+def test_csv_reader_read_chunks():
+    csv_reader = DelimitedSource("./etl/test_data/test_data_1.csv", ",", "|", "utf-8")
+
+    chunks = list(csv_reader.read_chunks(2))
+    assert [chunk['Type of effect'].tolist() for chunk in chunks] == [['Overdrive', 'Delay'], ['Reverb']]
+
+    # Reading in chunks gives the same result as reading the whole file
+    columns = csv_reader.read_columns(chunk_size=2)
+    assert columns['Type of effect'].tolist() == ['Overdrive', 'Delay', 'Reverb']
+
+
+def test_csv_reader_missing_field():
+    csv_reader = DelimitedSource("./etl/test_data/test_data_1.csv", ",", "|", "utf-8")
+
+    try:
+        csv_reader.read_columns(required_fields=['Price'])
+        assert False
+    except ValueError:
+        pass
+
+
+def test_csv_reader_read_chunks_multiline_field(tmp_path):
+    filepath = str(tmp_path / "multiline.csv")
+    with open(filepath, 'w', encoding="utf-8") as fp:
+        fp.write('id,comment\n1,"first"\n2,"spans\nthe\nboundary"\n3,last\n')
+
+    csv_reader = DelimitedSource(filepath, ",", "\"", "utf-8")
+
+    # The second row starts in the first chunk of two lines and ends in the lines after it
+    chunks = list(csv_reader.read_chunks(2))
+    assert [chunk['id'].tolist() for chunk in chunks] == [['1', '2'], ['3']]
+    assert chunks[0]['comment'].tolist() == ['first', 'spans\nthe\nboundary']
+
+    columns = csv_reader.read_columns(chunk_size=2)
+    assert [dict(zip(columns.keys(), values)) for values in zip(*columns.values())] == list(csv_reader.read())
@@ -0,0 +1,49 @@
+from etl.loader import TimestepLoader
+
+
+def write_timesteps(tmp_path):
+    individuals_folder = tmp_path / "individuals"
+    infections_folder = tmp_path / "infections"
+    individuals_folder.mkdir()
+    infections_folder.mkdir()
+
+    for timestep in range(4):
+        (individuals_folder / ("individual_%04d.csv" % timestep)).write_text(
+            "id,location\n0001,A\n%04d,B\n" % (timestep + 2))
+    for timestep in [0, 2, 3]:
+        (infections_folder / ("infection_%04d.csv" % timestep)).write_text(
+            "individual_id,infection_strain\n0001,c-%d\n" % timestep)
+
+    # Files that don't match the naming convention are ignored
+    (infections_folder / "readme.txt").write_text("ignored")
+
+    return str(individuals_folder), str(infections_folder)
+
+
+def test_load_in_timestep_order(tmp_path):
+    individuals_folder, infections_folder = write_timesteps(tmp_path)
+    loader = TimestepLoader(individuals_folder, infections_folder, ",", "\"", "utf-8", max_workers=1)
+
+    data = list(loader.load())
+    assert [d.timestep for d in data] == [0, 1, 2, 3]
+    assert data[1].infections is None
+    assert data[3].individuals['id'].tolist() == ['0001', '0005']
+    assert data[2].infections['infection_strain'].tolist() == ['c-2']
+
+
+def test_parallel_load_matches_sequential(tmp_path):
+    individuals_folder, infections_folder = write_timesteps(tmp_path)
+    sequential = TimestepLoader(individuals_folder, infections_folder, ",", "\"", "utf-8", max_workers=1)
+    parallel = TimestepLoader(individuals_folder, infections_folder, ",", "\"", "utf-8", max_workers=2)
+
+    for expected, actual in zip(sequential.load(), parallel.load()):
+        assert expected.timestep == actual.timestep
+        for kind in ['individuals', 'infections']:
+            expected_columns = getattr(expected, kind)
+            actual_columns = getattr(actual, kind)
+            if expected_columns is None:
+                assert actual_columns is None
+                continue
+            assert {name: values.tolist() for name, values in expected_columns.items()} == \
+                {name: values.tolist() for name, values in actual_columns.items()}
+            assert all(values.dtype == object for values in actual_columns.values())
@@ -0,0 +1,45 @@
+import logging
+import os
+import re
+
+from logger import logger
+
+# Initialise the module logger
+logger.initialise_logger("timestep-files", log_level=logging.INFO)
+module_logger = logging.getLogger('timestep-files')
+
+# Regular expressions for the names of the per-timestep files
+INDIVIDUALS_FILE_PATTERN = re.compile(r'^individuals?_(\d+)\.csv$')
+INFECTIONS_FILE_PATTERN = re.compile(r'^infections?_(\d+)\.csv$')
+
+
+def find_timestep_files(folder, pattern):
+    """
+    Find the per-timestep files within a folder.
+
+    :param folder: Folder containing a file per timestep.
+    :param pattern: Compiled regular expression for the file name, where the first group is the timestep.
+    :return: Dict of timestep (int) -> file path.
+    """
+
+    # Preconditions
+    assert type(folder) == str
+
+    if not os.path.isdir(folder):
+        raise ValueError("Folder isn't valid: %s" % folder)
+
+    timestep_to_path = {}
+    for filename in sorted(os.listdir(folder)):
+        match = pattern.match(filename)
+        if match is None:
+            continue
+
+        timestep = int(match.group(1))
+        if timestep in timestep_to_path:
+            raise ValueError("Multiple files found for timestep %d in folder: %s" % (timestep, folder))
+
+        timestep_to_path[timestep] = os.path.join(folder, filename)
+
+    module_logger.info("Found %d timestep files in folder: %s" % (len(timestep_to_path), folder))
+
+    return timestep_to_path
@@ -0,0 +1,226 @@
+import contextlib
+import json
+import resource
+import sys
+import time
+import tracemalloc
+
+# Recorder of the metrics of the current run (None if the metrics aren't being recorded)
+_recorder = None
+
+
+class MetricsRecorder(object):
+    """
+    Recorder of the time spent in each stage of the processing of a timestep, the counters of the timestep (e.g. the
+    number of rows parsed) and the peak memory, written as a JSON line per timestep.
+    """
+
+    def __init__(self, metrics_path, trace_memory=False):
+        """
+        Initialise the recorder.
+
+        :param metrics_path: Location of the JSON lines file of the metrics (appended to if it exists).
+        :param trace_memory: If True, trace the memory allocated by Python with tracemalloc (which slows the
+            processing) and record the peak of each timestep.
+        """
+
+        # Preconditions
+        assert type(metrics_path) == str
+
+        self.metrics_path = metrics_path
+        self.trace_memory = trace_memory
+        self.metrics_file = open(metrics_path, 'a')
+
+        # Seconds spent in each stage and the counters of the timestep being processed
+        self.stages = {}
+        self.counters = {}
+
+        if trace_memory:
+            tracemalloc.start()
+
+    def add_time(self, stage, seconds):
+        """
+        Add to the time spent in a stage.
+
+        :param stage: Name of the stage.
+        :param seconds: Number of seconds.
+        """
+
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name, value=1):
+        """
+        Add to a counter.
+
+        :param name: Name of the counter.
+        :param value: Amount to add.
+        """
+
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        """
+        Set the value of a measurement (replacing any previous value in the timestep).
+
+        :param name: Name of the measurement.
+        :param value: Value.
+        """
+
+        self.counters[name] = value
+
+    def end_timestep(self, timestep):
+        """
+        Write the metrics of a timestep and reset them for the next timestep.
+
+        :param timestep: Timestep.
+        """
+
+        record = {
+            'timestep': timestep,
+            'stages': self.stages,
+            'counters': self.counters,
+            'peak_rss_bytes': peak_rss_bytes()
+        }
+
+        if self.trace_memory:
+            record['traced_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+
+        self.metrics_file.write(json.dumps(record) + "\n")
+        self.metrics_file.flush()
+
+        self.stages = {}
+        self.counters = {}
+
+    def close(self):
+        """
+        Close the metrics file and stop tracing the memory.
+        """
+
+        self.metrics_file.close()
+        if self.trace_memory:
+            tracemalloc.stop()
+
+
+def peak_rss_bytes():
+    """
+    :return: Maximum resident set size of the process in bytes.
+    """
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def start_metrics(metrics_path, trace_memory=False):
+    """
+    Start recording the metrics of each timestep (replacing any previous recorder).
+
+    :param metrics_path: Location of the JSON lines file of the metrics.
+    :param trace_memory: If True, trace the memory allocated by Python with tracemalloc.
+    """
+
+    global _recorder
+
+    stop_metrics()
+    _recorder = MetricsRecorder(metrics_path, trace_memory)
+
+
+def stop_metrics():
+    """
+    Stop recording the metrics.
+    """
+
+    global _recorder
+
+    if _recorder is not None:
+        _recorder.close()
+    _recorder = None
+
+
+def recording():
+    """
+    :return: True if the metrics are being recorded.
+    """
+    return _recorder is not None
+
+
+class stage(contextlib.ContextDecorator):
+    """
+    Timer of a stage of the processing, used as a context manager or a decorator. The time is only measured whilst
+    the metrics are being recorded.
+    """
+
+    def __init__(self, name):
+        """
+        Initialise the timer.
+
+        :param name: Name of the stage (e.g. 'predict').
+        """
+
+        self.name = name
+        self.starts = []
+
+    def __enter__(self):
+        self.starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.starts.pop()
+        if _recorder is not None:
+            _recorder.add_time(self.name, seconds)
+        return False
+
+
+def timed_iter(name, iterable):
+    """
+    Time the production of each item of an iterable as a stage (e.g. the loading of the data of each timestep).
+
+    :param name: Name of the stage.
+    :param iterable: Iterable.
+    :return: Generator of the items of the iterable.
+    """
+
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def count(name, value=1):
+    """
+    Add to a counter of the timestep being processed (if the metrics are being recorded).
+
+    :param name: Name of the counter.
+    :param value: Amount to add.
+    """
+
+    if _recorder is not None:
+        _recorder.count(name, value)
+
+
+def gauge(name, value):
+    """
+    Set a measurement of the timestep being processed (if the metrics are being recorded).
+
+    :param name: Name of the measurement.
+    :param value: Value.
+    """
+
+    if _recorder is not None:
+        _recorder.gauge(name, value)
+
+
+def end_timestep(timestep):
+    """
+    Write the metrics of a timestep (if the metrics are being recorded).
+
+    :param timestep: Timestep.
+    """
+
+    if _recorder is not None:
+        _recorder.end_timestep(timestep)
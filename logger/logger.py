@@ -1,9 +1,141 @@
+import atexit
+import collections
 import logging
+import logging.handlers
+import os
+import queue
+
+# Default location of the log file
+DEFAULT_LOG_PATH = './logs/virology-model.log'
+
+# Format of the log messages
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Queue of the log records of every logger, written to the console and file by a background listener
+_queue = queue.SimpleQueue()
+
+# Listener writing the queued records, the process it is running in and the settings it was configured with
+_listener = None
+_listener_pid = None
+_settings = None
+
+# Names of the loggers of the project
+_logger_names = set()
+
+# If True, a message is logged for each row of the input data processed, otherwise only a summary of each file
+_row_messages = False
+
+
+class _SharedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Handler that puts the records of every logger on the shared queue.
+
+    If the process has been forked since the listener was started (e.g. a worker process), the listener is
+    restarted in the new process with the same settings. Until logging has been configured, the records are handled
+    as the logging module handles records without a handler (warnings and errors are written to stderr).
+    """
+
+    def enqueue(self, record):
+        if _settings is None:
+            if record.levelno >= logging.lastResort.level:
+                logging.lastResort.handle(record)
+            return
+        if _listener_pid != os.getpid():
+            configure_logging(**_settings)
+        _queue.put_nowait(record)
+
+
+# Handler shared by every logger
+_queue_handler = _SharedQueueHandler(_queue)
+
+
+def configure_logging(log_path=DEFAULT_LOG_PATH, log_level=logging.INFO, console=True, row_messages=False):
+    """
+    Configure the console and file logging for the project (replacing any previous configuration).
+
+    This should be called once by the entry point. The records of every logger are queued and written by a single
+    background thread, so logging doesn't block and the log file is only opened once (when the first record is
+    written).
+
+    :param log_path: Location of the log file (or None not to log to a file).
+    :param log_level: Minimum level of the records written.
+    :param console: If True, log to the console.
+    :param row_messages: If True, log a message for each row of the input data processed (e.g. each new
+        individual), otherwise only log a summary of each file.
+    """
+
+    global _listener, _listener_pid, _settings, _row_messages
+
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+    handlers = []
+    if console:
+        handlers.append(logging.StreamHandler())
+    if log_path is not None:
+        handlers.append(logging.FileHandler(log_path, delay=True))
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setLevel(log_level)
+        handler.setFormatter(formatter)
+
+    _settings = {'log_path': log_path, 'log_level': log_level, 'console': console, 'row_messages': row_messages}
+    _row_messages = row_messages
+
+    # Apply the level to the loggers already initialised
+    for logger_name in _logger_names:
+        logging.getLogger(logger_name).setLevel(log_level)
+
+    _listener = logging.handlers.QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener_pid = os.getpid()
+    _listener.start()
+
+
+def configure_logging_from_config(logging_config):
+    """
+    Configure the logging from the logging section of the config.
+
+    :param logging_config: Dict of the logging config.
+    """
+
+    configure_logging(log_path=logging_config.get('file', DEFAULT_LOG_PATH),
+                      log_level=getattr(logging, logging_config.get('level', 'INFO')),
+                      console=logging_config.get('console', True),
+                      row_messages=logging_config.get('row_messages', False))
+
+
+def row_messages_enabled():
+    """
+    :return: True if a message should be logged for each row of the input data processed.
+    """
+    return _row_messages
+
+
+def stop_logging():
+    """
+    Write any queued records and stop the background listener.
+    """
+
+    global _listener
+
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    _listener = None
+
+
+atexit.register(stop_logging)
 
 
 def initialise_logger(logger_name, log_level=logging.INFO):
     """
-    Initialise the console and file logger for the project.
+    Initialise a logger of the project.
+
+    This is cheap enough to be called when a module is imported: the logger is only attached to the shared queue
+    handler. The console and file handlers and the background listener are created when the entry point configures
+    the logging (see configure_logging).
 
     :param logger_name: Name of the logger.
     :param log_level: Logging level.
@@ -12,22 +144,35 @@ def initialise_logger(logger_name, log_level=logging.INFO):
     # Create a logger for the application
     logger = logging.getLogger(logger_name)
     logger.setLevel(log_level)
+    _logger_names.add(logger_name)
+
+    # Clear the handlers and add the shared handler
+    logger.handlers = [_queue_handler]
+
+    logger.debug("Logging initialised")
+
+
+class SummaryCounter(object):
+    """
+    Counts of the events whilst processing a file, logged as a single summary message rather than a message per row.
+    """
+
+    def __init__(self):
+        """
+        Initialise the counts.
+        """
 
-    # Create a file handler
-    fh = logging.FileHandler('./logs/virology-model.log')
-    fh.setLevel(log_level)
+        self.counts = collections.OrderedDict()
 
-    # Create a console handler to log to the console
-    ch = logging.StreamHandler()
-    ch.setLevel(log_level)
+    def increment(self, name, count=1):
+        """
+        Add to the count of an event.
 
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    ch.setFormatter(formatter)
-    fh.setFormatter(formatter)
+        :param name: Name of the event (e.g. 'new individuals').
+        :param count: Number of occurrences.
+        """
 
-    # Clear the handlers and add the logging handlers
-    logger.handlers = []
-    logger.addHandler(ch)
-    logger.addHandler(fh)
+        self.counts[name] = self.counts.get(name, 0) + count
 
-    logger.info("Logging initialised")
+    def __str__(self):
+        return ", ".join("%d %s" % (count, name) for name, count in self.counts.items())
@@ -0,0 +1,46 @@
+import json
+
+from logger import instrumentation
+
+
+def test_metrics_not_recorded():
+    assert not instrumentation.recording()
+
+    with instrumentation.stage('predict'):
+        pass
+    instrumentation.count('rows_parsed', 10)
+    instrumentation.end_timestep(0)
+
+
+def test_metrics_recorded(tmp_path):
+    metrics_path = str(tmp_path / "metrics.jsonl")
+    instrumentation.start_metrics(metrics_path)
+
+    @instrumentation.stage('estimate')
+    def estimate():
+        return 1
+
+    try:
+        assert instrumentation.recording()
+
+        for timestep, _ in enumerate(instrumentation.timed_iter('load', ['a', 'b'])):
+            with instrumentation.stage('predict'):
+                pass
+            assert estimate() == 1
+            instrumentation.count('rows_parsed', 10)
+            instrumentation.count('rows_parsed', 5)
+            instrumentation.gauge('ess', 12.5)
+            instrumentation.end_timestep(timestep)
+    finally:
+        instrumentation.stop_metrics()
+
+    assert not instrumentation.recording()
+
+    with open(metrics_path) as fp:
+        records = [json.loads(line) for line in fp]
+
+    assert [record['timestep'] for record in records] == [0, 1]
+    for record in records:
+        assert set(record['stages'].keys()) == {'load', 'predict', 'estimate'}
+        assert record['counters'] == {'rows_parsed': 15, 'ess': 12.5}
+        assert record['peak_rss_bytes'] > 0
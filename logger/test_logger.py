@@ -0,0 +1,20 @@
+import subprocess
+import sys
+
+from logger import logger
+
+
+def test_import_does_not_configure_logging():
+    # Importing the modules of the project only attaches their loggers to the queue handler
+    code = "import threading; import model.inference; from logger import logger; " \
+           "assert logger._listener is None and threading.active_count() == 1"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_summary_counter():
+    counter = logger.SummaryCounter()
+    counter.increment('new individuals')
+    counter.increment('changed individuals', 3)
+    counter.increment('new individuals')
+
+    assert str(counter) == "2 new individuals, 3 changed individuals"
@@ -0,0 +1,170 @@
+import statistics
+
+import numpy as np
+
+from model.resampling import resample
+
+
+class ESSAdaptation(object):
+    """
+    Adaptation of the number of particles to the effective sample size (ESS).
+
+    The number of particles is doubled when the ESS falls below a lower fraction of the number of particles (e.g.
+    when an outbreak makes the observations unlikely under most particles) and halved when the ESS is above an upper
+    fraction (when the particles agree with the observations), within the minimum and maximum number of particles.
+    """
+
+    def __init__(self, min_particles, max_particles, lower=0.25, upper=0.9):
+        """
+        Initialise the adaptation.
+
+        :param min_particles: Minimum number of particles.
+        :param max_particles: Maximum number of particles.
+        :param lower: The number of particles is doubled when the ESS is below this fraction of the particles.
+        :param upper: The number of particles is halved when the ESS is above this fraction of the particles.
+        """
+
+        # Preconditions
+        assert type(min_particles) == int and 0 < min_particles <= max_particles
+        assert 0.0 <= lower < upper <= 1.0
+
+        self.min_particles = min_particles
+        self.max_particles = max_particles
+        self.lower = lower
+        self.upper = upper
+
+    def select(self, particle_filter, ess):
+        """
+        Select the particles to keep after the particles have been weighted.
+
+        :param particle_filter: ParticleFilter.
+        :param ess: Effective sample size of the particles.
+        :return: Array of the indices of the selected particles (whose length is the new number of particles), or
+            None if the particles are kept as they are.
+        """
+
+        num_particles = particle_filter.num_particles
+        if ess < self.lower * num_particles:
+            target = 2 * num_particles
+        elif ess > self.upper * num_particles:
+            target = num_particles // 2
+        else:
+            target = num_particles
+        target = min(max(target, self.min_particles), self.max_particles)
+
+        if target == num_particles and ess >= particle_filter.resampling_threshold * num_particles:
+            return None
+
+        return resample(particle_filter.weights, particle_filter.rng, particle_filter.resampling_scheme, target)
+
+
+def kld_bound(num_bins, epsilon, delta):
+    """
+    Number of samples needed so that, with probability 1 - delta, the Kullback-Leibler divergence between the
+    sample-based and true posterior is at most epsilon, when the posterior occupies a number of bins (Fox, 2003).
+
+    :param num_bins: Array of the number of occupied bins.
+    :param epsilon: Maximum Kullback-Leibler divergence.
+    :param delta: Probability the divergence exceeds epsilon.
+    :return: Array of the number of samples.
+    """
+
+    z = statistics.NormalDist().inv_cdf(1.0 - delta)
+    k = np.maximum(np.asarray(num_bins, dtype=np.float64) - 1.0, 1.0)
+    a = 2.0 / (9.0 * k)
+    return np.where(num_bins > 1, k / (2.0 * epsilon) * (1.0 - a + np.sqrt(a) * z) ** 3, 1.0)
+
+
+class KLDAdaptation(object):
+    """
+    KLD-sampling adaptation of the number of particles.
+
+    The particles are resampled one at a time (in a single vectorised draw of the maximum number of particles) until
+    the number drawn exceeds the KLD bound for the number of distinct bins occupied by the particles drawn so far. A
+    bin is a cell of a grid over the parameters and the number of infected individuals, so the number of particles
+    grows when the posterior is spread out (e.g. during an outbreak) and shrinks when it is concentrated.
+    """
+
+    def __init__(self, min_particles, max_particles, epsilon=0.05, delta=0.01, bin_size=0.05, infected_bin_size=10):
+        """
+        Initialise the adaptation.
+
+        :param min_particles: Minimum number of particles.
+        :param max_particles: Maximum number of particles.
+        :param epsilon: Maximum Kullback-Leibler divergence.
+        :param delta: Probability the divergence exceeds epsilon.
+        :param bin_size: Width of a bin of each parameter.
+        :param infected_bin_size: Width of a bin of the number of infected individuals.
+        """
+
+        # Preconditions
+        assert type(min_particles) == int and 0 < min_particles <= max_particles
+        assert epsilon > 0.0
+        assert 0.0 < delta < 1.0
+
+        self.min_particles = min_particles
+        self.max_particles = max_particles
+        self.epsilon = epsilon
+        self.delta = delta
+        self.bin_size = bin_size
+        self.infected_bin_size = infected_bin_size
+
+    def select(self, particle_filter, ess):
+        """
+        Select the particles to keep after the particles have been weighted.
+
+        :param particle_filter: ParticleFilter.
+        :param ess: Effective sample size of the particles (not used, the particles are always resampled).
+        :return: Array of the indices of the selected particles (whose length is the new number of particles).
+        """
+
+        # Draws in a random order, so that any prefix of the draws is itself a sample
+        indices = particle_filter.rng.choice(particle_filter.num_particles, self.max_particles,
+                                             p=particle_filter.weights)
+
+        # Bin of each particle drawn
+        num_infected = np.count_nonzero(particle_filter.states, axis=1)
+        bins = np.column_stack([np.floor(particle_filter.parameters[indices] / self.bin_size),
+                                num_infected[indices] // self.infected_bin_size]).astype(np.int64)
+
+        # Number of distinct bins among the first n draws, for each n
+        _, first_draws = np.unique(bins, axis=0, return_index=True)
+        is_first = np.zeros(self.max_particles, dtype=bool)
+        is_first[first_draws] = True
+        num_bins = np.cumsum(is_first)
+
+        # Stop at the first number of draws that exceeds the bound
+        num_draws = np.arange(1, self.max_particles + 1)
+        enough = (num_draws >= kld_bound(num_bins, self.epsilon, self.delta)) & (num_draws >= self.min_particles)
+        num_particles = int(np.argmax(enough)) + 1 if np.any(enough) else self.max_particles
+
+        return indices[:num_particles]
+
+
+def create_adaptation(adaptation_config):
+    """
+    Create the adaptation of the number of particles from the config.
+
+    :param adaptation_config: Dict of the adaptation config (or None for a fixed number of particles).
+    :return: ESSAdaptation, KLDAdaptation or None.
+    """
+
+    if adaptation_config is None:
+        return None
+
+    method = adaptation_config.get('method', 'ess')
+    min_particles = adaptation_config['min_particles']
+    max_particles = adaptation_config['max_particles']
+
+    if method == 'ess':
+        return ESSAdaptation(min_particles, max_particles,
+                             lower=adaptation_config.get('lower', 0.25),
+                             upper=adaptation_config.get('upper', 0.9))
+    elif method == 'kld':
+        return KLDAdaptation(min_particles, max_particles,
+                             epsilon=adaptation_config.get('epsilon', 0.05),
+                             delta=adaptation_config.get('delta', 0.01),
+                             bin_size=adaptation_config.get('bin_size', 0.05),
+                             infected_bin_size=adaptation_config.get('infected_bin_size', 10))
+
+    raise ValueError("Unknown method of adaptation: %s" % method)
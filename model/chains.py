@@ -0,0 +1,207 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from logger import logger
+from model.inference import InferenceEngine, create_particle_filter
+from model.particle_filter import ParticleFilter
+
+# Initialise the module logger
+logger.initialise_logger("chains", log_level=logging.INFO)
+module_logger = logging.getLogger('chains')
+
+# Parsed data of each timestep, set in each worker process when the pool starts
+_data = None
+
+
+class ChainResult(object):
+    """
+    Result of a single run (chain) of the particle filter over every timestep.
+    """
+
+    def __init__(self, chain, inference_config, timesteps, expected_infected, parameter_means, infection_probability,
+                 log_marginal_likelihood):
+        """
+        Initialise the result.
+
+        :param chain: Index of the chain.
+        :param inference_config: Dict of the inference config of the chain.
+        :param timesteps: List of the timesteps processed.
+        :param expected_infected: Array of the expected number infected at each timestep.
+        :param parameter_means: (timesteps x parameters) array of the mean of each parameter at each timestep.
+        :param infection_probability: Array of the per-individual infection probability at the last timestep.
+        :param log_marginal_likelihood: Log of the estimate of the marginal likelihood of the data.
+        """
+
+        self.chain = chain
+        self.inference_config = inference_config
+        self.timesteps = timesteps
+        self.expected_infected = expected_infected
+        self.parameter_means = parameter_means
+        self.infection_probability = infection_probability
+        self.log_marginal_likelihood = log_marginal_likelihood
+
+
+class ChainSummary(object):
+    """
+    Summary of the posterior estimates across a set of chains: the mean and standard deviation between the chains of
+    each estimate.
+    """
+
+    def __init__(self, results):
+        """
+        Summarise the results of the chains.
+
+        :param results: List of ChainResult (each of which processed the same timesteps).
+        """
+
+        # Preconditions
+        assert len(results) > 0
+        for result in results:
+            assert result.timesteps == results[0].timesteps
+
+        self.num_chains = len(results)
+        self.timesteps = results[0].timesteps
+        self.parameter_names = ParticleFilter.PARAMETER_NAMES
+
+        expected_infected = np.stack([result.expected_infected for result in results])
+        self.expected_infected_mean = np.mean(expected_infected, axis=0)
+        self.expected_infected_std = np.std(expected_infected, axis=0)
+
+        parameter_means = np.stack([result.parameter_means for result in results])
+        self.parameter_mean = np.mean(parameter_means, axis=0)
+        self.parameter_std = np.std(parameter_means, axis=0)
+
+        infection_probability = np.stack([result.infection_probability for result in results])
+        self.infection_probability_mean = np.mean(infection_probability, axis=0)
+        self.infection_probability_std = np.std(infection_probability, axis=0)
+
+        self.log_marginal_likelihoods = np.array([result.log_marginal_likelihood for result in results])
+
+    def final_parameters(self):
+        """
+        :return: Dict of parameter name -> (mean, standard deviation) between the chains at the last timestep.
+        """
+
+        return {name: (self.parameter_mean[-1, index], self.parameter_std[-1, index])
+                for index, name in enumerate(self.parameter_names)}
+
+    def __str__(self):
+        parameters = ", ".join("%s = %.4f (sd %.4f)" % (name, mean, std)
+                               for name, (mean, std) in self.final_parameters().items())
+        return "%d chains: expected number infected = %.1f (sd %.1f), %s, log marginal likelihood = %.1f (sd %.1f)" % \
+            (self.num_chains, self.expected_infected_mean[-1], self.expected_infected_std[-1], parameters,
+             np.mean(self.log_marginal_likelihoods), np.std(self.log_marginal_likelihoods))
+
+
+def create_chain_configs(inference_config, num_chains, num_particles=None, seed=None):
+    """
+    Create the inference config of each chain, each with its own seed (and optionally its own number of particles).
+
+    :param inference_config: Dict of the inference config shared by the chains.
+    :param num_chains: Number of chains.
+    :param num_particles: Optional number of particles of each chain (an int for every chain or a list with one per
+        chain). Defaults to the number in the inference config.
+    :param seed: Seed from which the seeds of the chains are derived (defaults to the seed of the inference config).
+    :return: List of dicts of the inference config of each chain.
+    """
+
+    # Preconditions
+    assert type(num_chains) == int and num_chains > 0
+    assert num_particles is None or type(num_particles) == int or len(num_particles) == num_chains
+
+    if seed is None:
+        seed = inference_config.get('seed')
+    if num_particles is None or type(num_particles) == int:
+        num_particles = [num_particles] * num_chains
+
+    chain_configs = []
+    for chain_seed, chain_particles in zip(np.random.SeedSequence(seed).spawn(num_chains), num_particles):
+        chain_config = dict(inference_config)
+        chain_config['seed'] = int(chain_seed.generate_state(1)[0])
+        chain_config['max_workers'] = 1
+        if chain_particles is not None:
+            chain_config['num_particles'] = chain_particles
+        chain_configs.append(chain_config)
+
+    return chain_configs
+
+
+def run_chains(data, chain_configs, converters={}, max_workers=None):
+    """
+    Run independent chains of the particle filter over the same data.
+
+    The data is parsed once and shared by the worker processes: where processes are forked, each worker inherits the
+    parent's copy of the data (which is only read, so it isn't copied), otherwise it is sent once to each worker
+    rather than once per chain.
+
+    :param data: List of TimestepData in timestep order.
+    :param chain_configs: List of dicts of the inference config of each chain (see create_chain_configs).
+    :param converters: Dict of functions (attribute name -> function) to convert the individuals' data.
+    :param max_workers: Maximum number of worker processes (defaults to the number of CPUs). If 1, the chains are run
+        in this process.
+    :return: List of ChainResult in the order of the chain configs.
+    """
+
+    # Preconditions
+    assert max_workers is None or (type(max_workers) == int and max_workers > 0)
+
+    module_logger.info("Running %d chains over %d timesteps" % (len(chain_configs), len(data)))
+
+    arguments = [(chain, chain_config, converters) for chain, chain_config in enumerate(chain_configs)]
+
+    if max_workers == 1 or len(chain_configs) <= 1:
+        _set_data(data)
+        try:
+            results = list(map(_run_chain, arguments))
+        finally:
+            _set_data(None)
+    else:
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_set_data,
+                                 initargs=(data,)) as executor:
+            results = list(executor.map(_run_chain, arguments))
+
+    return results
+
+
+def _set_data(data):
+    """
+    Set the data of each timestep used by the chains (run when a worker process starts).
+
+    :param data: List of TimestepData.
+    """
+
+    global _data
+    _data = data
+
+
+def _run_chain(arguments):
+    """
+    Run a chain of the particle filter over the data of every timestep (run by a worker process).
+
+    :param arguments: Tuple of the index of the chain, the dict of its inference config and the converters.
+    :return: ChainResult.
+    """
+
+    chain, inference_config, converters = arguments
+
+    engine = InferenceEngine(create_particle_filter(inference_config), converters=converters)
+    try:
+        for timestep_data in _data:
+            engine.process(timestep_data)
+    finally:
+        engine.particle_filter.close()
+
+    timesteps = [timestep for timestep, _, _ in engine.estimates]
+    expected_infected = np.array([np.sum(infection_probability) for _, infection_probability, _ in engine.estimates])
+    parameter_means = np.array([[means[name] for name in ParticleFilter.PARAMETER_NAMES]
+                                for _, _, means in engine.estimates])
+
+    module_logger.info("Chain %d: log marginal likelihood = %.1f" %
+                       (chain, engine.particle_filter.log_marginal_likelihood))
+
+    return ChainResult(chain, inference_config, timesteps, expected_infected, parameter_means,
+                       engine.estimates[-1][1], engine.particle_filter.log_marginal_likelihood)
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+
+from logger import logger
+from model.inference import InferenceEngine
+
+logger.initialise_logger("checkpoint", log_level=logging.INFO)
+module_logger = logging.getLogger('checkpoint')
+
+# Name of the folder holding the latest checkpoint (within the checkpoint directory)
+CHECKPOINT_FOLDER = 'latest'
+
+# Name of the file holding the metadata of a checkpoint
+METADATA_FILENAME = 'metadata.json'
+
+
+def _array_filename(component, name):
+    """
+    Get the name of the .npy file of an array.
+
+    :param component: Name of the component (e.g. particle_filter).
+    :param name: Name of the array.
+    :return: File name.
+    """
+
+    return "%s-%s.npy" % (component, name.replace(':', '.'))
+
+
+def save_checkpoint(directory, engine):
+    """
+    Save the state of an inference engine to a checkpoint.
+
+    Each array is saved as a .npy file, so that it can be memory-mapped when the checkpoint is loaded (or inspected
+    by another process). The checkpoint is written to a temporary folder and then moved into place, so the latest
+    checkpoint is always complete even if the process dies whilst saving.
+
+    :param directory: Checkpoint directory.
+    :param engine: InferenceEngine.
+    """
+
+    # Preconditions
+    assert type(directory) == str
+
+    os.makedirs(directory, exist_ok=True)
+    temporary_folder = os.path.join(directory, CHECKPOINT_FOLDER + '.tmp')
+    if os.path.isdir(temporary_folder):
+        shutil.rmtree(temporary_folder)
+    os.makedirs(temporary_folder)
+
+    metadata = {}
+    for component, (arrays, component_metadata) in engine.to_checkpoint().items():
+        for name, array in arrays.items():
+            np.save(os.path.join(temporary_folder, _array_filename(component, name)), array, allow_pickle=False)
+        metadata[component] = {'arrays': list(arrays.keys()), 'metadata': component_metadata}
+
+    with open(os.path.join(temporary_folder, METADATA_FILENAME), 'w') as fp:
+        json.dump(metadata, fp)
+
+    # Replace the previous checkpoint
+    checkpoint_folder = os.path.join(directory, CHECKPOINT_FOLDER)
+    previous_folder = os.path.join(directory, CHECKPOINT_FOLDER + '.old')
+    if os.path.isdir(checkpoint_folder):
+        if os.path.isdir(previous_folder):
+            shutil.rmtree(previous_folder)
+        os.rename(checkpoint_folder, previous_folder)
+    os.rename(temporary_folder, checkpoint_folder)
+    if os.path.isdir(previous_folder):
+        shutil.rmtree(previous_folder)
+
+    module_logger.info("Saved checkpoint of timestep %s to: %s" % (engine.last_timestep, checkpoint_folder))
+
+
+def checkpoint_exists(directory):
+    """
+    Check whether a directory holds a checkpoint.
+
+    :param directory: Checkpoint directory.
+    :return: True if there is a checkpoint.
+    """
+
+    return os.path.isfile(os.path.join(directory, CHECKPOINT_FOLDER, METADATA_FILENAME))
+
+
+def load_arrays(directory, mmap_mode='r'):
+    """
+    Load the arrays of a checkpoint as memory-mapped arrays (e.g. to inspect the particles from another process).
+
+    :param directory: Checkpoint directory.
+    :param mmap_mode: Memory-map mode ('r' for read-only or 'c' for copy-on-write).
+    :return: Tuple of the dict of component name -> (dict of name -> array, dict of metadata).
+    """
+
+    checkpoint_folder = os.path.join(directory, CHECKPOINT_FOLDER)
+    with open(os.path.join(checkpoint_folder, METADATA_FILENAME), 'r') as fp:
+        metadata = json.load(fp)
+
+    components = {}
+    for component, component_metadata in metadata.items():
+        arrays = {}
+        for name in component_metadata['arrays']:
+            filepath = os.path.join(checkpoint_folder, _array_filename(component, name))
+            arrays[name] = np.load(filepath, mmap_mode=mmap_mode, allow_pickle=False)
+        components[component] = (arrays, component_metadata['metadata'])
+
+    return components
+
+
+def load_checkpoint(directory, converters={}, propagator=None):
+    """
+    Restore an inference engine from the latest checkpoint.
+
+    The arrays are memory-mapped copy-on-write, so they are only read into memory as they are used.
+
+    :param directory: Checkpoint directory.
+    :param converters: Dict of functions (attribute name -> function) to convert the individuals' data.
+    :param propagator: Optional propagator of the particles of the particle filter.
+    :return: InferenceEngine.
+    """
+
+    if not checkpoint_exists(directory):
+        raise ValueError("No checkpoint found in: %s" % directory)
+
+    engine = InferenceEngine.from_checkpoint(load_arrays(directory, mmap_mode='c'), converters, propagator)
+    module_logger.info("Loaded checkpoint of timestep %s from: %s" % (engine.last_timestep, directory))
+
+    return engine
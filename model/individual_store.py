@@ -0,0 +1,508 @@
+import datetime
+
+import numpy as np
+
+from etl.converters import to_dates
+
+
+class IndividualStore(object):
+    """
+    Columnar store of the attributes of the individuals.
+
+    Each individual is allocated a row when first seen (held in the ID -> row index). Each attribute is held in a
+    single NumPy array indexed by row:
+
+    - categorical attributes (e.g. `location`) are held as integer codes into a list of categories;
+    - date attributes (e.g. `dob` and `dod`) are held as datetime64[D] (NaT if the date is not known);
+    - all other attributes are held as object arrays.
+    """
+
+    # Attributes held as integer codes
+    CATEGORICAL_ATTRIBUTES = ('location',)
+
+    # Attributes held as dates
+    DATE_ATTRIBUTES = ('dob', 'dod')
+
+    # Code used for a missing categorical value
+    MISSING_CODE = -1
+
+    # Format of a date held as a string
+    DATE_FORMAT = '%d/%m/%Y'
+
+    # Value of a date that isn't known
+    NO_DATE = 'None'
+
+    # Initial number of rows allocated
+    INITIAL_CAPACITY = 1024
+
+    # Type of the values of an object attribute -> (dtype, fill value of a missing value) of the attribute in a
+    # checkpoint
+    VALUE_TYPES = {
+        'integer': (np.int64, 0),
+        'number': (np.float64, np.nan),
+        'date': ('datetime64[D]', None),
+        'string': (str, '')
+    }
+
+    def __init__(self):
+        """
+        Initialise an empty store.
+        """
+
+        # Number of individuals held
+        self.size = 0
+
+        # Dictionary of individual ID (key) to row (value) and the ID of each row
+        self.id_to_row = {}
+        self._ids = np.empty(IndividualStore.INITIAL_CAPACITY, dtype=object)
+
+        # Dictionary of attribute name (key) to the array of values (value)
+        self._columns = {}
+
+        # Categories of each categorical attribute (as a list indexed by code and a dict of category -> code)
+        self.categories = {}
+        self._category_to_code = {}
+
+    @property
+    def capacity(self):
+        return self._ids.shape[0]
+
+    @property
+    def ids(self):
+        """
+        :return: Array of the ID of each individual, indexed by row.
+        """
+        return self._ids[:self.size]
+
+    @property
+    def attribute_names(self):
+        return list(self._columns.keys())
+
+    def column(self, name):
+        """
+        Get the values of an attribute for all individuals (as held, i.e. codes for a categorical attribute).
+
+        :param name: Name of the attribute.
+        :return: Array of values indexed by row.
+        """
+
+        return self._columns[name][:self.size]
+
+    def decoded_column(self, name):
+        """
+        Get the values of an attribute for all individuals, with categorical codes decoded to their categories.
+
+        :param name: Name of the attribute.
+        :return: Array of values indexed by row.
+        """
+
+        values = self.column(name)
+        if name not in self.categories:
+            return values
+
+        # Decode the categories (the final element holds the value of a missing code)
+        lookup = np.array(self.categories[name] + [None], dtype=object)
+        return lookup[values]
+
+    def rows(self, individual_ids, create=True):
+        """
+        Get the row of each individual.
+
+        :param individual_ids: Sequence of individual IDs.
+        :param create: If True, allocate a row to each individual that hasn't been seen before, otherwise their row
+            is -1.
+        :return: Array of rows.
+        """
+
+        rows = np.empty(len(individual_ids), dtype=np.int64)
+        new_ids = []
+
+        for index, individual_id in enumerate(individual_ids):
+            row = self.id_to_row.get(individual_id)
+            if row is None:
+                if not create:
+                    row = -1
+                else:
+                    row = self.size + len(new_ids)
+                    self.id_to_row[individual_id] = row
+                    new_ids.append(individual_id)
+            rows[index] = row
+
+        if len(new_ids) > 0:
+            self._reserve(self.size + len(new_ids))
+            self._ids[self.size:self.size + len(new_ids)] = new_ids
+            self.size += len(new_ids)
+
+        return rows
+
+    def update(self, individual_ids, columns):
+        """
+        Update (or add) the individuals.
+
+        :param individual_ids: Sequence of individual IDs.
+        :param columns: Dict of attribute name -> sequence of values (one per individual).
+        :return: Array of the rows of the individuals.
+        """
+
+        rows = self.rows(individual_ids)
+        self.update_rows(rows, columns)
+        return rows
+
+    def update_changes(self, individual_ids, columns):
+        """
+        Update (or add) the individuals, only writing the values that have changed.
+
+        The values are compared with those held (once encoded), so an individual whose attributes are the same as at
+        the previous timestep isn't touched.
+
+        :param individual_ids: Sequence of individual IDs.
+        :param columns: Dict of attribute name -> sequence of values (one per individual).
+        :return: ChangeSet.
+        """
+
+        previous_size = self.size
+        rows = self.rows(individual_ids)
+        new = rows >= previous_size
+
+        changed_rows = {}
+        for name, values in columns.items():
+            assert len(values) == rows.shape[0]
+
+            if name not in self._columns:
+                self._add_column(name)
+
+            encoded = self._encode(name, values)
+            differs = ~new & ~_equal(self._columns[name][rows], encoded)
+            write = new | differs
+
+            self._columns[name][rows[write]] = encoded[write]
+            changed_rows[name] = np.unique(rows[differs])
+
+        return ChangeSet(rows, np.unique(rows[new]), changed_rows, self)
+
+    def update_rows(self, rows, columns):
+        """
+        Update the attributes of the individuals with the given rows.
+
+        :param rows: Array of rows.
+        :param columns: Dict of attribute name -> sequence of values (one per row).
+        """
+
+        for name, values in columns.items():
+            assert len(values) == rows.shape[0]
+
+            if name not in self._columns:
+                self._add_column(name)
+
+            self._columns[name][rows] = self._encode(name, values)
+
+    def get(self, individual_id):
+        """
+        Get the attributes of an individual.
+
+        :param individual_id: ID of the individual.
+        :return: Dict of attribute name -> value.
+        """
+
+        row = self.id_to_row[individual_id]
+        attributes = {}
+        for name in self._columns.keys():
+            value = self._columns[name][row]
+            if name in self.categories:
+                value = None if value == IndividualStore.MISSING_CODE else self.categories[name][value]
+            elif name in IndividualStore.DATE_ATTRIBUTES:
+                value = value.astype(object)
+            attributes[name] = value
+
+        return attributes
+
+    def to_checkpoint(self):
+        """
+        Get the state of the store for a checkpoint.
+
+        Object attributes are held as an array of the type of their values (e.g. int64 for an attribute converted to
+        integers, see etl.converters) with a mask of the missing values, so that every array can be saved and
+        memory-mapped without pickling and the values are restored with the same type.
+
+        :return: Tuple of the dict of name -> array and the dict of JSON-serialisable metadata.
+        """
+
+        arrays = {'ids': self.ids.astype(str)}
+        value_types = {}
+        for name in self._columns.keys():
+            values = self.column(name)
+            if values.dtype == object:
+                missing = values == None  # noqa: E711 (element-wise comparison)
+                value_types[name] = _value_type(values[~missing])
+                dtype, fill_value = IndividualStore.VALUE_TYPES[value_types[name]]
+                arrays['missing:' + name] = missing
+                values = np.where(missing, fill_value, values).astype(dtype)
+            arrays['column:' + name] = values
+
+        metadata = {
+            'attribute_names': self.attribute_names,
+            'categories': self.categories,
+            'value_types': value_types
+        }
+
+        return arrays, metadata
+
+    @classmethod
+    def from_checkpoint(cls, arrays, metadata):
+        """
+        Restore a store from a checkpoint.
+
+        :param arrays: Dict of name -> array.
+        :param metadata: Dict of metadata.
+        :return: IndividualStore.
+        """
+
+        store = cls()
+        store.rows(arrays['ids'].astype(object))
+
+        for name in metadata['attribute_names']:
+            store._add_column(name)
+            values = arrays['column:' + name]
+            if store._columns[name].dtype == object:
+                # Object values are restored as Python objects of their type (e.g. int, float or datetime.date)
+                values = np.where(arrays['missing:' + name], None, values.astype(object))
+            store._columns[name][:store.size] = values
+
+        for name, categories in metadata['categories'].items():
+            store.categories[name] = list(categories)
+            store._category_to_code[name] = {category: code for code, category in enumerate(categories)}
+
+        return store
+
+    def nbytes(self):
+        """
+        Estimate the number of bytes used by the arrays (excluding the objects referenced by object arrays).
+
+        :return: Number of bytes.
+        """
+
+        return self._ids.nbytes + sum(column.nbytes for column in self._columns.values())
+
+    def _add_column(self, name):
+        """
+        Add a column for an attribute, filled with missing values.
+
+        :param name: Name of the attribute.
+        """
+
+        if name in IndividualStore.CATEGORICAL_ATTRIBUTES:
+            column = np.full(self.capacity, IndividualStore.MISSING_CODE, dtype=np.int32)
+            self.categories[name] = []
+            self._category_to_code[name] = {}
+        elif name in IndividualStore.DATE_ATTRIBUTES:
+            column = np.full(self.capacity, np.datetime64('NaT'), dtype='datetime64[D]')
+        else:
+            column = np.full(self.capacity, None, dtype=object)
+
+        self._columns[name] = column
+
+    def _reserve(self, size):
+        """
+        Ensure the arrays can hold the given number of rows (doubling the capacity as required).
+
+        :param size: Required number of rows.
+        """
+
+        if size <= self.capacity:
+            return
+
+        capacity = self.capacity
+        while capacity < size:
+            capacity *= 2
+
+        self._ids = _grow(self._ids, capacity, None)
+        for name, column in self._columns.items():
+            if name in self.categories:
+                fill_value = IndividualStore.MISSING_CODE
+            elif name in IndividualStore.DATE_ATTRIBUTES:
+                fill_value = np.datetime64('NaT')
+            else:
+                fill_value = None
+            self._columns[name] = _grow(column, capacity, fill_value)
+
+    def _encode(self, name, values):
+        """
+        Encode the values of an attribute into the representation held by its column.
+
+        :param name: Name of the attribute.
+        :param values: Sequence of values.
+        :return: Array of encoded values.
+        """
+
+        if name in self.categories:
+            return self._encode_categories(name, values)
+        elif name in IndividualStore.DATE_ATTRIBUTES:
+            return to_datetime64(values)
+
+        encoded = np.empty(len(values), dtype=object)
+        encoded[:] = values
+        return encoded
+
+    def _encode_categories(self, name, values):
+        """
+        Encode the values of a categorical attribute as integer codes (adding any new categories).
+
+        :param name: Name of the attribute.
+        :param values: Sequence of values (None if missing).
+        :return: Array of codes.
+        """
+
+        values = np.asarray(values, dtype=object)
+        codes = np.full(values.shape[0], IndividualStore.MISSING_CODE, dtype=np.int32)
+
+        present = values != None  # noqa: E711 (element-wise comparison)
+        if not np.any(present):
+            return codes
+
+        # Encode each distinct value once
+        unique_values, inverse = np.unique(values[present].astype(str), return_inverse=True)
+        category_to_code = self._category_to_code[name]
+        unique_codes = np.empty(unique_values.shape[0], dtype=np.int32)
+        for index, value in enumerate(unique_values.tolist()):
+            code = category_to_code.get(value)
+            if code is None:
+                code = len(self.categories[name])
+                category_to_code[value] = code
+                self.categories[name].append(value)
+            unique_codes[index] = code
+
+        codes[present] = unique_codes[inverse]
+        return codes
+
+
+class ChangeSet(object):
+    """
+    Changes made to the individuals by an update: the individuals added and, for each attribute, the existing
+    individuals whose value changed.
+    """
+
+    # Attribute holding an individual's location and date of death
+    LOCATION_ATTRIBUTE = 'location'
+    DATE_OF_DEATH_ATTRIBUTE = 'dod'
+
+    def __init__(self, rows, new_rows, changed_rows, store):
+        """
+        Initialise the change set.
+
+        :param rows: Array of the row of each individual in the update.
+        :param new_rows: Array of the rows of the individuals added.
+        :param changed_rows: Dict of attribute name -> array of the rows of the existing individuals whose value of
+            the attribute changed.
+        :param store: IndividualStore to which the update was applied.
+        """
+
+        self.rows = rows
+        self.new_rows = new_rows
+        self.changed_rows = changed_rows
+
+        # Existing individuals whose date of death has become known
+        died_rows = changed_rows.get(ChangeSet.DATE_OF_DEATH_ATTRIBUTE, np.empty(0, dtype=np.int64))
+        if died_rows.shape[0] > 0:
+            died_rows = died_rows[~np.isnat(store.column(ChangeSet.DATE_OF_DEATH_ATTRIBUTE)[died_rows])]
+        self.died_rows = died_rows
+
+    @property
+    def moved_rows(self):
+        """
+        :return: Array of the rows of the existing individuals whose location changed.
+        """
+        return self.changed_rows.get(ChangeSet.LOCATION_ATTRIBUTE, np.empty(0, dtype=np.int64))
+
+    @property
+    def updated_rows(self):
+        """
+        :return: Array of the rows of the existing individuals with any change.
+        """
+        if len(self.changed_rows) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(list(self.changed_rows.values())))
+
+    def __str__(self):
+        return "%d new, %d changed, %d moved, %d died" % (self.new_rows.shape[0], self.updated_rows.shape[0],
+                                                           self.moved_rows.shape[0], self.died_rows.shape[0])
+
+
+def _value_type(values):
+    """
+    Get the type of the values of an object attribute.
+
+    :param values: Object array of values (none of which are missing).
+    :return: Name of the type in IndividualStore.VALUE_TYPES (string unless every value is of the type).
+    """
+
+    types = set(type(value) for value in values.tolist())
+    if len(types) == 0:
+        return 'string'
+    elif types <= {int}:
+        return 'integer'
+    elif types <= {int, float}:
+        return 'number'
+    elif types == {datetime.date}:
+        return 'date'
+
+    return 'string'
+
+
+def _equal(a, b):
+    """
+    Element-wise comparison of two arrays of values, where missing dates (NaT) are equal.
+
+    :param a: Array.
+    :param b: Array.
+    :return: Boolean array.
+    """
+
+    equal = a == b
+    if np.issubdtype(a.dtype, np.datetime64):
+        equal |= np.isnat(a) & np.isnat(b)
+    return equal
+
+
+def _grow(array, capacity, fill_value):
+    """
+    Copy an array into a larger array.
+
+    :param array: Array to grow.
+    :param capacity: New length of the array.
+    :param fill_value: Value of the new elements.
+    :return: New array.
+    """
+
+    grown = np.full(capacity, fill_value, dtype=array.dtype)
+    grown[:array.shape[0]] = array
+    return grown
+
+
+def to_datetime64(values):
+    """
+    Convert a sequence of dates to a datetime64[D] array.
+
+    Each date may be a datetime.date, a datetime64, None or a string of the form DD/MM/YYYY (or 'None').
+
+    :param values: Sequence of dates.
+    :return: datetime64[D] array (NaT where the date isn't known).
+    """
+
+    if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[D]')
+
+    # Columns of strings are parsed in bulk
+    if (isinstance(values, np.ndarray) and values.dtype.kind == 'U') or \
+            all(value is None or isinstance(value, str) for value in values):
+        return to_dates(values)
+
+    converted = np.empty(len(values), dtype='datetime64[D]')
+    for index, value in enumerate(values):
+        if value is None or (isinstance(value, str) and value == IndividualStore.NO_DATE):
+            converted[index] = np.datetime64('NaT')
+        elif isinstance(value, str):
+            converted[index] = datetime.datetime.strptime(value, IndividualStore.DATE_FORMAT).date()
+        else:
+            converted[index] = value
+
+    return converted
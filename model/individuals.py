@@ -1,7 +1,11 @@
 import logging
 
+import numpy as np
+
+from etl.converters import as_column_converters
 from etl.csv_reader import DelimitedSource
 from logger import logger
+from model.individual_store import ChangeSet, IndividualStore
 
 logger.initialise_logger("individuals", log_level=logging.INFO)
 module_logger = logging.getLogger('individuals')
@@ -20,12 +24,24 @@ class Individuals(object):
         # Timestep for the data
         self.timestep = None
 
-        # Dictionary of individuals
-        self.individual_to_attributes = {}
+        # Columnar store of the individuals' attributes
+        self.store = IndividualStore()
 
         # Set of expected attributes for each individual
         self.expected_attributes = set()
 
+    @property
+    def individual_to_attributes(self):
+        """
+        Build a dictionary of individual ID (key) to a dict of their attributes (value).
+
+        This is intended for inspection and testing; the model should use the columnar store directly.
+
+        :return: Dictionary of individuals.
+        """
+
+        return {individual_id: self.store.get(individual_id) for individual_id in self.store.ids}
+
     def update_individual(self, individual):
         """
         Update an individual.
@@ -44,8 +60,9 @@ class Individuals(object):
         keys_without_id.remove(Individuals.ID_FIELD_NAME)
 
         # If this is the first individual, then update the expected attributes, otherwise check the attributes
-        if len(self.individual_to_attributes) > 0:
-            module_logger.debug("Updating individual with ID: %s" % individual_id)
+        if self.store.size > 0:
+            if logger.row_messages_enabled():
+                module_logger.debug("Updating individual with ID: %s", individual_id)
             assert keys_without_id == self.expected_attributes
         else:
             module_logger.info("First individual found with ID: %s" % individual_id)
@@ -53,11 +70,33 @@ class Individuals(object):
             self.expected_attributes = keys_without_id
 
         # Update the individual
-        individual_without_id = individual.copy()
-        del individual_without_id[Individuals.ID_FIELD_NAME]
-        self.individual_to_attributes[individual_id] = individual_without_id
+        self.store.update([individual_id], {key: [individual[key]] for key in keys_without_id})
+
+    def update_individuals(self, individual_ids, columns):
+        """
+        Update (or add) a batch of individuals.
+
+        Only the individuals whose attributes differ from those held are written to the columnar store.
+
+        :param individual_ids: Sequence of the individuals' IDs.
+        :param columns: Dict of attribute name -> sequence of values (one per individual).
+        :return: ChangeSet of the individuals added and changed.
+        """
+
+        # Preconditions
+        assert Individuals.ID_FIELD_NAME not in columns
+
+        # If these are the first individuals, then update the expected attributes, otherwise check the attributes
+        attributes = set(columns.keys())
+        if self.store.size > 0:
+            assert attributes == self.expected_attributes
+        else:
+            module_logger.info("Expected attributes of an individual: %s" % str(attributes))
+            self.expected_attributes = attributes
+
+        return self.store.update_changes(individual_ids, columns)
 
-    def update_from_file(self, timestep, filepath, delimiter, encapsulator, encoding, converters={}):
+    def update_from_file(self, timestep, filepath, delimiter, encapsulator, encoding, converters={}, cache=None):
         """
         Update (or add) the individuals based on data in a file.
 
@@ -66,7 +105,11 @@ class Individuals(object):
         :param delimiter: Delimiter used within the file.
         :param encapsulator: Encapsulator used within the file.
         :param encoding: Encoding of the file.
-        :param converters: Dict of functions (attribute name -> function) to convert the data to the required type.
+        :param converters: Dict of functions (attribute name -> function converting a column of values) to convert the
+            data to the required type (see etl.converters). A function that isn't marked as a column converter is
+            applied to each value in turn.
+        :param cache: Optional ColumnCache of the parsed file.
+        :return: ChangeSet of the individuals added and changed.
         """
 
         # Preconditions
@@ -85,27 +128,51 @@ class Individuals(object):
         reader = DelimitedSource(filepath=filepath,
                                  delimiter=delimiter,
                                  encapsulator=encapsulator,
-                                 encoding=encoding)
+                                 encoding=encoding,
+                                 cache=cache)
 
-        # Walk through each row of data
-        num_individuals_processed = 0
-        for line in reader.read():
+        # Read the individuals into columns (the individuals data must contain a unique identifier and the data
+        # required by the converters)
+        columns = reader.read_columns(required_fields=[Individuals.ID_FIELD_NAME] + list(converters.keys()))
+        return self.update_from_columns(timestep, columns, converters)
 
-            # The individuals data must contain a unique identifier
-            assert Individuals.ID_FIELD_NAME in line
+    def update_from_columns(self, timestep, columns, converters={}):
+        """
+        Update (or add) the individuals based on data already read into columns.
 
-            # Apply the required conversions
-            for key in converters.keys():
+        :param timestep: Timestep to which the data corresponds.
+        :param columns: Dict of field name -> array of (string) values, including the ID field.
+        :param converters: Dict of functions (attribute name -> function converting a column of values) to convert the
+            data to the required type (see etl.converters). A function that isn't marked as a column converter is
+            applied to each value in turn.
+        :return: ChangeSet of the individuals added and changed.
+        """
 
-                # Check that the converter has the required data from the file
-                assert key in line.keys()
+        # Preconditions
+        assert type(timestep) == int
+        assert Individuals.ID_FIELD_NAME in columns
+        for key in converters.keys():
+            assert key in columns
 
-                # Apply the conversion
-                line[key] = converters[key](line[key])
+        # Update the timestep to which the data corresponds
+        self.timestep = timestep
+
+        columns = dict(columns)
+        individual_ids = columns.pop(Individuals.ID_FIELD_NAME)
+
+        if len(individual_ids) > 0:
 
-            # Update the individual
-            self.update_individual(line)
+            # Apply the required conversions (each to a whole column)
+            converters = as_column_converters(converters)
+            for key in converters.keys():
+                columns[key] = converters[key](columns[key])
+
+            # Update the individuals
+            changes = self.update_individuals(individual_ids, columns)
+        else:
+            no_rows = np.empty(0, dtype=np.int64)
+            changes = ChangeSet(no_rows, no_rows, {}, self.store)
 
-            num_individuals_processed += 1
+        module_logger.info("Processed %d individuals (%s)" % (len(individual_ids), str(changes)))
 
-        module_logger.info("Processed %d individuals" % num_individuals_processed)
+        return changes
@@ -0,0 +1,302 @@
+import logging
+
+import numpy as np
+
+from logger import logger
+from model.individual_store import IndividualStore
+
+logger.initialise_logger("infection-history", log_level=logging.INFO)
+module_logger = logging.getLogger('infection-history')
+
+
+class InfectionHistory(object):
+    """
+    Infection strain of every individual at every timestep.
+
+    The strains are dictionary-encoded as small integer codes (0 is no infection) and held in a dense
+    (timesteps x individuals) matrix, so the strain of any individual at any timestep is a single array lookup and
+    the infection state of all individuals at a timestep is a contiguous row.
+
+    The columns of the matrix follow the rows of an ID -> row index (normally the IndividualStore of the Individuals,
+    so that the columns line up with the individuals axis of the particle filter).
+
+    If an individual does not appear in the data for a timestep, they are assumed to have their previous state. If
+    they have not been seen before, then they are assumed not to be infected.
+    """
+
+    # Code of no infection
+    NO_INFECTION_CODE = 0
+
+    # Code of an individual not observed at a timestep (only used whilst building the matrix)
+    NOT_OBSERVED_CODE = -1
+
+    # Initial number of rows (timesteps) and columns (individuals) allocated when appending
+    INITIAL_CAPACITY = (16, 1024)
+
+    def __init__(self, index=None, dtype=np.int16, window=None):
+        """
+        Initialise an empty infection history.
+
+        :param index: ID -> row index (an IndividualStore) used to allocate the column of each individual.
+        :param dtype: Integer type of the strain codes.
+        :param window: Maximum number of timesteps retained when appending (the rows of the oldest timesteps are
+            reused), or None to retain every timestep.
+        """
+
+        # Preconditions
+        assert np.issubdtype(dtype, np.signedinteger)
+        assert window is None or (type(window) == int and window > 0)
+
+        self.index = IndividualStore() if index is None else index
+        self.dtype = np.dtype(dtype)
+        self.window = window
+
+        # Timestep of each row of the matrix
+        self.timesteps = []
+        self.timestep_to_row = {}
+
+        # Strain of each code
+        self.strains = [None]
+        self._strain_to_code = {}
+
+        # Matrix of strain codes
+        self.matrix = np.zeros(InfectionHistory.INITIAL_CAPACITY, dtype=self.dtype)
+
+    @property
+    def num_timesteps(self):
+        return len(self.timesteps)
+
+    @classmethod
+    def from_frames(cls, frames, index=None, dtype=np.int16, memmap_path=None):
+        """
+        Build the infection history from the infection data of every timestep in one vectorized pass.
+
+        :param frames: List of (timestep, individual IDs, strains) tuples, where a strain is None if the individual
+            isn't infected.
+        :param index: ID -> row index (an IndividualStore) used to allocate the column of each individual.
+        :param dtype: Integer type of the strain codes.
+        :param memmap_path: Optional path of a .npy file in which to hold the matrix as a memory-mapped array.
+        :return: InfectionHistory.
+        """
+
+        history = cls(index=index, dtype=dtype)
+        frames = sorted(frames, key=lambda frame: frame[0])
+
+        # Encode the individuals and strains of each timestep
+        encoded = []
+        for timestep, individual_ids, strains in frames:
+            encoded.append((history.index.rows(individual_ids), history.encode_strains(strains)))
+            history._add_timestep(timestep)
+
+        # Scatter the observations into the matrix
+        shape = (len(frames), history.index.size)
+        observed = np.full(shape, InfectionHistory.NOT_OBSERVED_CODE, dtype=history.dtype)
+        for row, (columns, codes) in enumerate(encoded):
+            observed[row, columns] = codes
+
+        # Fill forward: find the last row at (or before) each row in which each individual was observed
+        row_numbers = np.arange(shape[0], dtype=np.int32)[:, np.newaxis]
+        last_observed = np.maximum.accumulate(np.where(observed != InfectionHistory.NOT_OBSERVED_CODE,
+                                                       row_numbers, 0), axis=0)
+        filled = np.take_along_axis(observed, last_observed, axis=0)
+
+        # Individuals not observed at or before a timestep are not infected
+        filled[filled == InfectionHistory.NOT_OBSERVED_CODE] = InfectionHistory.NO_INFECTION_CODE
+
+        if memmap_path is None:
+            history.matrix = filled
+        else:
+            history.matrix = np.lib.format.open_memmap(memmap_path, mode='w+', dtype=history.dtype, shape=shape)
+            history.matrix[:] = filled
+            history.matrix.flush()
+
+        module_logger.info("Built infection history of %d timesteps and %d individuals with %d strains" %
+                           (shape[0], shape[1], len(history.strains) - 1))
+
+        return history
+
+    def append(self, timestep, individual_ids, strains):
+        """
+        Append the infection data for the next timestep, carrying forward the state of individuals not in the data.
+
+        :param timestep: Timestep of the data (must be after the last timestep).
+        :param individual_ids: Sequence of individual IDs.
+        :param strains: Sequence of strains (None if the individual isn't infected).
+        """
+
+        # Preconditions
+        assert type(timestep) == int
+        assert len(individual_ids) == len(strains)
+        assert self.num_timesteps == 0 or timestep > self.timesteps[-1]
+
+        columns = self.index.rows(individual_ids)
+        codes = self.encode_strains(strains)
+
+        # Row of the previous timestep (from which the states are carried forward)
+        previous_row = self.timestep_to_row[self.timesteps[-1]] if self.num_timesteps > 0 else None
+
+        # Reuse the row of the oldest timestep if the window is full
+        if self.window is not None and self.num_timesteps == self.window:
+            row = self.timestep_to_row.pop(self.timesteps.pop(0))
+        else:
+            row = self.num_timesteps
+
+        self._reserve(row + 1, self.index.size)
+        self._add_timestep(timestep, row)
+
+        if previous_row is None:
+            self.matrix[row] = InfectionHistory.NO_INFECTION_CODE
+        else:
+            self.matrix[row] = self.matrix[previous_row]
+        self.matrix[row, columns] = codes
+
+    def to_checkpoint(self):
+        """
+        Get the state of the infection history for a checkpoint (excluding the index).
+
+        :return: Tuple of the dict of name -> array and the dict of JSON-serialisable metadata.
+        """
+
+        num_rows = max(self.timestep_to_row.values()) + 1 if self.num_timesteps > 0 else 0
+        arrays = {'matrix': self.matrix[:num_rows, :self.index.size]}
+
+        metadata = {
+            'dtype': self.dtype.name,
+            'window': self.window,
+            'timesteps': self.timesteps,
+            'rows': [self.timestep_to_row[timestep] for timestep in self.timesteps],
+            'strains': self.strains[1:]
+        }
+
+        return arrays, metadata
+
+    @classmethod
+    def from_checkpoint(cls, arrays, metadata, index):
+        """
+        Restore an infection history from a checkpoint.
+
+        :param arrays: Dict of name -> array.
+        :param metadata: Dict of metadata.
+        :param index: ID -> row index (an IndividualStore) of the columns.
+        :return: InfectionHistory.
+        """
+
+        history = cls(index=index, dtype=np.dtype(metadata['dtype']), window=metadata['window'])
+        history.matrix = arrays['matrix']
+
+        for timestep, row in zip(metadata['timesteps'], metadata['rows']):
+            history._add_timestep(timestep, row)
+
+        history.strains.extend(metadata['strains'])
+        history._strain_to_code = {strain: code + 1 for code, strain in enumerate(metadata['strains'])}
+
+        return history
+
+    def encode_strains(self, strains):
+        """
+        Encode strains as integer codes (adding any new strains).
+
+        :param strains: Sequence of strains (None if not infected).
+        :return: Array of codes.
+        """
+
+        strains = np.asarray(strains, dtype=object)
+        codes = np.full(strains.shape[0], InfectionHistory.NO_INFECTION_CODE, dtype=self.dtype)
+
+        infected = strains != None  # noqa: E711 (element-wise comparison)
+        if not np.any(infected):
+            return codes
+
+        # Encode each distinct strain once
+        unique_strains, inverse = np.unique(strains[infected].astype(str), return_inverse=True)
+        unique_codes = np.empty(unique_strains.shape[0], dtype=self.dtype)
+        for index, strain in enumerate(unique_strains.tolist()):
+            code = self._strain_to_code.get(strain)
+            if code is None:
+                code = len(self.strains)
+                if code > np.iinfo(self.dtype).max:
+                    raise ValueError("Too many strains for the strain codes of type %s" % self.dtype)
+                self._strain_to_code[strain] = code
+                self.strains.append(strain)
+            unique_codes[index] = code
+
+        codes[infected] = unique_codes[inverse]
+        return codes
+
+    def codes(self, timestep):
+        """
+        Get the strain code of every individual at a timestep.
+
+        :param timestep: Timestep.
+        :return: Array of strain codes indexed by the individual's row in the index.
+        """
+
+        row = self.matrix[self.timestep_to_row[timestep]]
+        if row.shape[0] >= self.index.size:
+            return row[:self.index.size]
+
+        # Individuals added to the index since the timestep are not infected
+        codes = np.full(self.index.size, InfectionHistory.NO_INFECTION_CODE, dtype=self.dtype)
+        codes[:row.shape[0]] = row
+        return codes
+
+    def infected(self, timestep):
+        """
+        Get whether every individual is infected at a timestep.
+
+        :param timestep: Timestep.
+        :return: Boolean array indexed by the individual's row in the index.
+        """
+
+        return self.codes(timestep) != InfectionHistory.NO_INFECTION_CODE
+
+    def strain(self, individual_id, timestep):
+        """
+        Get the strain of an individual at a timestep.
+
+        :param individual_id: ID of the individual.
+        :param timestep: Timestep.
+        :return: Strain (None if the individual isn't infected).
+        """
+
+        column = self.index.id_to_row.get(individual_id)
+        row = self.timestep_to_row[timestep]
+        if column is None or column >= self.matrix.shape[1]:
+            return None
+
+        return self.strains[self.matrix[row, column]]
+
+    def _add_timestep(self, timestep, row=None):
+        """
+        Record the row of a timestep.
+
+        :param timestep: Timestep.
+        :param row: Row of the matrix holding the timestep (defaults to the next row).
+        """
+
+        assert timestep not in self.timestep_to_row
+        self.timestep_to_row[timestep] = len(self.timesteps) if row is None else row
+        self.timesteps.append(timestep)
+
+    def _reserve(self, num_rows, num_columns):
+        """
+        Ensure the matrix can hold the given number of rows and columns (doubling the capacity as required).
+
+        :param num_rows: Required number of rows.
+        :param num_columns: Required number of columns.
+        """
+
+        rows, columns = self.matrix.shape
+        if num_rows <= rows and num_columns <= columns:
+            return
+
+        rows = max(rows, 1)
+        while rows < num_rows:
+            rows *= 2
+        columns = max(columns, 1)
+        while columns < num_columns:
+            columns *= 2
+
+        matrix = np.zeros((rows, columns), dtype=self.dtype)
+        matrix[:self.matrix.shape[0], :self.matrix.shape[1]] = self.matrix
+        self.matrix = matrix
@@ -1,5 +1,7 @@
 import logging
 
+import numpy as np
+
 from etl.csv_reader import DelimitedSource
 from logger import logger
 
@@ -35,19 +37,23 @@ class Infections(object):
 
         :param individual_id: Unique identifier for the individual.
         :param infection_strain: Infection strain (or None if not infected).
+        :return: True if the individual hasn't been seen before.
         """
 
         # Preconditions
         assert infection_strain is None or type(infection_strain) == str
 
-        # If the individual hasn't been seen before, add a log message
-        if not individual_id in self.individual_to_infection.keys():
-            module_logger.info("Adding individual %s" % individual_id)
+        # If the individual hasn't been seen before, add a log message (if logging each row)
+        new_individual = individual_id not in self.individual_to_infection
+        if new_individual and logger.row_messages_enabled():
+            module_logger.info("Adding individual %s", individual_id)
 
         # Update the individual's infection details
         self.individual_to_infection[individual_id] = infection_strain
 
-    def update_from_file(self, timestep, filepath, delimiter, encapsulator, encoding):
+        return new_individual
+
+    def update_from_file(self, timestep, filepath, delimiter, encapsulator, encoding, cache=None):
         """
         Update the infection data from a CSV file.
 
@@ -56,44 +62,77 @@ class Infections(object):
         :param delimiter: Delimiter used in the CSV file.
         :param encapsulator: Encapsulator used in the CSV file.
         :param encoding: Encoding used.
+        :param cache: Optional ColumnCache of the parsed file.
         """
 
         # Preconditions
         assert type(timestep) == int
-        assert type(filepath) == str
-        assert type(delimiter) == str
-        assert type(encapsulator) == str
-        assert type(encoding) == str
 
         module_logger.info("Updating the infections at timestep %d from file: %s" % (timestep, filepath))
 
         # Update the timestep to which the data corresponds
         self.timestep = timestep
 
+        # Update each individual, counting the new and infected individuals for a summary of the file
+        individual_ids, strains = Infections.read_file(filepath, delimiter, encapsulator, encoding, cache)
+        summary = logger.SummaryCounter()
+        summary.increment("new individuals", 0)
+        summary.increment("infected", 0)
+        for individual_id, strain in zip(individual_ids, strains):
+            if self.update_infection(individual_id, strain):
+                summary.increment("new individuals")
+            if strain is not None:
+                summary.increment("infected")
+
+        module_logger.info("Processed %d infections from file (%s)" % (len(individual_ids), str(summary)))
+
+    @staticmethod
+    def read_file(filepath, delimiter, encapsulator, encoding, cache=None):
+        """
+        Read the infection data from a CSV file.
+
+        :param filepath: Location of the infection data in CSV format.
+        :param delimiter: Delimiter used in the CSV file.
+        :param encapsulator: Encapsulator used in the CSV file.
+        :param encoding: Encoding used.
+        :param cache: Optional ColumnCache of the parsed file.
+        :return: Tuple of the array of individual IDs and the array of their strains (None if not infected).
+        """
+
+        # Preconditions
+        assert type(filepath) == str
+        assert type(delimiter) == str
+        assert type(encapsulator) == str
+        assert type(encoding) == str
+
         # Open the CSV file for reading
         reader = DelimitedSource(filepath=filepath,
                                  delimiter=delimiter,
                                  encapsulator=encapsulator,
-                                 encoding=encoding)
+                                 encoding=encoding,
+                                 cache=cache)
 
-        # Walk through each row of data
-        num_infections_processed = 0
-        for line in reader.read():
+        # Read the columns (ensuring the data is correct)
+        columns = reader.read_columns(required_fields=[Infections.INDIVIDUAL_ID_FIELD_NAME,
+                                                       Infections.INFECTION_STRAIN_FIELD_NAME])
 
-            # Ensure the data is correct
-            assert Infections.INDIVIDUAL_ID_FIELD_NAME in line.keys()
-            assert Infections.INFECTION_STRAIN_FIELD_NAME in line.keys()
+        return Infections.parse_columns(columns)
 
-            # Extract the parameters
-            individual_id = line[Infections.INDIVIDUAL_ID_FIELD_NAME]
-            strain = line[Infections.INFECTION_STRAIN_FIELD_NAME]
+    @staticmethod
+    def parse_columns(columns):
+        """
+        Extract the infection data from data already read into columns.
 
-            if strain == Infections.NO_INFECTION:
-                strain = None
+        :param columns: Dict of field name -> array of (string) values.
+        :return: Tuple of the array of individual IDs and the array of their strains (None if not infected).
+        """
 
-            # Update the individual
-            self.update_infection(individual_id, strain)
+        # Preconditions
+        assert Infections.INDIVIDUAL_ID_FIELD_NAME in columns
+        assert Infections.INFECTION_STRAIN_FIELD_NAME in columns
 
-            num_infections_processed += 1
+        individual_ids = columns[Infections.INDIVIDUAL_ID_FIELD_NAME]
+        strains = np.array(columns[Infections.INFECTION_STRAIN_FIELD_NAME], dtype=object)
+        strains[strains == Infections.NO_INFECTION] = None
 
-        module_logger.info("Processed %d infections from file" % num_infections_processed)
+        return individual_ids, strains
@@ -0,0 +1,261 @@
+import collections
+import logging
+
+import numpy as np
+
+from logger import instrumentation, logger
+from model.adaptation import create_adaptation
+from model.individual_store import IndividualStore
+from model.individuals import Individuals
+from model.infection_history import InfectionHistory
+from model.infections import Infections
+from model.parallel import ParallelPropagator
+from model.particle_filter import ParticleFilter, exclude_locations
+from model.smoother import FixedLagSmoother
+from model.subpopulations import SubpopulationIndex
+
+logger.initialise_logger("inference", log_level=logging.INFO)
+module_logger = logging.getLogger('inference')
+
+
+class InferenceEngine(object):
+    """
+    Inference engine that applies the data of each timestep to the individuals and infection history and then steps
+    the particle filter.
+    """
+
+    # Name of the attribute holding an individual's location
+    LOCATION_ATTRIBUTE = 'location'
+
+    def __init__(self, particle_filter, converters={}, window=None, smoothing_lag=None):
+        """
+        Initialise the inference engine.
+
+        :param particle_filter: ParticleFilter.
+        :param converters: Dict of functions (attribute name -> function) to convert the individuals' data.
+        :param window: Maximum number of timesteps of infection history and estimates retained (so that the memory
+            used doesn't grow with the number of timesteps), or None to retain them all.
+        :param smoothing_lag: Optional lag L of the fixed-lag smoother. If given, a smoothed estimate of timestep
+            t - L is made as each timestep t is processed.
+        """
+
+        self.particle_filter = particle_filter
+        self.converters = converters
+
+        # The columns of the infection history follow the rows of the individuals' store (and hence the individuals
+        # axis of the particle filter)
+        self.individuals = Individuals()
+        self.infection_history = InfectionHistory(index=self.individuals.store, window=window)
+
+        # Members of each location (updated as the individuals change location)
+        self.subpopulations = SubpopulationIndex()
+
+        # Sequence of (timestep, per-individual infection probability, dict of parameter means) tuples
+        self.estimates = collections.deque(maxlen=window)
+
+        # Fixed-lag smoother and the sequence of (timestep, smoothed per-individual infection probability) tuples
+        self.smoother = FixedLagSmoother(smoothing_lag) if smoothing_lag is not None else None
+        self.smoothed_estimates = collections.deque(maxlen=window)
+
+    @property
+    def last_timestep(self):
+        """
+        :return: Last timestep processed (None if no timesteps have been processed).
+        """
+        return self.particle_filter.timestep
+
+    @instrumentation.stage('apply')
+    def apply(self, data):
+        """
+        Apply the data of a timestep to the individuals and the infection history.
+
+        :param data: TimestepData.
+        """
+
+        if data.individuals is not None:
+            changes = self.individuals.update_from_columns(data.timestep, data.individuals, self.converters)
+            instrumentation.count('rows_parsed', changes.rows.shape[0])
+            instrumentation.count('individuals_updated', changes.new_rows.shape[0] + changes.updated_rows.shape[0])
+
+            # Only the individuals who are new or have moved change the sub-populations
+            self.update_subpopulations(np.concatenate([changes.new_rows, changes.moved_rows]))
+
+        if data.infections is not None:
+            individual_ids, strains = Infections.parse_columns(data.infections)
+            instrumentation.count('rows_parsed', len(individual_ids))
+        else:
+            individual_ids, strains = [], []
+        self.infection_history.append(data.timestep, individual_ids, strains)
+
+    def locations(self, rows=None):
+        """
+        Get the location code of each individual used by the model.
+
+        :param rows: Optional array of the rows of the individuals (defaults to all of the individuals).
+        :return: Array of location codes.
+        """
+
+        store = self.individuals.store
+        if rows is None:
+            rows = np.arange(store.size)
+
+        if InferenceEngine.LOCATION_ATTRIBUTE not in store.categories:
+            return np.full(rows.shape[0], ParticleFilter.EXCLUDED_LOCATION, dtype=np.int64)
+
+        return exclude_locations(store.column(InferenceEngine.LOCATION_ATTRIBUTE)[rows],
+                                 store.categories[InferenceEngine.LOCATION_ATTRIBUTE])
+
+    def update_subpopulations(self, rows):
+        """
+        Update the sub-population index with the locations of some of the individuals.
+
+        :param rows: Array of the rows of the individuals whose location is new or has changed.
+        """
+
+        self.subpopulations.add_individuals(self.individuals.store.size - self.subpopulations.size)
+        self.subpopulations.update(rows, self.locations(rows))
+
+    def step(self, timestep):
+        """
+        Step the particle filter using the data of a timestep (which must have been applied).
+
+        :param timestep: Timestep.
+        :return: Tuple of the per-individual infection probability and the dict of parameter means.
+        """
+
+        # Individuals not seen before are appended to the particle filter's individuals axis
+        store = self.individuals.store
+        self.particle_filter.add_individuals(store.size - self.particle_filter.num_individuals)
+
+        # Individuals only seen in the infections data have no location
+        self.subpopulations.add_individuals(store.size - self.subpopulations.size)
+
+        self.particle_filter.step(timestep, self.subpopulations, np.arange(store.size),
+                                  self.infection_history.infected(timestep))
+
+        infection_probability, parameter_means = self.particle_filter.estimate()
+        module_logger.info("Timestep %d: expected number infected = %.1f, parameters = %s" %
+                           (timestep, np.sum(infection_probability), str(parameter_means)))
+        self.estimates.append((timestep, infection_probability, parameter_means))
+
+        if self.smoother is not None:
+            smoothed = self.smoother.update(self.particle_filter)
+            if smoothed is not None:
+                self.append_smoothed(*smoothed)
+
+        instrumentation.end_timestep(timestep)
+
+        return infection_probability, parameter_means
+
+    def append_smoothed(self, timestep, infection_probability):
+        """
+        Record a smoothed estimate.
+
+        :param timestep: Timestep of the estimate.
+        :param infection_probability: Smoothed per-individual infection probability.
+        """
+
+        module_logger.info("Timestep %d (smoothed): expected number infected = %.1f" %
+                           (timestep, np.sum(infection_probability)))
+        self.smoothed_estimates.append((timestep, infection_probability))
+
+    def flush_smoothed(self):
+        """
+        Record the smoothed estimates of the last timesteps processed (which are smoothed over fewer than the lag of
+        the smoother's later timesteps), e.g. once the last timestep has been processed.
+        """
+
+        if self.smoother is not None:
+            for timestep, infection_probability in self.smoother.flush(self.particle_filter.weights):
+                self.append_smoothed(timestep, infection_probability)
+
+    def process(self, data):
+        """
+        Apply the data of a timestep and step the particle filter.
+
+        :param data: TimestepData.
+        :return: Tuple of the per-individual infection probability and the dict of parameter means.
+        """
+
+        self.apply(data)
+        return self.step(data.timestep)
+
+    def to_checkpoint(self):
+        """
+        Get the state of the inference engine for a checkpoint (the estimates are not included).
+
+        :return: Tuple of the dict of component name -> (dict of name -> array, dict of metadata).
+        """
+
+        store_arrays, store_metadata = self.individuals.store.to_checkpoint()
+        store_metadata['timestep'] = self.individuals.timestep
+        store_metadata['expected_attributes'] = sorted(self.individuals.expected_attributes)
+
+        return {
+            'particle_filter': self.particle_filter.to_checkpoint(),
+            'individuals': (store_arrays, store_metadata),
+            'infection_history': self.infection_history.to_checkpoint()
+        }
+
+    @classmethod
+    def from_checkpoint(cls, components, converters={}, propagator=None):
+        """
+        Restore an inference engine from a checkpoint.
+
+        :param components: Dict of component name -> (dict of name -> array, dict of metadata).
+        :param converters: Dict of functions (attribute name -> function) to convert the individuals' data.
+        :param propagator: Optional propagator of the particles of the particle filter.
+        :return: InferenceEngine.
+        """
+
+        history_arrays, history_metadata = components['infection_history']
+        particle_filter = ParticleFilter.from_checkpoint(*components['particle_filter'], propagator=propagator)
+        engine = cls(particle_filter, converters=converters, window=history_metadata['window'])
+
+        store_arrays, store_metadata = components['individuals']
+        engine.individuals.store = IndividualStore.from_checkpoint(store_arrays, store_metadata)
+        engine.individuals.timestep = store_metadata['timestep']
+        engine.individuals.expected_attributes = set(store_metadata['expected_attributes'])
+
+        engine.infection_history = InfectionHistory.from_checkpoint(history_arrays, history_metadata,
+                                                                    engine.individuals.store)
+        engine.subpopulations.set_locations(engine.locations())
+
+        return engine
+
+
+def create_propagator(inference_config):
+    """
+    Create the propagator of the particles from the inference section of the config.
+
+    :param inference_config: Dict of the inference config.
+    :return: ParallelPropagator if more than one worker is configured, otherwise None (propagate in this process).
+    """
+
+    max_workers = inference_config.get('max_workers', 1)
+    if max_workers == 1:
+        return None
+
+    return ParallelPropagator(max_workers)
+
+
+def create_particle_filter(inference_config, num_individuals=0):
+    """
+    Create a particle filter from the inference section of the config.
+
+    :param inference_config: Dict of the inference config.
+    :param num_individuals: Number of individuals initially known.
+    :return: ParticleFilter.
+    """
+
+    return ParticleFilter(num_particles=inference_config.get('num_particles', 1000),
+                          num_individuals=num_individuals,
+                          prior=inference_config.get('prior'),
+                          false_positive_rate=inference_config.get('false_positive_rate', 0.01),
+                          false_negative_rate=inference_config.get('false_negative_rate', 0.05),
+                          resampling_scheme=inference_config.get('resampling_scheme', 'systematic'),
+                          resampling_threshold=inference_config.get('resampling_threshold', 0.5),
+                          seed=inference_config.get('seed'),
+                          propagator=create_propagator(inference_config),
+                          auxiliary=inference_config.get('auxiliary', False),
+                          adaptation=create_adaptation(inference_config.get('adaptation')))
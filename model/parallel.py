@@ -0,0 +1,253 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from logger import logger
+from model.particle_filter import ParticleFilter, propagate_blocks
+from model.subpopulations import SubpopulationIndex
+
+# Initialise the module logger
+logger.initialise_logger("parallel", log_level=logging.INFO)
+module_logger = logging.getLogger('parallel')
+
+# Shared memory blocks attached by a worker process (name -> SharedMemory)
+_attached = {}
+
+
+class SharedArray(object):
+    """
+    NumPy array held in a block of shared memory, which other processes can attach to by name.
+
+    The block is allocated with spare capacity, so the array can be resized (e.g. as individuals are added) without
+    allocating a new block each time.
+    """
+
+    def __init__(self):
+        """
+        Initialise the array (no shared memory is allocated until the array is resized).
+        """
+
+        self.shared_memory = None
+        self.array = None
+
+    def resize(self, shape, dtype):
+        """
+        Resize the array, allocating a larger block of shared memory (double the size required) if needed.
+
+        The values of the array are undefined after resizing.
+
+        :param shape: Shape of the array.
+        :param dtype: Type of the array.
+        :return: Array.
+        """
+
+        dtype = np.dtype(dtype)
+        num_bytes = max(int(np.prod(shape)) * dtype.itemsize, 1)
+
+        if self.shared_memory is None or self.shared_memory.size < num_bytes:
+            self.close()
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=2 * num_bytes)
+
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shared_memory.buf)
+        return self.array
+
+    @property
+    def descriptor(self):
+        """
+        :return: Tuple of the name of the shared memory block, the shape and the type of the array.
+        """
+        return self.shared_memory.name, self.array.shape, self.array.dtype.str
+
+    def close(self):
+        """
+        Release the block of shared memory.
+        """
+
+        if self.shared_memory is not None:
+            self.array = None
+            self.shared_memory.close()
+            self.shared_memory.unlink()
+            self.shared_memory = None
+
+
+class ParallelPropagator(object):
+    """
+    Propagator that shards the particles of a particle filter across a pool of processes.
+
+    The particle filter allocates its states and parameters in the propagator's shared memory (see allocate), so the
+    worker processes propagate the particle matrices in place rather than receiving them pickled or copied. Each
+    shard is a run of consecutive blocks of particles and each block has its own random number stream, so the result
+    is identical for any number of workers.
+
+    There are two blocks of shared memory for each array, used in turn, so that the particles can be resampled from
+    one block into the other.
+    """
+
+    # Names of the arrays held in shared memory
+    ARRAY_NAMES = ('states', 'parameters')
+
+    def __init__(self, max_workers=None):
+        """
+        Initialise the propagator.
+
+        :param max_workers: Number of worker processes (defaults to the number of CPUs).
+        """
+
+        # Preconditions
+        assert max_workers is None or (type(max_workers) == int and max_workers > 0)
+
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        # Pair of blocks of each array and the index of the block last allocated
+        self.shared_arrays = {name: (SharedArray(), SharedArray()) for name in ParallelPropagator.ARRAY_NAMES}
+        self.current = {name: 0 for name in ParallelPropagator.ARRAY_NAMES}
+        self.locations = SharedArray()
+
+        module_logger.info("Initialised parallel propagator with %d workers" % self.max_workers)
+
+    def allocate(self, name, shape, dtype):
+        """
+        Allocate an array in shared memory (replacing the array of the same name allocated before the last one).
+
+        :param name: Name of the array (one of ARRAY_NAMES).
+        :param shape: Shape of the array.
+        :param dtype: Type of the array.
+        :return: Array (whose values are undefined).
+        """
+
+        self.current[name] = 1 - self.current[name]
+        return self.shared_arrays[name][self.current[name]].resize(shape, dtype)
+
+    def shared(self, name, array):
+        """
+        Get an array held in shared memory, copying it into shared memory if it isn't already.
+
+        :param name: Name of the array (one of ARRAY_NAMES).
+        :param array: Array.
+        :return: Array held in the last block of shared memory allocated for the name.
+        """
+
+        if array is self.shared_arrays[name][self.current[name]].array:
+            return array
+
+        shared = self.allocate(name, array.shape, array.dtype)
+        shared[:] = array
+        return shared
+
+    def propagate(self, states, parameters, subpopulations, block_seeds, block_starts=None):
+        """
+        Propagate the particles forward by one timestep.
+
+        The particles are propagated in place if the states were allocated in shared memory (see allocate), otherwise
+        they are first copied into shared memory.
+
+        :param states: (particles x individuals) boolean matrix of infection states.
+        :param parameters: (particles x parameters) matrix.
+        :param subpopulations: SubpopulationIndex of the location of each individual.
+        :param block_seeds: SeedSequence of the random number stream of each block of particles.
+        :param block_starts: Optional array of the first particle of each block (defaults to blocks of
+            ParticleFilter.PARTICLE_BLOCK_SIZE particles).
+        :return: (particles x individuals) boolean matrix of the new infection states, held in shared memory (so only
+            valid until the propagator is closed).
+        """
+
+        # Preconditions
+        assert states.shape[0] == parameters.shape[0]
+        assert states.shape[1] == subpopulations.size
+
+        states = self.shared('states', states)
+        parameters = self.shared('parameters', parameters)
+
+        # Each worker rebuilds the index of the sub-populations from the locations
+        self.locations.resize(subpopulations.locations.shape, subpopulations.locations.dtype)[:] = \
+            subpopulations.locations
+        descriptors = (self.shared_arrays['states'][self.current['states']].descriptor,
+                       self.shared_arrays['parameters'][self.current['parameters']].descriptor,
+                       self.locations.descriptor)
+        names = self.names()
+
+        # Split the blocks into a contiguous shard per worker
+        if block_starts is None:
+            block_starts = np.arange(0, states.shape[0], ParticleFilter.PARTICLE_BLOCK_SIZE)
+        num_blocks = len(block_seeds)
+        boundaries = np.linspace(0, num_blocks, min(self.max_workers, num_blocks) + 1).astype(int)
+        particle_boundaries = np.append(block_starts, states.shape[0])
+
+        futures = []
+        for first_block, end_block in zip(boundaries[:-1], boundaries[1:]):
+            shard = (int(particle_boundaries[first_block]), int(particle_boundaries[end_block]))
+            futures.append(self.executor.submit(_propagate_shard, descriptors, names, shard,
+                                                block_seeds[first_block:end_block],
+                                                block_starts[first_block:end_block] - shard[0]))
+
+        # Wait for every shard (raising any exception from a worker)
+        for future in futures:
+            future.result()
+
+        return states
+
+    def names(self):
+        """
+        :return: Set of the names of the blocks of shared memory currently allocated.
+        """
+
+        shared_arrays = [shared_array for pair in self.shared_arrays.values() for shared_array in pair]
+        return {shared_array.shared_memory.name for shared_array in shared_arrays + [self.locations]
+                if shared_array.shared_memory is not None}
+
+    def close(self):
+        """
+        Shut down the worker processes and release the shared memory.
+        """
+
+        self.executor.shutdown()
+        for shared_array in [shared_array for pair in self.shared_arrays.values() for shared_array in pair]:
+            shared_array.close()
+        self.locations.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _attach(descriptor):
+    """
+    Get the array held in a block of shared memory (run by a worker process).
+
+    :param descriptor: Tuple of the name of the shared memory block, the shape and the type of the array.
+    :return: Array.
+    """
+
+    name, shape, dtype = descriptor
+    if name not in _attached:
+        _attached[name] = shared_memory.SharedMemory(name=name)
+
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=_attached[name].buf)
+
+
+def _propagate_shard(descriptors, names, shard, block_seeds, block_starts):
+    """
+    Propagate a shard of the particles in place (run by a worker process).
+
+    :param descriptors: Tuple of the descriptors of the shared states matrix, parameters matrix and locations.
+    :param names: Set of the names of the blocks of shared memory allocated by the parent process.
+    :param shard: Tuple of the first and last (exclusive) particle of the shard.
+    :param block_seeds: SeedSequence of each block of the shard.
+    :param block_starts: Array of the first particle of each block of the shard (relative to the shard).
+    """
+
+    # Release the blocks of shared memory the parent process has replaced (e.g. when resizing an array)
+    for name in [name for name in _attached.keys() if name not in names]:
+        _attached.pop(name).close()
+
+    start, end = shard
+    states, parameters, locations = [_attach(descriptor) for descriptor in descriptors]
+
+    propagate_blocks(states[start:end], parameters[start:end], SubpopulationIndex(locations), block_seeds,
+                     block_starts)
@@ -0,0 +1,656 @@
+import logging
+
+import numpy as np
+
+from logger import instrumentation, logger
+from model.resampling import effective_sample_size, resample
+from model.subpopulations import EXCLUDED_LOCATION
+
+logger.initialise_logger("particle-filter", log_level=logging.INFO)
+module_logger = logging.getLogger('particle-filter')
+
+
+class ParticleFilter(object):
+    """
+    Particle filter for the sub-population transmission model.
+
+    The whole particle population is held as NumPy arrays:
+
+    - `states` -- (particles x individuals) boolean matrix, True if the individual is infected in that particle;
+    - `parameters` -- (particles x parameters) matrix of the transmission parameters of each particle;
+    - `weights` -- normalised weight of each particle.
+
+    Each timestep is processed as a predict, weight and resample step, each of which is a batched array operation
+    across all of the particles.
+
+    In the auxiliary variant, the particles are first resampled in proportion to how well they predict the
+    observations of the timestep (before they are propagated), so fewer particles are wasted on states that the
+    observations rule out. The number of particles can also be adapted at each timestep (see model.adaptation).
+    """
+
+    # Names of the columns of the parameters matrix
+    PARAMETER_NAMES = ('transmission_rate', 'recovery_probability')
+
+    # Default prior (uniform between the lower and upper bounds) for each parameter
+    DEFAULT_PRIOR = {
+        'transmission_rate': (0.0, 1.0),
+        'recovery_probability': (0.0, 1.0)
+    }
+
+    # Location code of an individual for whom transmission is not considered (e.g. dead or unknown)
+    EXCLUDED_LOCATION = EXCLUDED_LOCATION
+
+    # Number of particles propagated at a time (bounds the size of the temporary arrays)
+    PARTICLE_BLOCK_SIZE = 64
+
+    def __init__(self, num_particles, num_individuals, parameters=None, prior=None,
+                 false_positive_rate=0.01, false_negative_rate=0.05, resampling_scheme='systematic',
+                 resampling_threshold=0.5, seed=None, propagator=None, auxiliary=False, adaptation=None):
+        """
+        Initialise the particle filter.
+
+        :param num_particles: Number of particles.
+        :param num_individuals: Number of individuals initially known.
+        :param parameters: Optional (particles x parameters) matrix of parameters. If not given, the parameters are
+            sampled from the prior.
+        :param prior: Dict of parameter name -> (lower, upper) bounds of a uniform prior.
+        :param false_positive_rate: Probability an uninfected individual is observed as infected.
+        :param false_negative_rate: Probability an infected individual is observed as not infected.
+        :param resampling_scheme: Name of the resampling scheme (see model.resampling.SCHEMES).
+        :param resampling_threshold: Particles are only resampled when the effective sample size drops below this
+            fraction of the number of particles.
+        :param seed: Seed for the random number generator.
+        :param propagator: Optional propagator (e.g. a ParallelPropagator) that propagates the blocks of particles in
+            other processes. If None, the particles are propagated in this process.
+        :param auxiliary: If True, use the auxiliary particle filter (the particles are pre-selected using the
+            observations of the timestep before they are propagated).
+        :param adaptation: Optional adaptation of the number of particles at each timestep (e.g. an ESSAdaptation).
+        """
+
+        # Preconditions
+        assert type(num_particles) == int
+        assert num_particles > 0
+        assert type(num_individuals) == int
+        assert num_individuals >= 0
+        assert 0.0 <= false_positive_rate < 1.0
+        assert 0.0 <= false_negative_rate < 1.0
+        assert 0.0 <= resampling_threshold <= 1.0
+
+        self.rng = np.random.default_rng(seed)
+        self.false_positive_rate = false_positive_rate
+        self.false_negative_rate = false_negative_rate
+        self.resampling_scheme = resampling_scheme
+        self.resampling_threshold = resampling_threshold
+        self.propagator = propagator
+        self.auxiliary = auxiliary
+        self.adaptation = adaptation
+
+        # Infection state of each individual in each particle (initially no-one is infected)
+        self.states = self.allocate('states', (num_particles, num_individuals), bool)
+        self.states[:] = False
+
+        # Parameters of each particle
+        if parameters is None:
+            parameters = sample_prior(prior or ParticleFilter.DEFAULT_PRIOR, num_particles, self.rng)
+        assert np.shape(parameters) == (num_particles, len(ParticleFilter.PARAMETER_NAMES))
+        self.parameters = self.allocate('parameters', (num_particles, len(ParticleFilter.PARAMETER_NAMES)),
+                                        np.float64)
+        self.parameters[:] = parameters
+
+        # Weight of each particle
+        self.weights = np.full(num_particles, 1.0 / num_particles)
+
+        # Log of the estimate of the marginal likelihood of the observations processed so far
+        self.log_marginal_likelihood = 0.0
+
+        # Index of the ancestor of each particle at the previous timestep (None if the particles weren't resampled)
+        self.ancestors = None
+
+        # Log predictive likelihood of the observations under the ancestor of each particle (auxiliary variant only),
+        # which is divided out of the weight of the particle
+        self.first_stage_log_likelihood = None
+
+        # Timestep of the last data processed
+        self.timestep = None
+
+        module_logger.info("Initialised particle filter with %d particles and %d individuals" %
+                           (num_particles, num_individuals))
+
+    @property
+    def num_particles(self):
+        return self.states.shape[0]
+
+    @property
+    def num_individuals(self):
+        return self.states.shape[1]
+
+    def allocate(self, name, shape, dtype):
+        """
+        Allocate an array of the particles, in the propagator's shared memory if it has any (so that the particles
+        are propagated in place by the worker processes).
+
+        :param name: Name of the array ('states' or 'parameters').
+        :param shape: Shape of the array.
+        :param dtype: Type of the array.
+        :return: Array (whose values are undefined).
+        """
+
+        if self.propagator is None:
+            return np.empty(shape, dtype=dtype)
+
+        return self.propagator.allocate(name, shape, dtype)
+
+    def add_individuals(self, count):
+        """
+        Add individuals that have not been seen before (they are assumed not to be infected).
+
+        :param count: Number of new individuals.
+        """
+
+        # Preconditions
+        assert type(count) == int
+        assert count >= 0
+
+        if count > 0:
+            states = self.allocate('states', (self.num_particles, self.num_individuals + count), bool)
+            states[:, :self.num_individuals] = self.states
+            states[:, self.num_individuals:] = False
+            self.states = states
+
+    def initialise(self, observed_individuals, observed_infected):
+        """
+        Initialise the infection states of the particles from the first observations.
+
+        The state of each observed individual is sampled from its posterior given the observation (assuming an equal
+        prior probability of being infected or not).
+
+        :param observed_individuals: Array of the indices of the observed individuals.
+        :param observed_infected: Boolean array, True if the corresponding individual is observed to be infected.
+        """
+
+        # Preconditions
+        assert observed_individuals.shape == observed_infected.shape
+
+        draws = self.rng.random((self.num_particles, observed_individuals.shape[0]))
+        self.states[:, observed_individuals] = draws < self.initial_probability(observed_infected)
+
+    def initial_probability(self, observed_infected):
+        """
+        Calculate the posterior probability that each observed individual is infected given their first observation.
+
+        :param observed_infected: Boolean array, True if the individual is observed to be infected.
+        :return: Array of probabilities.
+        """
+
+        p_infected_if_positive = (1.0 - self.false_negative_rate) / \
+            (1.0 - self.false_negative_rate + self.false_positive_rate)
+        p_infected_if_negative = self.false_negative_rate / (self.false_negative_rate + 1.0 - self.false_positive_rate)
+        return np.where(observed_infected, p_infected_if_positive, p_infected_if_negative)
+
+    @instrumentation.stage('predict')
+    def predict(self, subpopulations):
+        """
+        Propagate the infection state of every particle forward by one timestep.
+
+        Each block of particles is propagated with its own random number stream (spawned from a seed drawn from the
+        filter's generator), so the result doesn't depend on whether, or by how many processes, the blocks are
+        propagated in parallel.
+
+        :param subpopulations: SubpopulationIndex of the location of each individual.
+        """
+
+        # Preconditions
+        assert subpopulations.size == self.num_individuals
+
+        block_seeds, block_starts = self.blocks()
+
+        if self.propagator is None:
+            propagate_blocks(self.states, self.parameters, subpopulations, block_seeds, block_starts)
+        else:
+            # The particles are propagated in place in shared memory
+            self.states = self.propagator.propagate(self.states, self.parameters, subpopulations, block_seeds,
+                                                    block_starts)
+
+    def blocks(self):
+        """
+        Split the particles into the blocks that are propagated together, each with its own random number stream.
+
+        :return: Tuple of the list of the SeedSequence of each block and the array of the first particle of each
+            block.
+        """
+
+        block_starts = np.arange(0, self.num_particles, ParticleFilter.PARTICLE_BLOCK_SIZE)
+        block_seeds = np.random.SeedSequence(int(self.rng.integers(2 ** 63))).spawn(block_starts.shape[0])
+        return block_seeds, block_starts
+
+    def log_likelihood(self, observed_individuals, observed_infected):
+        """
+        Calculate the log-likelihood of the observations under each particle.
+
+        Rather than forming the product of the per-individual likelihoods (which underflows for large numbers of
+        observations), the number of true/false positives/negatives of each particle is counted in a single reduction
+        across the individuals axis and combined with the logarithms of the observation probabilities. The particles are
+        counted in blocks to bound the size of the temporary arrays, and the states aren't indexed if every individual
+        is observed.
+
+        :param observed_individuals: Array of the indices of the observed individuals.
+        :param observed_infected: Boolean array, True if the corresponding individual is observed to be infected.
+        :return: Array of the log-likelihood of each particle.
+        """
+
+        # Preconditions
+        assert observed_individuals.shape == observed_infected.shape
+
+        observe_all = np.array_equal(observed_individuals, np.arange(self.num_individuals))
+
+        # Count the outcomes for each particle
+        num_observed = observed_infected.shape[0]
+        num_observed_infected = np.count_nonzero(observed_infected)
+        num_infected = np.empty(self.num_particles, dtype=np.int64)
+        true_positives = np.empty(self.num_particles, dtype=np.int64)
+        block_size = ParticleFilter.PARTICLE_BLOCK_SIZE
+        for start in range(0, self.num_particles, block_size):
+            states = self.states[start:start + block_size]
+            if not observe_all:
+                states = states[:, observed_individuals]
+            num_infected[start:start + block_size] = np.count_nonzero(states, axis=1)
+            true_positives[start:start + block_size] = np.count_nonzero(states & observed_infected, axis=1)
+
+        false_negatives = num_infected - true_positives
+        false_positives = num_observed_infected - true_positives
+        true_negatives = num_observed - num_infected - false_positives
+
+        return _log_probability(true_positives, 1.0 - self.false_negative_rate) + \
+            _log_probability(false_negatives, self.false_negative_rate) + \
+            _log_probability(false_positives, self.false_positive_rate) + \
+            _log_probability(true_negatives, 1.0 - self.false_positive_rate)
+
+    @instrumentation.stage('weight')
+    def update(self, observed_individuals, observed_infected):
+        """
+        Weight the particles given the observed infection state of a set of individuals.
+
+        The weights are updated in log-space and normalised using the log-sum-exp trick. The logarithm of the
+        normalising constant is added to the log marginal likelihood.
+
+        :param observed_individuals: Array of the indices of the observed individuals.
+        :param observed_infected: Boolean array, True if the corresponding individual is observed to be infected.
+        """
+
+        with np.errstate(divide='ignore'):
+            log_weights = np.log(self.weights) + self.log_likelihood(observed_individuals, observed_infected)
+
+        if self.first_stage_log_likelihood is not None:
+            log_weights -= self.first_stage_log_likelihood
+            self.first_stage_log_likelihood = None
+
+        # Normalise the weights
+        max_log_weight = np.max(log_weights)
+        if not np.isfinite(max_log_weight):
+            raise ValueError("The observations are impossible under every particle at timestep %s" % self.timestep)
+
+        log_normaliser = max_log_weight + np.log(np.sum(np.exp(log_weights - max_log_weight)))
+        self.weights = np.exp(log_weights - log_normaliser)
+        self.log_marginal_likelihood += log_normaliser
+
+    def effective_sample_size(self):
+        """
+        Calculate the effective sample size of the particles.
+
+        :return: Effective sample size.
+        """
+
+        return effective_sample_size(self.weights)
+
+    def predictive_log_likelihood(self, subpopulations, observed_individuals, observed_infected):
+        """
+        Calculate the log-likelihood of the observations of the next timestep under each particle (before it is
+        propagated).
+
+        The individuals' transitions are independent given the current states, so the probability each individual is
+        infected at the next timestep, and hence the likelihood of the observations, is calculated exactly. The
+        particles are processed in blocks to bound the size of the temporary arrays.
+
+        :param subpopulations: SubpopulationIndex of the location of each individual.
+        :param observed_individuals: Array of the indices of the observed individuals.
+        :param observed_infected: Boolean array, True if the corresponding individual is observed to be infected.
+        :return: Array of the log predictive likelihood of each particle.
+        """
+
+        log_predictive = np.empty(self.num_particles)
+        block_size = ParticleFilter.PARTICLE_BLOCK_SIZE
+        for start in range(0, self.num_particles, block_size):
+            states = self.states[start:start + block_size]
+            parameters = self.parameters[start:start + block_size]
+
+            # Probability each individual is infected at the next timestep
+            p_infected = np.where(states, 1.0 - parameters[:, [1]],
+                                  probability_of_infection(states, parameters, subpopulations))
+            p_infected = np.where(subpopulations.active, p_infected, states)[:, observed_individuals]
+
+            p_positive = p_infected * (1.0 - self.false_negative_rate) + (1.0 - p_infected) * self.false_positive_rate
+            with np.errstate(divide='ignore'):
+                log_predictive[start:start + block_size] = \
+                    np.sum(np.log(np.where(observed_infected, p_positive, 1.0 - p_positive)), axis=1)
+
+        return log_predictive
+
+    @instrumentation.stage('preselect')
+    def preselect(self, subpopulations, observed_individuals, observed_infected):
+        """
+        Resample the particles in proportion to their weight multiplied by their predictive likelihood of the
+        observations (the first stage of the auxiliary particle filter).
+
+        The logarithm of the normalising constant is added to the log marginal likelihood, and the predictive
+        likelihood of each selected particle is divided out of its weight when it is updated.
+
+        :param subpopulations: SubpopulationIndex of the location of each individual.
+        :param observed_individuals: Array of the indices of the observed individuals.
+        :param observed_infected: Boolean array, True if the corresponding individual is observed to be infected.
+        """
+
+        log_predictive = self.predictive_log_likelihood(subpopulations, observed_individuals, observed_infected)
+        with np.errstate(divide='ignore'):
+            log_weights = np.log(self.weights) + log_predictive
+
+        max_log_weight = np.max(log_weights)
+        if not np.isfinite(max_log_weight):
+            raise ValueError("The observations are impossible under every particle at timestep %s" % self.timestep)
+
+        log_normaliser = max_log_weight + np.log(np.sum(np.exp(log_weights - max_log_weight)))
+        self.log_marginal_likelihood += log_normaliser
+
+        indices = resample(np.exp(log_weights - log_normaliser), self.rng, self.resampling_scheme)
+        self.resample(indices)
+        self.first_stage_log_likelihood = log_predictive[indices]
+
+    @instrumentation.stage('resample')
+    def resample(self, indices=None):
+        """
+        Resample the particles in proportion to their weights.
+
+        :param indices: Optional array of the indices of the selected particles (e.g. chosen by an adaptation of the
+            number of particles, in which case the number of particles becomes the number of indices).
+        """
+
+        if indices is None:
+            indices = resample(self.weights, self.rng, self.resampling_scheme)
+        self.ancestors = indices if self.ancestors is None else self.ancestors[indices]
+        if instrumentation.recording():
+            instrumentation.gauge('unique_particles', int(np.unique(indices).shape[0]))
+
+        self.states = np.take(self.states, indices, axis=0,
+                              out=self.allocate('states', (indices.shape[0], self.num_individuals), bool))
+        self.parameters = np.take(self.parameters, indices, axis=0,
+                                  out=self.allocate('parameters', (indices.shape[0], self.parameters.shape[1]),
+                                                    np.float64))
+        self.weights = np.full(self.num_particles, 1.0 / self.num_particles)
+
+    def step(self, timestep, subpopulations, observed_individuals, observed_infected):
+        """
+        Process a single timestep (predict, weight and resample).
+
+        The particles are initialised from the observations of the first timestep rather than predicted. The
+        particles are only resampled when the effective sample size drops below the resampling threshold (or when
+        the adaptation of the number of particles selects them). The auxiliary variant pre-selects the particles
+        before they are predicted.
+
+        :param timestep: Timestep of the data.
+        :param subpopulations: SubpopulationIndex of the location of each individual.
+        :param observed_individuals: Array of the indices of the observed individuals.
+        :param observed_infected: Boolean array, True if the corresponding individual is observed to be infected.
+        """
+
+        # Preconditions
+        assert type(timestep) == int
+
+        self.ancestors = None
+
+        if self.timestep is None:
+            self.initialise(observed_individuals, observed_infected)
+        else:
+            if self.auxiliary:
+                self.preselect(subpopulations, observed_individuals, observed_infected)
+
+            self.predict(subpopulations)
+            self.update(observed_individuals, observed_infected)
+
+            ess = self.effective_sample_size()
+            instrumentation.gauge('ess', float(ess))
+            if self.adaptation is not None:
+                indices = self.adaptation.select(self, ess)
+                if indices is not None:
+                    self.resample(indices)
+                instrumentation.gauge('num_particles', self.num_particles)
+            elif ess < self.resampling_threshold * self.num_particles:
+                self.resample()
+
+        self.timestep = timestep
+
+    def to_checkpoint(self):
+        """
+        Get the state of the particle filter for a checkpoint.
+
+        :return: Tuple of the dict of name -> array and the dict of JSON-serialisable metadata.
+        """
+
+        arrays = {
+            'states': self.states,
+            'parameters': self.parameters,
+            'weights': self.weights
+        }
+
+        metadata = {
+            'timestep': self.timestep,
+            'log_marginal_likelihood': self.log_marginal_likelihood,
+            'false_positive_rate': self.false_positive_rate,
+            'false_negative_rate': self.false_negative_rate,
+            'resampling_scheme': self.resampling_scheme,
+            'resampling_threshold': self.resampling_threshold,
+            'auxiliary': self.auxiliary,
+            'rng_state': self.rng.bit_generator.state
+        }
+
+        return arrays, metadata
+
+    @classmethod
+    def from_checkpoint(cls, arrays, metadata, propagator=None):
+        """
+        Restore a particle filter from a checkpoint.
+
+        :param arrays: Dict of name -> array.
+        :param metadata: Dict of metadata.
+        :param propagator: Optional propagator of the particles (see __init__).
+        :return: ParticleFilter.
+        """
+
+        particle_filter = cls(arrays['states'].shape[0], 0, parameters=arrays['parameters'],
+                              false_positive_rate=metadata['false_positive_rate'],
+                              false_negative_rate=metadata['false_negative_rate'],
+                              resampling_scheme=metadata['resampling_scheme'],
+                              resampling_threshold=metadata['resampling_threshold'],
+                              propagator=propagator,
+                              auxiliary=metadata.get('auxiliary', False))
+
+        particle_filter.states = arrays['states']
+        particle_filter.weights = np.array(arrays['weights'])
+        particle_filter.timestep = metadata['timestep']
+        particle_filter.log_marginal_likelihood = metadata['log_marginal_likelihood']
+        particle_filter.rng.bit_generator.state = metadata['rng_state']
+
+        return particle_filter
+
+    def close(self):
+        """
+        Release the resources of the propagator (if there is one).
+        """
+
+        if self.propagator is not None:
+            # The particles are copied out of the propagator's shared memory before it is released
+            self.states = np.array(self.states)
+            self.parameters = np.array(self.parameters)
+            self.propagator.close()
+
+    @instrumentation.stage('estimate')
+    def estimate(self):
+        """
+        Estimate the probability of infection of each individual and the mean of the parameters.
+
+        :return: Tuple of the per-individual infection probability and the dict of parameter name -> mean.
+        """
+
+        infection_probability = weighted_sum(self.weights, self.states)
+        parameter_means = self.weights @ self.parameters
+
+        return infection_probability, dict(zip(ParticleFilter.PARAMETER_NAMES, parameter_means.tolist()))
+
+
+def weighted_sum(weights, states):
+    """
+    Calculate the weighted sum of the infection states of the particles.
+
+    The particles are summed in blocks of ParticleFilter.PARTICLE_BLOCK_SIZE, so that only one block at a time is
+    converted to floating point (rather than the whole matrix).
+
+    :param weights: Array of the weight of each particle.
+    :param states: (particles x individuals) boolean matrix of infection states.
+    :return: Array of the weighted sum of the states of each individual.
+    """
+
+    # Preconditions
+    assert weights.shape[0] == states.shape[0]
+
+    total = np.zeros(states.shape[1])
+    block_size = ParticleFilter.PARTICLE_BLOCK_SIZE
+    for start in range(0, states.shape[0], block_size):
+        total += weights[start:start + block_size] @ states[start:start + block_size]
+
+    return total
+
+
+def _log_probability(count, probability):
+    """
+    Calculate count * log(probability), defined to be zero if the count is zero (even if the probability is zero).
+
+    :param count: Array of the number of occurrences of an outcome.
+    :param probability: Probability of the outcome.
+    :return: Array of the log-probabilities.
+    """
+
+    if probability > 0.0:
+        return count * np.log(probability)
+
+    return np.where(count > 0, -np.inf, 0.0)
+
+
+def sample_prior(prior, num_particles, rng):
+    """
+    Sample the parameters of each particle from a uniform prior.
+
+    :param prior: Dict of parameter name -> (lower, upper) bounds.
+    :param num_particles: Number of particles.
+    :param rng: NumPy random number generator.
+    :return: (particles x parameters) matrix.
+    """
+
+    # Preconditions
+    assert set(prior.keys()) == set(ParticleFilter.PARAMETER_NAMES)
+
+    lower = np.array([prior[name][0] for name in ParticleFilter.PARAMETER_NAMES])
+    upper = np.array([prior[name][1] for name in ParticleFilter.PARAMETER_NAMES])
+
+    return rng.uniform(lower, upper, size=(num_particles, len(ParticleFilter.PARAMETER_NAMES)))
+
+
+def probability_of_infection(states, parameters, subpopulations):
+    """
+    Calculate the probability each individual is infected from their location by the next timestep.
+
+    :param states: (particles x individuals) boolean matrix of infection states.
+    :param parameters: (particles x parameters) matrix.
+    :param subpopulations: SubpopulationIndex of the location of each individual.
+    :return: (particles x individuals) matrix of the probability of infection (zero for an excluded individual).
+    """
+
+    # Force of infection in each location for each particle
+    infected_counts = subpopulations.segment_sums(states)
+    transmission_rate = parameters[:, [0]]
+    force = transmission_rate * infected_counts / np.maximum(subpopulations.location_sizes(), 1)
+
+    # Probability of infection of each individual (excluded individuals have no force of infection)
+    return 1.0 - np.exp(-subpopulations.gather(force))
+
+
+def propagate(states, parameters, subpopulations, rng):
+    """
+    Propagate a block of particles forward by one timestep.
+
+    A susceptible individual in location l is infected with probability 1 - exp(-beta * I_l / N_l), where beta is the
+    transmission rate of the particle, I_l the number of infected individuals in the location and N_l the number of
+    individuals in the location. An infected individual recovers with the particle's recovery probability.
+    Individuals in an excluded location keep their previous state.
+
+    The infected counts are segment sums over the members of each location, so the cost is linear in the number of
+    individuals (rather than in the number of pairs of individuals).
+
+    :param states: (particles x individuals) boolean matrix of infection states.
+    :param parameters: (particles x parameters) matrix.
+    :param subpopulations: SubpopulationIndex of the location of each individual.
+    :param rng: NumPy random number generator.
+    :return: New (particles x individuals) boolean matrix of infection states.
+    """
+
+    # Preconditions
+    assert states.shape[0] == parameters.shape[0]
+    assert states.shape[1] == subpopulations.size
+
+    p_infection = probability_of_infection(states, parameters, subpopulations)
+
+    # Sample the transitions
+    draws = rng.random(states.shape)
+    recovery_probability = parameters[:, [1]]
+    new_states = np.where(states, draws >= recovery_probability, draws < p_infection)
+
+    # Individuals in an excluded location keep their previous state
+    return np.where(subpopulations.active, new_states, states)
+
+
+def propagate_blocks(states, parameters, subpopulations, block_seeds, block_starts=None):
+    """
+    Propagate consecutive blocks of particles forward by one timestep, in place.
+
+    :param states: (particles x individuals) boolean matrix of infection states (updated in place).
+    :param parameters: (particles x parameters) matrix.
+    :param subpopulations: SubpopulationIndex of the location of each individual.
+    :param block_seeds: SeedSequence of the random number stream of each block.
+    :param block_starts: Optional array of the first particle of each block (defaults to blocks of
+        ParticleFilter.PARTICLE_BLOCK_SIZE particles).
+    """
+
+    if block_starts is None:
+        block_starts = np.arange(0, states.shape[0], ParticleFilter.PARTICLE_BLOCK_SIZE)
+    block_ends = np.append(block_starts[1:], states.shape[0])
+
+    for block_seed, start, end in zip(block_seeds, block_starts, block_ends):
+        rng = np.random.default_rng(block_seed)
+        states[start:end] = propagate(states[start:end], parameters[start:end], subpopulations, rng)
+
+
+def exclude_locations(codes, categories, excluded_locations=('dead', 'unknown')):
+    """
+    Map the categorical location codes of the individuals to the codes used by the model, where the locations for
+    which transmission is not considered are given the code EXCLUDED_LOCATION.
+
+    :param codes: Array of location codes (negative if the location is missing).
+    :param categories: List of location names (indexed by code).
+    :param excluded_locations: Names of the locations for which transmission is not considered.
+    :return: Array of location codes.
+    """
+
+    excluded = set(name.lower() for name in excluded_locations)
+    lookup = np.array([ParticleFilter.EXCLUDED_LOCATION if name.lower() in excluded else code
+                       for code, name in enumerate(categories)] + [ParticleFilter.EXCLUDED_LOCATION],
+                      dtype=np.int64)
+
+    # A missing location (negative code) maps to the final element of the lookup
+    return lookup[np.where(codes < 0, len(categories), codes)]
@@ -0,0 +1,275 @@
+import logging
+
+import numpy as np
+
+from logger import logger
+from model.particle_filter import ParticleFilter
+from model.sweep import GridParticleFilter
+
+# Initialise the module logger
+logger.initialise_logger("pmmh", log_level=logging.INFO)
+module_logger = logging.getLogger('pmmh')
+
+# Default standard deviation of the random walk of each parameter
+DEFAULT_STEP_SIZES = {
+    'transmission_rate': 0.05,
+    'recovery_probability': 0.05
+}
+
+
+class PMMHState(object):
+    """
+    State of the Markov chain: the parameters, the seeds of the random numbers of the particle filter and the results
+    of the (last accepted) particle filter run for them.
+    """
+
+    def __init__(self, parameters, seeds, log_likelihood, infection_probability):
+        """
+        Initialise the state.
+
+        :param parameters: Array of the value of each parameter (in the order of ParticleFilter.PARAMETER_NAMES).
+        :param seeds: Array of the seed of the random numbers used by the particle filter at each timestep.
+        :param log_likelihood: Estimate of the log marginal likelihood of the data given the parameters.
+        :param infection_probability: Array of the per-individual infection probability at the last timestep.
+        """
+
+        self.parameters = parameters
+        self.seeds = seeds
+        self.log_likelihood = log_likelihood
+        self.infection_probability = infection_probability
+
+
+class PMMHResult(object):
+    """
+    Samples of the parameters drawn by particle marginal Metropolis-Hastings.
+    """
+
+    def __init__(self, samples, log_likelihoods, num_accepted, infection_probability):
+        """
+        Initialise the result.
+
+        :param samples: (iterations x parameters) array of the parameters of the chain at each iteration.
+        :param log_likelihoods: Array of the log marginal likelihood estimate of the chain at each iteration.
+        :param num_accepted: Number of proposals accepted.
+        :param infection_probability: Array of the per-individual infection probability at the last timestep,
+            averaged over the iterations.
+        """
+
+        self.samples = samples
+        self.log_likelihoods = log_likelihoods
+        self.num_accepted = num_accepted
+        self.infection_probability = infection_probability
+
+    @property
+    def acceptance_rate(self):
+        return self.num_accepted / self.samples.shape[0]
+
+    def posterior_means(self, burn_in=0):
+        """
+        :param burn_in: Number of initial iterations discarded.
+        :return: Dict of parameter name -> posterior mean.
+        """
+        return dict(zip(ParticleFilter.PARAMETER_NAMES, np.mean(self.samples[burn_in:], axis=0).tolist()))
+
+
+class PMMH(object):
+    """
+    Particle marginal Metropolis-Hastings (PMMH) sampler of the posterior of the transmission parameters.
+
+    Each iteration proposes new parameters with a Gaussian random walk and estimates the log marginal likelihood of
+    the data under them with a single run of the particle filter (the estimate for the current parameters is kept
+    from the run in which they were accepted, so it isn't re-estimated).
+
+    The random numbers of the particle filter are drawn from a seed per timestep, which are part of the state of the
+    chain. A proposal keeps each seed with probability `correlation` and draws the others afresh, so the estimates of
+    the current and proposed likelihoods share most of their random numbers. The error in the ratio of the estimates
+    is then much smaller than that of independent runs, which allows fewer particles for the same acceptance rate.
+    """
+
+    def __init__(self, timesteps, num_particles, step_sizes, prior=None, correlation=0.9, inference_config={},
+                 seed=None, propagator=None):
+        """
+        Initialise the sampler.
+
+        :param timesteps: List of SweepTimestep (see model.sweep.precompute).
+        :param num_particles: Number of particles of each run of the particle filter.
+        :param step_sizes: Array of the standard deviation of the random walk of each parameter.
+        :param prior: Dict of parameter name -> (lower, upper) bounds of a uniform prior.
+        :param correlation: Probability the seed of a timestep is kept by a proposal (0 for independent runs).
+        :param inference_config: Dict of the inference config (for the observation model and resampling).
+        :param seed: Seed for the random number generator of the chain.
+        :param propagator: Optional propagator of the particles (e.g. a ParallelPropagator).
+        """
+
+        # Preconditions
+        assert len(timesteps) > 0
+        assert type(num_particles) == int and num_particles > 0
+        assert len(step_sizes) == len(ParticleFilter.PARAMETER_NAMES)
+        assert 0.0 <= correlation <= 1.0
+
+        self.timesteps = timesteps
+        self.num_particles = num_particles
+        self.step_sizes = np.asarray(step_sizes, dtype=np.float64)
+        self.correlation = correlation
+        self.inference_config = inference_config
+        self.propagator = propagator
+        self.rng = np.random.default_rng(seed)
+
+        prior = prior or ParticleFilter.DEFAULT_PRIOR
+        self.lower = np.array([prior[name][0] for name in ParticleFilter.PARAMETER_NAMES], dtype=np.float64)
+        self.upper = np.array([prior[name][1] for name in ParticleFilter.PARAMETER_NAMES], dtype=np.float64)
+
+        # Particle filter (of a single point of the parameters), reset for each run
+        config = inference_config
+        self.particle_filter = GridParticleFilter(np.zeros((1, self.step_sizes.shape[0])), num_particles,
+                                                  false_positive_rate=config.get('false_positive_rate', 0.01),
+                                                  false_negative_rate=config.get('false_negative_rate', 0.05),
+                                                  resampling_scheme=config.get('resampling_scheme', 'systematic'),
+                                                  resampling_threshold=config.get('resampling_threshold', 0.5),
+                                                  propagator=propagator)
+
+        # Number of runs of the particle filter
+        self.num_runs = 0
+
+    def in_support(self, parameters):
+        """
+        :param parameters: Array of the value of each parameter.
+        :return: True if the parameters have a non-zero prior density.
+        """
+        return bool(np.all((parameters >= self.lower) & (parameters <= self.upper)))
+
+    def draw_seeds(self, size):
+        """
+        :param size: Number of seeds.
+        :return: Array of seeds of the random numbers of the particle filter.
+        """
+        return self.rng.integers(0, 2 ** 63, size, dtype=np.int64)
+
+    def run_filter(self, parameters, seeds):
+        """
+        Run the particle filter over every timestep with fixed parameters.
+
+        :param parameters: Array of the value of each parameter.
+        :param seeds: Array of the seed of the random numbers at each timestep.
+        :return: PMMHState.
+        """
+
+        particle_filter = self.particle_filter
+        particle_filter.reset(parameters[None, :])
+
+        for sweep_timestep, timestep_seed in zip(self.timesteps, seeds):
+            particle_filter.reseed(int(timestep_seed))
+            particle_filter.add_individuals(sweep_timestep.subpopulations.size - particle_filter.num_individuals)
+            particle_filter.step(sweep_timestep.timestep, sweep_timestep.subpopulations,
+                                 np.arange(sweep_timestep.subpopulations.size), sweep_timestep.infected)
+
+        self.num_runs += 1
+        infection_probability, _ = particle_filter.estimate()
+
+        return PMMHState(parameters, seeds, float(particle_filter.log_marginal_likelihood[0]), infection_probability)
+
+    def propose(self, state):
+        """
+        Propose new parameters and seeds from the current state.
+
+        :param state: PMMHState.
+        :return: Tuple of the array of the proposed parameters and the array of the proposed seeds.
+        """
+
+        parameters = state.parameters + self.step_sizes * self.rng.standard_normal(self.step_sizes.shape[0])
+
+        refreshed = self.rng.random(state.seeds.shape[0]) >= self.correlation
+        seeds = state.seeds.copy()
+        seeds[refreshed] = self.draw_seeds(int(np.sum(refreshed)))
+
+        return parameters, seeds
+
+    def step(self, state):
+        """
+        Perform an iteration of the Metropolis-Hastings algorithm.
+
+        The random walk and the refreshing of the seeds are symmetric and the prior is uniform, so a proposal inside
+        the support of the prior is accepted with probability min(1, proposed likelihood / current likelihood). A
+        proposal outside the support is rejected without running the particle filter. If the estimate of the current
+        likelihood is zero (e.g. the data is impossible under the initial parameters), any proposal with a non-zero
+        estimate is accepted.
+
+        :param state: Current PMMHState.
+        :return: Tuple of the next PMMHState and True if the proposal was accepted.
+        """
+
+        parameters, seeds = self.propose(state)
+        if not self.in_support(parameters):
+            return state, False
+
+        proposal = self.run_filter(parameters, seeds)
+        if state.log_likelihood == -np.inf:
+            accepted = proposal.log_likelihood > -np.inf
+        else:
+            accepted = np.log(self.rng.random()) < proposal.log_likelihood - state.log_likelihood
+
+        return (proposal, True) if accepted else (state, False)
+
+    def run(self, num_iterations, initial_parameters=None):
+        """
+        Run the chain.
+
+        :param num_iterations: Number of iterations.
+        :param initial_parameters: Optional array of the initial parameters (defaults to the centre of the prior).
+        :return: PMMHResult.
+        """
+
+        # Preconditions
+        assert type(num_iterations) == int and num_iterations > 0
+
+        if initial_parameters is None:
+            initial_parameters = (self.lower + self.upper) / 2.0
+        initial_parameters = np.asarray(initial_parameters, dtype=np.float64)
+        assert self.in_support(initial_parameters)
+
+        state = self.run_filter(initial_parameters, self.draw_seeds(len(self.timesteps)))
+        if state.log_likelihood == -np.inf:
+            module_logger.warning("The data is impossible under the initial parameters %s, so the first proposal "
+                                  "under which it is possible will be accepted" % str(initial_parameters.tolist()))
+
+        samples = np.empty((num_iterations, initial_parameters.shape[0]))
+        log_likelihoods = np.empty(num_iterations)
+        infection_probability = np.zeros_like(state.infection_probability)
+        num_accepted = 0
+
+        for iteration in range(num_iterations):
+            state, accepted = self.step(state)
+            num_accepted += int(accepted)
+
+            samples[iteration] = state.parameters
+            log_likelihoods[iteration] = state.log_likelihood
+            infection_probability += state.infection_probability
+
+            if (iteration + 1) % 100 == 0:
+                module_logger.info("Iteration %d: acceptance rate = %.2f, log likelihood = %.1f, parameters = %s" %
+                                   (iteration + 1, num_accepted / (iteration + 1), state.log_likelihood,
+                                    str(state.parameters.tolist())))
+
+        return PMMHResult(samples, log_likelihoods, num_accepted, infection_probability / num_iterations)
+
+
+def create_pmmh(timesteps, pmmh_config, inference_config, propagator=None):
+    """
+    Create the PMMH sampler from the pmmh and inference sections of the config.
+
+    :param timesteps: List of SweepTimestep (see model.sweep.precompute).
+    :param pmmh_config: Dict of the pmmh config.
+    :param inference_config: Dict of the inference config (for the prior, observation model and resampling).
+    :param propagator: Optional propagator of the particles (e.g. a ParallelPropagator).
+    :return: PMMH.
+    """
+
+    step_sizes = pmmh_config.get('step_sizes', DEFAULT_STEP_SIZES)
+
+    return PMMH(timesteps, pmmh_config.get('num_particles', 100),
+                [step_sizes[name] for name in ParticleFilter.PARAMETER_NAMES],
+                prior=inference_config.get('prior'),
+                correlation=pmmh_config.get('correlation', 0.9),
+                inference_config=inference_config,
+                seed=pmmh_config.get('seed', inference_config.get('seed')),
+                propagator=propagator)
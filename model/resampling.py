@@ -0,0 +1,133 @@
+import numpy as np
+
+
+def effective_sample_size(weights):
+    """
+    Calculate the effective sample size (ESS) of a set of normalised weights.
+
+    :param weights: Array of normalised particle weights.
+    :return: Effective sample size, between 1 and the number of particles.
+    """
+
+    return 1.0 / np.sum(np.square(weights))
+
+
+def _cumulative_weights(weights):
+    """
+    Calculate the cumulative sum of the weights, guarding against the final value being just less than one due to
+    rounding errors.
+
+    :param weights: Array of normalised particle weights.
+    :return: Cumulative sum of the weights.
+    """
+
+    cumulative = np.cumsum(weights)
+    cumulative[-1] = 1.0
+    return cumulative
+
+
+def multinomial(weights, rng, num_samples=None):
+    """
+    Multinomial resampling.
+
+    The uniform positions are drawn already sorted, as the normalised cumulative sums of exponential variates (the
+    spacings of sorted uniforms), rather than being sorted.
+
+    :param weights: Array of normalised particle weights.
+    :param rng: NumPy random number generator.
+    :param num_samples: Number of indices to draw (defaults to the number of particles).
+    :return: Array of the indices of the selected particles.
+    """
+
+    num_samples = weights.shape[0] if num_samples is None else num_samples
+    cumulative = np.cumsum(rng.standard_exponential(num_samples + 1))
+    positions = cumulative[:-1] / cumulative[-1]
+    return np.searchsorted(_cumulative_weights(weights), positions, side='right')
+
+
+def stratified(weights, rng, num_samples=None):
+    """
+    Stratified resampling, drawing one uniform sample from each of the equally sized strata of [0, 1).
+
+    :param weights: Array of normalised particle weights.
+    :param rng: NumPy random number generator.
+    :param num_samples: Number of indices to draw (defaults to the number of particles).
+    :return: Array of the indices of the selected particles.
+    """
+
+    num_samples = weights.shape[0] if num_samples is None else num_samples
+    positions = (np.arange(num_samples) + rng.random(num_samples)) / num_samples
+    return np.searchsorted(_cumulative_weights(weights), positions, side='right')
+
+
+def systematic(weights, rng, num_samples=None):
+    """
+    Systematic resampling, using a single uniform offset for equally spaced positions in [0, 1).
+
+    :param weights: Array of normalised particle weights.
+    :param rng: NumPy random number generator.
+    :param num_samples: Number of indices to draw (defaults to the number of particles).
+    :return: Array of the indices of the selected particles.
+    """
+
+    num_samples = weights.shape[0] if num_samples is None else num_samples
+    positions = (np.arange(num_samples) + rng.random()) / num_samples
+    return np.searchsorted(_cumulative_weights(weights), positions, side='right')
+
+
+def residual(weights, rng, num_samples=None):
+    """
+    Residual resampling. Each particle is deterministically copied floor(N * w) times and the remaining particles are
+    drawn by multinomial resampling of the residual weights.
+
+    :param weights: Array of normalised particle weights.
+    :param rng: NumPy random number generator.
+    :param num_samples: Number of indices to draw (defaults to the number of particles).
+    :return: Array of the indices of the selected particles.
+    """
+
+    num_samples = weights.shape[0] if num_samples is None else num_samples
+
+    # Deterministic copies
+    expected_copies = num_samples * weights
+    copies = np.floor(expected_copies).astype(np.int64)
+    indices = np.repeat(np.arange(weights.shape[0]), copies)
+
+    # Draw the remainder from the residual weights
+    num_remaining = num_samples - indices.shape[0]
+    if num_remaining == 0:
+        return indices
+
+    residual_weights = expected_copies - copies
+    residual_weights /= np.sum(residual_weights)
+
+    # The indices are kept in order by adding the number of times each particle is drawn to its copies
+    copies += np.bincount(multinomial(residual_weights, rng, num_remaining), minlength=weights.shape[0])
+    return np.repeat(np.arange(weights.shape[0]), copies)
+
+
+# Resampling scheme name -> function
+SCHEMES = {
+    'multinomial': multinomial,
+    'stratified': stratified,
+    'systematic': systematic,
+    'residual': residual
+}
+
+
+def resample(weights, rng, scheme='systematic', num_samples=None):
+    """
+    Resample the particles using a named scheme.
+
+    :param weights: Array of normalised particle weights.
+    :param rng: NumPy random number generator.
+    :param scheme: Name of the resampling scheme.
+    :param num_samples: Number of indices to draw (defaults to the number of particles).
+    :return: Array of the indices of the selected particles.
+    """
+
+    # Preconditions
+    if scheme not in SCHEMES:
+        raise ValueError("Unknown resampling scheme: %s" % scheme)
+
+    return SCHEMES[scheme](weights, rng, num_samples)
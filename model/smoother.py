@@ -0,0 +1,93 @@
+import collections
+
+import numpy as np
+
+from model.particle_filter import ParticleFilter
+
+
+class FixedLagSmoother(object):
+    """
+    Fixed-lag smoother of the per-individual infection probabilities.
+
+    The smoothed estimate of a timestep t - L is the weighted average, over the particles at timestep t, of the
+    infection states of their ancestors at timestep t - L. Rather than the full genealogy of the particles, only the
+    last L + 1 timesteps are kept in a ring buffer: the infection states of the particles at the timestep (packed as
+    bits) and the index of the ancestor of each particle at the previous timestep. The memory used is therefore
+    bounded by the lag, regardless of the number of timesteps.
+    """
+
+    def __init__(self, lag):
+        """
+        Initialise the smoother.
+
+        :param lag: Number of timesteps L by which the smoothed estimates lag the filter.
+        """
+
+        # Preconditions
+        assert type(lag) == int and lag > 0
+
+        self.lag = lag
+
+        # Ring buffer of (timestep, packed states, number of individuals, ancestors) of the last L + 1 timesteps,
+        # where the ancestors are the indices of the particles at the previous timestep (None if they weren't
+        # resampled)
+        self.buffer = collections.deque(maxlen=lag + 1)
+
+    def update(self, particle_filter):
+        """
+        Add the particles of the timestep the particle filter has just processed.
+
+        :param particle_filter: ParticleFilter.
+        :return: Tuple of timestep t - L and the smoothed per-individual infection probability at that timestep, or
+            None if fewer than L + 1 timesteps have been processed.
+        """
+
+        self.buffer.append((particle_filter.timestep, np.packbits(particle_filter.states, axis=1),
+                            particle_filter.num_individuals, particle_filter.ancestors))
+
+        if len(self.buffer) <= self.lag:
+            return None
+
+        return self.smooth(0, particle_filter.weights)
+
+    def smooth(self, position, weights):
+        """
+        Calculate the smoothed infection probabilities of a timestep in the buffer.
+
+        :param position: Position of the timestep in the buffer (0 for the oldest).
+        :param weights: Weights of the particles of the latest timestep.
+        :return: Tuple of the timestep and the smoothed per-individual infection probability.
+        """
+
+        # Trace the ancestor of each particle of the latest timestep back to the timestep
+        lineage = np.arange(weights.shape[0])
+        for index in range(len(self.buffer) - 1, position, -1):
+            ancestors = self.buffer[index][3]
+            if ancestors is not None:
+                lineage = ancestors[lineage]
+
+        timestep, packed_states, num_individuals, _ = self.buffer[position]
+
+        # The weight of each particle at the timestep is the total weight of its descendants
+        ancestor_weights = np.bincount(lineage, weights=weights, minlength=packed_states.shape[0])
+
+        # The states are unpacked and summed in blocks of particles, so only one block is converted to floating point
+        infection_probability = np.zeros(num_individuals)
+        block_size = ParticleFilter.PARTICLE_BLOCK_SIZE
+        for start in range(0, packed_states.shape[0], block_size):
+            states = np.unpackbits(packed_states[start:start + block_size], axis=1, count=num_individuals).view(bool)
+            infection_probability += ancestor_weights[start:start + block_size] @ states
+
+        return timestep, infection_probability
+
+    def flush(self, weights):
+        """
+        Calculate the smoothed infection probabilities of the timesteps in the buffer that haven't been emitted (the
+        last L timesteps, which are smoothed over fewer than L later timesteps).
+
+        :param weights: Weights of the particles of the latest timestep.
+        :return: List of tuples of the timestep and the smoothed per-individual infection probability.
+        """
+
+        start = 1 if len(self.buffer) > self.lag else 0
+        return [self.smooth(position, weights) for position in range(start, len(self.buffer))]
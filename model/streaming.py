@@ -0,0 +1,113 @@
+import logging
+import os
+import time
+
+from logger import logger
+
+logger.initialise_logger("streaming", log_level=logging.INFO)
+module_logger = logging.getLogger('streaming')
+
+
+class StreamingInference(object):
+    """
+    Streaming (online) inference, which keeps the state of the inference engine and advances the particle filter by
+    only the timesteps whose files have arrived since the last timestep processed.
+
+    The memory used is bounded regardless of the number of timesteps if the engine was created with a window.
+    """
+
+    def __init__(self, loader, engine, settle_seconds=0.0):
+        """
+        Initialise the streaming inference.
+
+        :param loader: TimestepLoader of the input folders.
+        :param engine: InferenceEngine holding the state of the inference.
+        :param settle_seconds: A timestep is only processed once none of its files have been modified for this
+            number of seconds (so that files that are still being written are not read).
+        """
+
+        # Preconditions
+        assert settle_seconds >= 0.0
+
+        self.loader = loader
+        self.engine = engine
+        self.settle_seconds = settle_seconds
+
+    def new_timesteps(self):
+        """
+        Find the timesteps that are ready to be processed.
+
+        :return: Sorted list of timesteps after the last timestep processed.
+        """
+
+        self.loader.refresh()
+        last_timestep = self.engine.last_timestep
+        now = time.time()
+
+        timesteps = []
+        for timestep in self.loader.timesteps:
+            if last_timestep is not None and timestep <= last_timestep:
+                continue
+
+            # Stop at the first timestep that isn't ready, so that the timesteps are processed in order
+            if any(now - os.path.getmtime(filepath) < self.settle_seconds for filepath in self.loader.files(timestep)):
+                break
+
+            timesteps.append(timestep)
+
+        return timesteps
+
+    def advance(self, timesteps=None):
+        """
+        Advance the particle filter by the new timesteps.
+
+        :param timesteps: Timesteps to process (defaults to the timesteps that are ready to be processed). Each must
+            be after the last timestep processed.
+        :return: List of the timesteps processed.
+        """
+
+        if timesteps is None:
+            timesteps = self.new_timesteps()
+        else:
+            self.loader.refresh()
+            timesteps = sorted(timesteps)
+            for timestep in timesteps:
+                if len(self.loader.files(timestep)) == 0:
+                    raise ValueError("No files found for timestep %d" % timestep)
+
+        if len(timesteps) == 0:
+            return []
+
+        last_timestep = self.engine.last_timestep
+        if last_timestep is not None and timesteps[0] <= last_timestep:
+            raise ValueError("Timestep %d has already been processed (last timestep is %d)" %
+                             (timesteps[0], last_timestep))
+
+        module_logger.info("Advancing the inference by timesteps: %s" % str(timesteps))
+        for data in self.loader.load(timesteps):
+            self.engine.process(data)
+
+        return timesteps
+
+    def watch(self, poll_seconds, max_polls=None, on_advance=None):
+        """
+        Watch the input folders for new timesteps and advance the particle filter as they arrive.
+
+        :param poll_seconds: Number of seconds between checks for new files.
+        :param max_polls: Maximum number of checks (None to watch indefinitely).
+        :param on_advance: Optional function called with the list of timesteps processed whenever the particle filter
+            has been advanced (e.g. to save a checkpoint).
+        """
+
+        # Preconditions
+        assert poll_seconds > 0.0
+
+        num_polls = 0
+        while max_polls is None or num_polls < max_polls:
+            timesteps = self.advance()
+            if len(timesteps) > 0 and on_advance is not None:
+                on_advance(timesteps)
+            num_polls += 1
+
+            if max_polls is None or num_polls < max_polls:
+                time.sleep(poll_seconds)
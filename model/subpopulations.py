@@ -0,0 +1,221 @@
+import numpy as np
+
+# Location code of an individual for whom transmission is not considered (e.g. dead or unknown)
+EXCLUDED_LOCATION = -1
+
+
+class SubpopulationIndex(object):
+    """
+    Index of the members of each sub-population (location).
+
+    The individuals are ordered by location, so that the members of each location occupy a contiguous range of the
+    order (location l occupies order[offsets[l]:offsets[l + 1]]). Individuals in an excluded location are placed
+    after the members of every location, so they fall outside every range.
+
+    Summing over a location is then a segment reduction over the reordered individuals, and the per-location values
+    are gathered back to the individuals through `segments` (the location of each individual, or the extra segment
+    `num_locations` if the individual is excluded).
+
+    Within a segment, the individuals are in index order. When individuals move, only the part of the order spanning
+    the segments they leave and join is rebuilt (by merging the arrivals into the remaining members), so the index is
+    only fully rebuilt when a new location appears.
+    """
+
+    def __init__(self, locations=None):
+        """
+        Initialise the index.
+
+        :param locations: Optional array of the location code of each individual (EXCLUDED_LOCATION if transmission
+            is not considered for the individual).
+        """
+
+        self.locations = np.empty(0, dtype=np.int64)
+        self._stale = True
+
+        if locations is not None:
+            self.set_locations(locations)
+
+    @property
+    def size(self):
+        return self.locations.shape[0]
+
+    @property
+    def num_locations(self):
+        self._rebuild()
+        return self.offsets.shape[0] - 1
+
+    @property
+    def active(self):
+        """
+        :return: Boolean array, True if transmission is considered for the individual.
+        """
+        return self.locations != EXCLUDED_LOCATION
+
+    def set_locations(self, locations):
+        """
+        Set the location of every individual (only the individuals whose location has changed are updated).
+
+        :param locations: Array of the location code of each individual.
+        """
+
+        # Preconditions
+        assert locations.shape[0] >= self.size
+
+        locations = np.asarray(locations, dtype=np.int64)
+        self.add_individuals(locations.shape[0] - self.size)
+
+        changed = np.flatnonzero(self.locations != locations)
+        self.update(changed, locations[changed])
+
+    def add_individuals(self, count):
+        """
+        Add individuals, who are initially excluded.
+
+        :param count: Number of new individuals.
+        """
+
+        # Preconditions
+        assert count >= 0
+
+        if count > 0:
+            previous_size = self.size
+            self.locations = np.concatenate([self.locations, np.full(count, EXCLUDED_LOCATION, dtype=np.int64)])
+
+            # The new individuals are excluded and have the highest indices, so they go at the end of the order
+            if not self._stale:
+                self.segments = np.concatenate([self.segments, np.full(count, self.num_locations, dtype=np.int64)])
+                self.order = np.concatenate([self.order, np.arange(previous_size, self.size)])
+
+    def update(self, rows, locations):
+        """
+        Update the location of some of the individuals.
+
+        :param rows: Array of the indices of the individuals.
+        :param locations: Array of the new location code of each individual.
+        """
+
+        # Preconditions
+        assert rows.shape == locations.shape
+
+        if rows.shape[0] == 0:
+            return
+
+        self.locations[rows] = locations
+        if self._stale:
+            return
+
+        # A new location changes the segment of the excluded individuals, so the index is rebuilt
+        num_locations = self.num_locations
+        if np.max(locations) >= num_locations:
+            self._stale = True
+            return
+
+        new_segments = np.where(locations != EXCLUDED_LOCATION, locations, num_locations)
+        moved = self.segments[rows] != new_segments
+        if not np.any(moved):
+            return
+        rows = rows[moved]
+        new_segments = new_segments[moved]
+        old_segments = self.segments[rows]
+
+        # The individuals in the span of the order from the first to the last segment affected are unchanged, so only
+        # the span is rebuilt
+        first_segment = min(np.min(old_segments), np.min(new_segments))
+        last_segment = max(np.max(old_segments), np.max(new_segments))
+        start = self.offsets[first_segment]
+        end = self.offsets[last_segment + 1] if last_segment < num_locations else self.size
+
+        leaving = np.zeros(self.size, dtype=bool)
+        leaving[rows] = True
+        span = self.order[start:end]
+        remaining = span[~leaving[span]]
+        self.segments[rows] = new_segments
+
+        # Merge the arrivals into the remaining members, ordered by segment and then by index
+        arrivals = rows[np.argsort(new_segments * self.size + rows)]
+        positions = np.searchsorted(self.segments[remaining] * self.size + remaining,
+                                    self.segments[arrivals] * self.size + arrivals)
+        self.order[start:end] = np.insert(remaining, positions, arrivals)
+
+        # Shift the start of the segments after those whose size has changed
+        changes = np.bincount(new_segments, minlength=num_locations + 1) - \
+            np.bincount(old_segments, minlength=num_locations + 1)
+        self.offsets[1:] += np.cumsum(changes)[:num_locations]
+
+    def members(self, location):
+        """
+        Get the members of a location.
+
+        :param location: Location code.
+        :return: Array of the indices of the individuals in the location.
+        """
+
+        self._rebuild()
+        if location < 0 or location >= self.num_locations:
+            return np.empty(0, dtype=np.int64)
+
+        return self.order[self.offsets[location]:self.offsets[location + 1]]
+
+    def location_sizes(self):
+        """
+        :return: Array of the number of individuals in each location.
+        """
+
+        self._rebuild()
+        return np.diff(self.offsets)
+
+    def segment_sums(self, values):
+        """
+        Sum the values of the individuals in each location.
+
+        :param values: (rows x individuals) matrix of values (e.g. the infection states of a block of particles).
+        :return: (rows x locations) matrix of the sum over the members of each location.
+        """
+
+        # Preconditions
+        assert values.shape[1] == self.size
+
+        self._rebuild()
+
+        sums = np.zeros((values.shape[0], self.num_locations), dtype=np.int64)
+
+        # Reduce each (non-empty) segment of the reordered individuals
+        non_empty = np.flatnonzero(np.diff(self.offsets) > 0)
+        if non_empty.shape[0] > 0:
+            ordered = values[:, self.order[:self.offsets[-1]]]
+            sums[:, non_empty] = np.add.reduceat(ordered, self.offsets[non_empty], axis=1, dtype=np.int64)
+
+        return sums
+
+    def gather(self, location_values):
+        """
+        Get the value of the location of each individual (zero for an excluded individual).
+
+        :param location_values: (rows x locations) matrix of values.
+        :return: (rows x individuals) matrix of values.
+        """
+
+        # Preconditions
+        assert location_values.shape[1] == self.num_locations
+
+        padded = np.zeros((location_values.shape[0], location_values.shape[1] + 1), dtype=location_values.dtype)
+        padded[:, :-1] = location_values
+        return padded[:, self.segments]
+
+    def _rebuild(self):
+        """
+        Rebuild the order of the individuals and the ranges of the locations if a location has changed.
+        """
+
+        if not self._stale:
+            return
+
+        num_locations = int(self.locations.max()) + 1 if self.size > 0 else 0
+
+        # Excluded individuals are given the segment after the last location
+        self.segments = np.where(self.active, self.locations, num_locations)
+        self.order = np.argsort(self.segments, kind='stable')
+        self.offsets = np.zeros(num_locations + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(np.bincount(self.segments, minlength=num_locations + 1)[:num_locations])
+
+        self._stale = False
@@ -0,0 +1,406 @@
+import itertools
+import logging
+
+import numpy as np
+
+from logger import logger
+from model.inference import InferenceEngine
+from model.particle_filter import ParticleFilter
+from model.resampling import resample
+from model.subpopulations import SubpopulationIndex
+
+# Initialise the module logger
+logger.initialise_logger("sweep", log_level=logging.INFO)
+module_logger = logging.getLogger('sweep')
+
+
+class SweepTimestep(object):
+    """
+    Parameter-independent data of a timestep used by every point of a sweep.
+    """
+
+    def __init__(self, timestep, subpopulations, infected):
+        """
+        Initialise the data of the timestep.
+
+        :param timestep: Timestep.
+        :param subpopulations: SubpopulationIndex of the location of each individual known at the timestep.
+        :param infected: Boolean array, True if the individual is observed to be infected at the timestep.
+        """
+
+        self.timestep = timestep
+        self.subpopulations = subpopulations
+        self.infected = infected
+
+
+def precompute(data, converters={}):
+    """
+    Apply the data of each timestep to the individuals and infection history once, keeping the sub-populations and
+    the (carried-forward) observed infections of each timestep for the points of a sweep.
+
+    :param data: Iterable of TimestepData in timestep order.
+    :param converters: Dict of functions (attribute name -> function) to convert the individuals' data.
+    :return: List of SweepTimestep.
+    """
+
+    # Only the individuals and infection history of the engine are used (no particle filter is stepped)
+    engine = InferenceEngine(None, converters=converters)
+
+    timesteps = []
+    for timestep_data in data:
+        engine.apply(timestep_data)
+        engine.subpopulations.add_individuals(engine.individuals.store.size - engine.subpopulations.size)
+
+        # The index is shared with the previous timestep if no-one has been added or moved
+        locations = engine.subpopulations.locations
+        if len(timesteps) > 0 and np.array_equal(timesteps[-1].subpopulations.locations, locations):
+            subpopulations = timesteps[-1].subpopulations
+        else:
+            subpopulations = SubpopulationIndex(locations.copy())
+
+        timesteps.append(SweepTimestep(timestep_data.timestep, subpopulations,
+                                       engine.infection_history.infected(timestep_data.timestep)))
+
+    module_logger.info("Precomputed %d timesteps of %d individuals" % (len(timesteps), engine.individuals.store.size))
+
+    return timesteps
+
+
+class GridParticleFilter(ParticleFilter):
+    """
+    Particle filter that runs a separate filter for each of a batch of parameter values at once.
+
+    The particles of the batch are held in the same arrays, with the particles of each point of the grid in a
+    contiguous block (so the parameters are an extra axis of the particles). The particles are propagated and
+    weighted together, but the weights are normalised, the marginal likelihood estimated and the particles resampled
+    within each block. The parameters of the particles are fixed.
+
+    Each point has its own random number stream, derived from the seed and the index of the point in the whole grid,
+    so the estimate at a point doesn't depend on which other points are in the batch.
+    """
+
+    def __init__(self, grid, particles_per_point, first_point=0, **kwargs):
+        """
+        Initialise the particle filter.
+
+        :param grid: (points x parameters) matrix of the parameters of each point.
+        :param particles_per_point: Number of particles of each point.
+        :param first_point: Index of the first point of the batch in the whole grid.
+        :param kwargs: Other arguments of the ParticleFilter.
+        """
+
+        # Preconditions
+        assert type(particles_per_point) == int and particles_per_point > 0
+        assert type(first_point) == int and first_point >= 0
+
+        grid = np.asarray(grid, dtype=np.float64)
+        super().__init__(grid.shape[0] * particles_per_point, 0,
+                         parameters=np.repeat(grid, particles_per_point, axis=0), **kwargs)
+
+        self.num_points = grid.shape[0]
+        self.particles_per_point = particles_per_point
+        self.first_point = first_point
+
+        # Random number generator of each point
+        self.point_rngs = None
+        self.reseed(kwargs.get('seed'))
+
+        # Weights normalised within each point and the log marginal likelihood of each point
+        self.weights = np.full(self.num_particles, 1.0 / particles_per_point)
+        self.log_marginal_likelihood = np.zeros(self.num_points)
+
+    def reset(self, grid):
+        """
+        Reset the particle filter to its initial state (before any timesteps are processed) for new values of the
+        parameters of each point, so that it can be run again without being rebuilt.
+
+        :param grid: (points x parameters) matrix of the parameters of each point.
+        """
+
+        grid = np.asarray(grid, dtype=np.float64)
+        assert grid.shape[0] == self.num_points
+
+        self.parameters[:] = np.repeat(grid, self.particles_per_point, axis=0)
+        self.states = self.allocate('states', (self.num_particles, 0), bool)
+        self.weights = np.full(self.num_particles, 1.0 / self.particles_per_point)
+        self.log_marginal_likelihood = np.zeros(self.num_points)
+        self.ancestors = None
+        self.timestep = None
+
+    def reseed(self, seed):
+        """
+        Set the random number stream of each point from a seed. The stream of a point is derived from the seed and
+        the index of the point in the whole grid.
+
+        :param seed: Seed (or None for fresh entropy).
+        """
+
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+
+        self.point_rngs = [np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(self.first_point + point,)))
+                           for point in range(self.num_points)]
+
+    def initialise(self, observed_individuals, observed_infected):
+        """
+        Initialise the infection states of the particles of each point from the first observations.
+
+        :param observed_individuals: Array of the indices of the observed individuals.
+        :param observed_infected: Boolean array, True if the corresponding individual is observed to be infected.
+        """
+
+        # Preconditions
+        assert observed_individuals.shape == observed_infected.shape
+
+        p_infected = self.initial_probability(observed_infected)
+        for point, rng in enumerate(self.point_rngs):
+            offset = point * self.particles_per_point
+            draws = rng.random((self.particles_per_point, observed_individuals.shape[0]))
+            self.states[offset:offset + self.particles_per_point, observed_individuals] = draws < p_infected
+
+    def blocks(self):
+        """
+        Split the particles of each point into blocks that are propagated together, with the random number stream of
+        each block spawned from the stream of its point.
+
+        :return: Tuple of the list of the SeedSequence of each block and the array of the first particle of each
+            block.
+        """
+
+        offsets = np.arange(0, self.particles_per_point, ParticleFilter.PARTICLE_BLOCK_SIZE)
+        block_starts = (np.arange(self.num_points)[:, None] * self.particles_per_point + offsets[None, :]).ravel()
+
+        block_seeds = []
+        for rng in self.point_rngs:
+            block_seeds.extend(np.random.SeedSequence(int(rng.integers(2 ** 63))).spawn(offsets.shape[0]))
+
+        return block_seeds, block_starts
+
+    def update(self, observed_individuals, observed_infected):
+        """
+        Weight the particles of each point given the observations.
+
+        A point under which the observations are impossible has a log marginal likelihood of -inf (rather than an
+        error being raised).
+
+        :param observed_individuals: Array of the indices of the observed individuals.
+        :param observed_infected: Boolean array, True if the corresponding individual is observed to be infected.
+        """
+
+        with np.errstate(divide='ignore'):
+            log_weights = (np.log(self.weights) + self.log_likelihood(observed_individuals, observed_infected)) \
+                .reshape(self.num_points, self.particles_per_point)
+
+        max_log_weights = np.max(log_weights, axis=1)
+        possible = np.isfinite(max_log_weights)
+        shift = np.where(possible, max_log_weights, 0.0)[:, None]
+        log_normalisers = np.where(possible, max_log_weights + np.log(np.sum(np.exp(log_weights - shift), axis=1)),
+                                   -np.inf)
+
+        weights = np.where(possible[:, None], np.exp(log_weights - np.where(possible, log_normalisers, 0.0)[:, None]),
+                           1.0 / self.particles_per_point)
+        self.weights = weights.ravel()
+        self.log_marginal_likelihood += log_normalisers
+
+    def effective_sample_size(self):
+        """
+        Calculate the effective sample size of the particles of each point.
+
+        :return: Array of the effective sample size of each point.
+        """
+
+        return 1.0 / np.sum(np.square(self.weights.reshape(self.num_points, self.particles_per_point)), axis=1)
+
+    def resample(self, indices=None):
+        """
+        Resample the particles of every point in proportion to their weights (within the point).
+
+        :param indices: Optional array of the indices of the selected particles, each of which must be a particle of
+            the same point as the particle it replaces.
+        """
+
+        if indices is None:
+            self.resample_points()
+            return
+
+        # Preconditions
+        points = np.arange(self.num_particles) // self.particles_per_point
+        assert np.array_equal(indices // self.particles_per_point, points)
+
+        self.select(indices)
+        self.weights = np.full(self.num_particles, 1.0 / self.particles_per_point)
+
+    def resample_points(self, points=None):
+        """
+        Resample the particles of some of the points in proportion to their weights.
+
+        :param points: Array of the points to resample (defaults to every point).
+        """
+
+        if points is None:
+            points = np.arange(self.num_points)
+
+        indices = np.arange(self.num_particles)
+        weights = self.weights.reshape(self.num_points, self.particles_per_point)
+        for point in points:
+            offset = point * self.particles_per_point
+            indices[offset:offset + self.particles_per_point] = \
+                offset + resample(weights[point], self.point_rngs[point], self.resampling_scheme)
+            weights[point] = 1.0 / self.particles_per_point
+
+        self.select(indices)
+        self.weights = weights.ravel()
+
+    def select(self, indices):
+        """
+        Replace the particles with the selected particles (the parameters of each point are fixed, so only the states
+        are selected).
+
+        :param indices: Array of the index of the particle selected in place of each particle.
+        """
+
+        self.ancestors = indices if self.ancestors is None else self.ancestors[indices]
+        self.states = np.take(self.states, indices, axis=0, out=self.allocate('states', self.states.shape, bool))
+
+    def step(self, timestep, subpopulations, observed_individuals, observed_infected):
+        """
+        Process a single timestep (predict, weight and resample the points whose effective sample size has dropped
+        below the resampling threshold).
+
+        :param timestep: Timestep of the data.
+        :param subpopulations: SubpopulationIndex of the location of each individual.
+        :param observed_individuals: Array of the indices of the observed individuals.
+        :param observed_infected: Boolean array, True if the corresponding individual is observed to be infected.
+        """
+
+        # Preconditions
+        assert type(timestep) == int
+
+        self.ancestors = None
+
+        if self.timestep is None:
+            self.initialise(observed_individuals, observed_infected)
+        else:
+            self.predict(subpopulations)
+            self.update(observed_individuals, observed_infected)
+
+            points = np.flatnonzero(self.effective_sample_size() < self.resampling_threshold * self.particles_per_point)
+            if points.shape[0] > 0:
+                self.resample_points(points)
+
+        self.timestep = timestep
+
+
+class LikelihoodSurface(object):
+    """
+    Log marginal likelihood of the data at each point of a grid of parameter values.
+    """
+
+    def __init__(self, values, log_marginal_likelihood):
+        """
+        Initialise the surface.
+
+        :param values: Dict of parameter name -> array of the values of the parameter in the grid.
+        :param log_marginal_likelihood: Array of the log marginal likelihood with an axis per parameter (in the order
+            of ParticleFilter.PARAMETER_NAMES).
+        """
+
+        self.values = values
+        self.log_marginal_likelihood = log_marginal_likelihood
+
+    def best(self):
+        """
+        :return: Tuple of the dict of parameter name -> value of the point with the highest likelihood and its log
+            marginal likelihood.
+        """
+
+        index = np.unravel_index(np.argmax(self.log_marginal_likelihood), self.log_marginal_likelihood.shape)
+        point = {name: float(self.values[name][i]) for name, i in zip(ParticleFilter.PARAMETER_NAMES, index)}
+        return point, float(self.log_marginal_likelihood[index])
+
+    def rows(self):
+        """
+        :return: Generator of the tuples of the values of the parameters and the log marginal likelihood of each point.
+        """
+
+        for index in np.ndindex(*self.log_marginal_likelihood.shape):
+            yield tuple(float(self.values[name][i]) for name, i in zip(ParticleFilter.PARAMETER_NAMES, index)) + \
+                (float(self.log_marginal_likelihood[index]),)
+
+
+def create_grid(sweep_config):
+    """
+    Get the values of each parameter in the grid from the sweep section of the config.
+
+    :param sweep_config: Dict of parameter name -> list of values or dict of the 'min', 'max' and 'num' of evenly
+        spaced values.
+    :return: Dict of parameter name -> array of values.
+    """
+
+    missing = [name for name in ParticleFilter.PARAMETER_NAMES if name not in sweep_config]
+    if len(missing) > 0:
+        raise ValueError("The sweep config has no values of: %s" % ", ".join(missing))
+
+    values = {}
+    for name in ParticleFilter.PARAMETER_NAMES:
+        value_config = sweep_config[name]
+        if isinstance(value_config, (list, tuple)):
+            values[name] = np.array(value_config, dtype=np.float64)
+        else:
+            values[name] = np.linspace(value_config['min'], value_config['max'], value_config['num'])
+
+    return values
+
+
+def sweep(timesteps, values, particles_per_point, batch_size, inference_config, propagator=None):
+    """
+    Estimate the log marginal likelihood at each point of a grid of parameter values.
+
+    The points are evaluated a batch at a time (each batch as a single GridParticleFilter). The random numbers of each
+    point are derived from the seed and the index of the point, so the estimate at a point doesn't depend on the
+    batch size (or the position of the point in its batch).
+
+    :param timesteps: List of SweepTimestep (see precompute).
+    :param values: Dict of parameter name -> array of the values of the parameter in the grid.
+    :param particles_per_point: Number of particles of each point.
+    :param batch_size: Maximum number of points evaluated at once (bounds the memory of the particles).
+    :param inference_config: Dict of the inference config (for the observation model, resampling and seed).
+    :param propagator: Optional propagator of the particles (e.g. a ParallelPropagator).
+    :return: LikelihoodSurface.
+    """
+
+    # Preconditions
+    assert set(values.keys()) == set(ParticleFilter.PARAMETER_NAMES)
+    assert type(batch_size) == int and batch_size > 0
+
+    axes = [values[name] for name in ParticleFilter.PARAMETER_NAMES]
+    grid = np.array(list(itertools.product(*axes)), dtype=np.float64)
+    log_marginal_likelihood = np.empty(grid.shape[0])
+
+    # Every batch derives the random numbers of its points from the same seed
+    seed = inference_config.get('seed')
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+
+    module_logger.info("Sweeping %d points with %d particles each in batches of %d" %
+                       (grid.shape[0], particles_per_point, batch_size))
+
+    for start in range(0, grid.shape[0], batch_size):
+        particle_filter = GridParticleFilter(grid[start:start + batch_size], particles_per_point, first_point=start,
+                                             false_positive_rate=inference_config.get('false_positive_rate', 0.01),
+                                             false_negative_rate=inference_config.get('false_negative_rate', 0.05),
+                                             resampling_scheme=inference_config.get('resampling_scheme', 'systematic'),
+                                             resampling_threshold=inference_config.get('resampling_threshold', 0.5),
+                                             seed=seed,
+                                             propagator=propagator)
+
+        for sweep_timestep in timesteps:
+            particle_filter.add_individuals(sweep_timestep.subpopulations.size - particle_filter.num_individuals)
+            particle_filter.step(sweep_timestep.timestep, sweep_timestep.subpopulations,
+                                 np.arange(sweep_timestep.subpopulations.size), sweep_timestep.infected)
+
+        log_marginal_likelihood[start:start + batch_size] = particle_filter.log_marginal_likelihood
+        module_logger.info("Evaluated %d of %d points" % (min(start + batch_size, grid.shape[0]), grid.shape[0]))
+
+    return LikelihoodSurface(dict(zip(ParticleFilter.PARAMETER_NAMES, axes)),
+                             log_marginal_likelihood.reshape([axis.shape[0] for axis in axes]))
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from model.adaptation import ESSAdaptation, KLDAdaptation, create_adaptation, kld_bound
+from model.particle_filter import ParticleFilter
+from model.subpopulations import SubpopulationIndex
+
+
+def test_ess_adaptation():
+    adaptation = ESSAdaptation(10, 40)
+    particle_filter = ParticleFilter(num_particles=20, num_individuals=2, seed=1)
+
+    # The number of particles is doubled when the ESS is low and halved when it is high
+    assert adaptation.select(particle_filter, 2.0).shape == (40,)
+    assert adaptation.select(particle_filter, 19.0).shape == (10,)
+
+    # Within the bounds, the particles are only resampled below the resampling threshold
+    assert adaptation.select(particle_filter, 12.0) is None
+    assert adaptation.select(particle_filter, 6.0).shape == (20,)
+
+    particle_filter = ParticleFilter(num_particles=40, num_individuals=2, seed=1)
+    assert adaptation.select(particle_filter, 2.0).shape == (40,)
+
+
+def test_kld_bound():
+    bounds = kld_bound(np.array([1, 2, 10, 100]), 0.05, 0.01)
+    assert bounds[0] == 1.0
+    assert np.all(np.diff(bounds) > 0)
+
+
+def test_kld_adaptation():
+    adaptation = KLDAdaptation(5, 1000)
+
+    # A concentrated posterior needs the minimum number of particles
+    particle_filter = ParticleFilter(num_particles=100, num_individuals=2,
+                                     parameters=np.tile([[0.5, 0.5]], (100, 1)), seed=1)
+    assert adaptation.select(particle_filter, 100.0).shape == (5,)
+
+    # A spread out posterior needs more particles
+    particle_filter = ParticleFilter(num_particles=100, num_individuals=2, seed=1)
+    indices = adaptation.select(particle_filter, 100.0)
+    assert 5 < indices.shape[0] <= 1000
+    assert np.all(indices < 100)
+
+
+def test_step_with_adaptation():
+    particle_filter = ParticleFilter(num_particles=20, num_individuals=3, seed=1,
+                                     adaptation=create_adaptation({'min_particles': 10, 'max_particles': 80}))
+    subpopulations = SubpopulationIndex(np.array([0, 0, 1]))
+
+    for timestep in range(4):
+        particle_filter.step(timestep, subpopulations, np.arange(3), np.array([True, True, True]))
+        assert 10 <= particle_filter.num_particles <= 80
+        assert particle_filter.states.shape[0] == particle_filter.parameters.shape[0] == \
+            particle_filter.weights.shape[0] == particle_filter.num_particles
+
+
+def test_create_adaptation():
+    assert create_adaptation(None) is None
+    assert isinstance(create_adaptation({'method': 'kld', 'min_particles': 1, 'max_particles': 2}), KLDAdaptation)
+
+    with pytest.raises(ValueError):
+        create_adaptation({'method': 'unknown', 'min_particles': 1, 'max_particles': 2})
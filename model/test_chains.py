@@ -0,0 +1,48 @@
+import numpy as np
+
+from etl.converters import create_converters
+from etl.loader import TimestepLoader
+from model.chains import ChainSummary, create_chain_configs, run_chains
+from synthetic.generator import DatasetSpec, generate_dataset
+
+
+def load_dataset(folder):
+    generate_dataset(folder, DatasetSpec(60, 4, num_locations=3, infected_fraction=0.2, seed=3))
+    loader = TimestepLoader(folder + "/individuals", folder + "/infections", ",", "\"", "utf-8", max_workers=1)
+    return list(loader.load())
+
+
+def test_create_chain_configs():
+    chain_configs = create_chain_configs({'num_particles': 100, 'seed': 1, 'max_workers': 4}, 3, [10, 20, 30])
+
+    assert [chain_config['num_particles'] for chain_config in chain_configs] == [10, 20, 30]
+    assert len(set(chain_config['seed'] for chain_config in chain_configs)) == 3
+    assert all(chain_config['max_workers'] == 1 for chain_config in chain_configs)
+
+    # The seeds of the chains are derived from the seed
+    assert chain_configs == create_chain_configs({'num_particles': 100, 'seed': 1, 'max_workers': 4}, 3,
+                                                 [10, 20, 30])
+
+
+def test_run_chains(tmp_path):
+    data = load_dataset(str(tmp_path))
+    chain_configs = create_chain_configs({'num_particles': 30, 'seed': 2}, 3)
+    converters = create_converters({'dob': {'type': 'date'}, 'dod': {'type': 'date'}})
+
+    results = run_chains(data, chain_configs, converters=converters, max_workers=1)
+    assert [result.chain for result in results] == [0, 1, 2]
+    assert results[0].timesteps == [0, 1, 2, 3]
+    assert results[0].parameter_means.shape == (4, 2)
+    assert not np.array_equal(results[0].parameter_means, results[1].parameter_means)
+
+    # The chains give the same results when run in worker processes
+    parallel_results = run_chains(data, chain_configs, converters=converters, max_workers=2)
+    for result, parallel_result in zip(results, parallel_results):
+        assert np.array_equal(result.infection_probability, parallel_result.infection_probability)
+        assert result.log_marginal_likelihood == parallel_result.log_marginal_likelihood
+
+    summary = ChainSummary(results)
+    assert summary.num_chains == 3
+    assert summary.expected_infected_mean.shape == (4,)
+    assert summary.infection_probability_std.shape == results[0].infection_probability.shape
+    assert set(summary.final_parameters().keys()) == {'transmission_rate', 'recovery_probability'}
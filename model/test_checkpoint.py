@@ -0,0 +1,90 @@
+import numpy as np
+
+from etl.converters import create_converters
+from etl.loader import TimestepData
+from model.checkpoint import checkpoint_exists, load_arrays, load_checkpoint, save_checkpoint
+from model.inference import InferenceEngine, create_particle_filter
+
+
+def timestep_data(timestep):
+    return TimestepData(timestep,
+                        individuals={'id': np.array(['1', '2', '%d' % (timestep + 3)], dtype=object),
+                                     'name': np.array(['a', 'b', 'c'], dtype=object),
+                                     'location': np.array(['A', 'B', 'A'], dtype=object),
+                                     'dob': np.array(['01/03/1970', '26/04/1973', '25/08/2010'], dtype=object)},
+                        infections={'individual_id': np.array(['1', '2'], dtype=object),
+                                    'infection_strain': np.array(['c-1', 'None' if timestep < 2 else 'c-2'],
+                                                                 dtype=object)})
+
+
+def test_resume_matches_uninterrupted(tmp_path):
+    directory = str(tmp_path / "checkpoint")
+
+    uninterrupted = InferenceEngine(create_particle_filter({'num_particles': 30, 'seed': 5}))
+    for timestep in range(5):
+        uninterrupted.process(timestep_data(timestep))
+
+    interrupted = InferenceEngine(create_particle_filter({'num_particles': 30, 'seed': 5}))
+    for timestep in range(3):
+        interrupted.process(timestep_data(timestep))
+    assert not checkpoint_exists(directory)
+    save_checkpoint(directory, interrupted)
+    assert checkpoint_exists(directory)
+
+    resumed = load_checkpoint(directory)
+    assert resumed.last_timestep == 2
+    assert resumed.individuals.individual_to_attributes == interrupted.individuals.individual_to_attributes
+    for timestep in range(3, 5):
+        resumed.process(timestep_data(timestep))
+
+    assert np.array_equal(resumed.particle_filter.states, uninterrupted.particle_filter.states)
+    assert np.array_equal(resumed.particle_filter.weights, uninterrupted.particle_filter.weights)
+    assert resumed.particle_filter.log_marginal_likelihood == uninterrupted.particle_filter.log_marginal_likelihood
+    assert resumed.infection_history.strain('2', 4) == 'c-2'
+
+    # A second checkpoint replaces the first
+    save_checkpoint(directory, resumed)
+    assert load_checkpoint(directory).last_timestep == 4
+
+
+def test_resume_keeps_converted_types(tmp_path):
+    directory = str(tmp_path / "checkpoint")
+    converters = create_converters({'age': {'type': 'integer'}, 'height': {'type': 'number'},
+                                    'vaccinated': {'type': 'date'}})
+    data = TimestepData(0, individuals={'id': np.array(['1', '2'], dtype=object),
+                                        'age': np.array(['30', '41'], dtype=object),
+                                        'height': np.array(['1.5', '1.75'], dtype=object),
+                                        'vaccinated': np.array(['01/02/2021', 'None'], dtype=object)})
+
+    engine = InferenceEngine(create_particle_filter({'num_particles': 10, 'seed': 7}), converters=converters)
+    engine.process(data)
+    save_checkpoint(directory, engine)
+
+    resumed = load_checkpoint(directory, converters)
+    assert resumed.individuals.store.get('1') == engine.individuals.store.get('1')
+    assert resumed.individuals.store.get('2')['vaccinated'] is None
+
+    # Re-applying the same data changes no-one
+    changes = resumed.individuals.update_from_columns(1, data.individuals, converters)
+    assert changes.new_rows.shape[0] == 0
+    assert all(rows.shape[0] == 0 for rows in changes.changed_rows.values())
+
+
+def test_inspect_memory_mapped(tmp_path):
+    directory = str(tmp_path / "checkpoint")
+    engine = InferenceEngine(create_particle_filter({'num_particles': 10, 'seed': 6}))
+    engine.process(timestep_data(0))
+    save_checkpoint(directory, engine)
+
+    arrays, metadata = load_arrays(directory)['particle_filter']
+    assert isinstance(arrays['states'], np.memmap)
+    assert arrays['states'].shape == (10, 3)
+    assert metadata['timestep'] == 0
+
+
+def test_no_checkpoint(tmp_path):
+    try:
+        load_checkpoint(str(tmp_path))
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,67 @@
+import numpy as np
+
+from model.individual_store import IndividualStore, to_datetime64
+
+
+def test_rows_allocated_in_order():
+    store = IndividualStore()
+    assert store.rows(["a", "b", "a"]).tolist() == [0, 1, 0]
+    assert store.rows(["c", "d"], create=False).tolist() == [-1, -1]
+    assert store.size == 2
+
+
+def test_grows_beyond_initial_capacity():
+    store = IndividualStore()
+    num_individuals = IndividualStore.INITIAL_CAPACITY * 3 + 1
+    ids = ["id-%d" % i for i in range(num_individuals)]
+    store.update(ids[:10], {"location": ["A"] * 10, "name": ["x"] * 10})
+    store.update(ids, {"location": ["B"] * num_individuals, "name": ids})
+
+    assert store.size == num_individuals
+    assert store.capacity >= num_individuals
+    assert store.decoded_column("location").tolist() == ["B"] * num_individuals
+    assert store.column("name").tolist() == ids
+
+
+def test_categorical_codes():
+    store = IndividualStore()
+    store.update(["a", "b", "c"], {"location": ["UK", None, "France"]})
+    store.update(["d"], {"location": ["UK"]})
+
+    assert store.categories["location"] == ["France", "UK"]
+    assert store.column("location").tolist() == [1, -1, 0, 1]
+    assert store.get("b") == {"location": None}
+
+
+def test_update_rows():
+    store = IndividualStore()
+    rows = store.update(["a", "b"], {"dod": [None, None]})
+    store.update_rows(rows[[1]], {"dod": ["14/02/2017"]})
+
+    assert np.isnat(store.column("dod")[0])
+    assert store.column("dod")[1] == np.datetime64('2017-02-14')
+
+
+def test_update_changes():
+    store = IndividualStore()
+    store.update_changes(["a", "b", "c"], {"location": ["UK", "UK", "France"], "dod": [None, None, None],
+                                           "name": ["x", "y", "z"]})
+
+    # Only "b" (moved and died) and "c" (renamed) change; "d" is new
+    changes = store.update_changes(["a", "b", "c", "d"], {"location": ["UK", "dead", "France", "UK"],
+                                                          "dod": [None, "14/02/2017", None, None],
+                                                          "name": ["x", "y", "w", "v"]})
+
+    assert changes.new_rows.tolist() == [3]
+    assert changes.moved_rows.tolist() == [1]
+    assert changes.died_rows.tolist() == [1]
+    assert changes.changed_rows["name"].tolist() == [2]
+    assert changes.updated_rows.tolist() == [1, 2]
+    assert store.decoded_column("location").tolist() == ["UK", "dead", "France", "UK"]
+    assert store.column("name").tolist() == ["x", "y", "w", "v"]
+
+
+def test_to_datetime64():
+    dates = to_datetime64(["01/03/1970", "None", None])
+    assert dates[0] == np.datetime64('1970-03-01')
+    assert np.isnat(dates[1]) and np.isnat(dates[2])
@@ -1,3 +1,7 @@
+import datetime
+
+import numpy as np
+
 from model.individuals import Individuals
 
 
@@ -66,3 +70,29 @@ def test_update_from_file_2():
         'id-2': {'name': 'Dave', 'age': 29}}
 
     assert individuals.timestep == 1
+
+
+def test_update_individuals_columnar():
+    individuals = Individuals()
+    individuals.update_individuals(["id-1", "id-2"], {"location": ["Germany", "France"],
+                                                      "dob": ["01/03/1970", "26/04/1973"],
+                                                      "dod": ["None", "None"]})
+
+    # Update an existing individual and add a new one
+    changes = individuals.update_individuals(["id-2", "id-3"], {"location": ["dead", "Germany"],
+                                                                "dob": ["26/04/1973", "25/08/2010"],
+                                                                "dod": ["14/02/2017", "None"]})
+    assert changes.rows.tolist() == [1, 2]
+    assert changes.new_rows.tolist() == [2]
+    assert changes.moved_rows.tolist() == [1]
+    assert changes.died_rows.tolist() == [1]
+    assert changes.changed_rows["dob"].tolist() == []
+
+    store = individuals.store
+    assert store.ids.tolist() == ["id-1", "id-2", "id-3"]
+    assert store.decoded_column("location").tolist() == ["Germany", "dead", "Germany"]
+    assert store.column("dob").dtype == np.dtype('datetime64[D]')
+    assert store.column("dod")[1] == np.datetime64('2017-02-14')
+    assert np.isnat(store.column("dod")[0])
+    assert individuals.individual_to_attributes["id-2"] == {
+        "location": "dead", "dob": datetime.date(1973, 4, 26), "dod": datetime.date(2017, 2, 14)}
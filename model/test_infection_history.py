@@ -0,0 +1,86 @@
+import numpy as np
+
+from model.individual_store import IndividualStore
+from model.infection_history import InfectionHistory
+from model.infections import Infections
+
+FRAMES = [
+    (0, ["0001", "0002"], [None, "c-1"]),
+    (1, ["0003", "0001"], ["c-2", "c-1"]),
+    (2, ["0002"], [None])
+]
+
+
+def test_from_frames_fills_forward():
+    history = InfectionHistory.from_frames(FRAMES)
+
+    assert history.timesteps == [0, 1, 2]
+    assert history.strains == [None, "c-1", "c-2"]
+    assert history.matrix.dtype == np.int16
+    assert history.matrix.tolist() == [[0, 1, 0],
+                                       [1, 1, 2],
+                                       [1, 0, 2]]
+
+    assert history.strain("0001", 0) is None
+    assert history.strain("0001", 2) == "c-1"
+    assert history.strain("0003", 0) is None
+    assert history.strain("unknown", 1) is None
+    assert history.infected(2).tolist() == [True, False, True]
+
+
+def test_append_matches_from_frames():
+    history = InfectionHistory()
+    for timestep, individual_ids, strains in FRAMES:
+        history.append(timestep, individual_ids, strains)
+
+    expected = InfectionHistory.from_frames(FRAMES)
+    for timestep in expected.timesteps:
+        assert np.array_equal(history.codes(timestep), expected.codes(timestep))
+
+
+def test_shared_index():
+    store = IndividualStore()
+    store.rows(["0003", "0002"])
+    history = InfectionHistory.from_frames(FRAMES, index=store)
+
+    # The columns follow the rows of the store, including individuals added by the infection data
+    assert store.ids.tolist() == ["0003", "0002", "0001"]
+    assert history.codes(1).tolist() == [2, 1, 1]
+
+    # Individuals added to the store later are not infected
+    store.rows(["0004"])
+    assert history.codes(2).tolist() == [2, 0, 1, 0]
+
+
+def test_memory_mapped(tmp_path):
+    path = str(tmp_path / "history.npy")
+    history = InfectionHistory.from_frames(FRAMES, dtype=np.int32, memmap_path=path)
+
+    assert isinstance(history.matrix, np.memmap)
+    assert np.load(path).tolist() == [[0, 1, 0], [1, 1, 2], [1, 0, 2]]
+
+
+def test_from_file():
+    individual_ids, strains = Infections.read_file("./model/test_data/infections_1.csv", ",", "\"", "utf-8")
+    history = InfectionHistory.from_frames([(5, individual_ids, strains)])
+
+    assert history.strain("0003", 5) == "ebola"
+    assert history.infected(5).tolist() == [False, False, True]
+
+
+def test_append_with_window():
+    history = InfectionHistory(window=2)
+    for timestep, individual_ids, strains in FRAMES:
+        history.append(timestep, individual_ids, strains)
+
+    # Only the last two timesteps are retained, but the states are still carried forward
+    expected = InfectionHistory.from_frames(FRAMES)
+    assert history.timesteps == [1, 2]
+    assert sorted(history.timestep_to_row.values()) == [0, 1]
+    for timestep in [1, 2]:
+        assert np.array_equal(history.codes(timestep), expected.codes(timestep))
+
+    history = InfectionHistory(window=1)
+    for timestep, individual_ids, strains in FRAMES:
+        history.append(timestep, individual_ids, strains)
+    assert np.array_equal(history.codes(2), expected.codes(2))
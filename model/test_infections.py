@@ -1,3 +1,5 @@
+import logging
+
 from model.infections import Infections
 
 
@@ -36,4 +38,15 @@ def test_infections_from_file_1():
         "0003": "ebola"
     }
 
-    assert infections.timestep == 1
\ No newline at end of file
+    assert infections.timestep == 1
+
+def test_infections_from_file_summary(caplog):
+    infections = Infections()
+
+    with caplog.at_level(logging.INFO, logger='infections'):
+        infections.update_from_file(1, "./model/test_data/infections_1.csv", ",", "\"", "utf-8")
+
+    # A summary of the file is logged rather than a message per new individual
+    messages = [record.getMessage() for record in caplog.records]
+    assert "Processed 3 infections from file (3 new individuals, 1 infected)" in messages
+    assert not any(message.startswith("Adding individual") for message in messages)
@@ -0,0 +1,41 @@
+import numpy as np
+
+from etl.loader import TimestepData
+from model.inference import InferenceEngine, create_particle_filter
+
+
+def test_process_timesteps():
+    engine = InferenceEngine(create_particle_filter({'num_particles': 50, 'seed': 1}))
+
+    engine.process(TimestepData(0,
+                                individuals={'id': np.array(['1', '2', '3'], dtype=object),
+                                             'location': np.array(['A', 'A', 'dead'], dtype=object)},
+                                infections={'individual_id': np.array(['1', '4'], dtype=object),
+                                            'infection_strain': np.array(['c-1', 'None'], dtype=object)}))
+    engine.process(TimestepData(1))
+
+    # The individual only in the infections data is added to the individuals axis
+    assert engine.individuals.store.ids.tolist() == ['1', '2', '3', '4']
+    assert engine.particle_filter.num_individuals == 4
+    assert engine.locations().tolist() == [0, 0, -1, -1]
+    assert engine.infection_history.infected(1).tolist() == [True, False, False, False]
+
+    assert [timestep for timestep, _, _ in engine.estimates] == [0, 1]
+    infection_probability = engine.estimates[-1][1]
+    assert infection_probability.shape == (4,)
+
+
+def test_subpopulations_follow_changes():
+    engine = InferenceEngine(create_particle_filter({'num_particles': 10, 'seed': 1}))
+
+    engine.process(TimestepData(0,
+                                individuals={'id': np.array(['1', '2', '3'], dtype=object),
+                                             'location': np.array(['A', 'B', 'A'], dtype=object)},
+                                infections={'individual_id': np.array(['4'], dtype=object),
+                                            'infection_strain': np.array(['c-1'], dtype=object)}))
+    engine.process(TimestepData(1,
+                                individuals={'id': np.array(['1', '2', '3', '4'], dtype=object),
+                                             'location': np.array(['A', 'dead', 'B', 'B'], dtype=object)}))
+
+    assert engine.subpopulations.locations.tolist() == engine.locations().tolist()
+    assert engine.subpopulations.members(1).tolist() == [2, 3]
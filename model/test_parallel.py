@@ -0,0 +1,80 @@
+import numpy as np
+
+from model.parallel import ParallelPropagator
+from model.particle_filter import ParticleFilter, propagate_blocks
+from model.subpopulations import SubpopulationIndex
+from model.sweep import GridParticleFilter
+
+
+def run_filter(propagator):
+    particle_filter = ParticleFilter(num_particles=150, num_individuals=20, seed=4, propagator=propagator)
+    locations = SubpopulationIndex(np.array([0] * 8 + [1] * 8 + [-1] * 4))
+
+    for timestep in range(4):
+        particle_filter.step(timestep, locations, np.arange(20), np.arange(20) < 5 + timestep)
+
+    particle_filter.close()
+    return particle_filter
+
+
+def test_parallel_matches_serial():
+    serial = run_filter(None)
+
+    for max_workers in [1, 3]:
+        parallel = run_filter(ParallelPropagator(max_workers))
+        assert np.array_equal(parallel.states, serial.states)
+        assert np.array_equal(parallel.weights, serial.weights)
+
+
+def test_parallel_resize():
+    states = np.zeros((100, 5), dtype=bool)
+    parameters = np.full((100, 2), [100.0, 0.0])
+    seeds = np.random.SeedSequence(1).spawn(2)
+
+    with ParallelPropagator(2) as propagator:
+        new_states = propagator.propagate(states, parameters, SubpopulationIndex(np.zeros(5)), seeds)
+        assert not np.any(new_states)
+
+        # More individuals than fit in the shared memory block
+        states = np.ones((100, 50), dtype=bool)
+        new_states = propagator.propagate(states, parameters, SubpopulationIndex(np.zeros(50)), seeds)
+        assert np.all(new_states)
+
+
+def test_particles_held_in_shared_memory():
+    with ParallelPropagator(2) as propagator:
+        particle_filter = ParticleFilter(num_particles=100, num_individuals=10, seed=4, propagator=propagator)
+        locations = SubpopulationIndex(np.zeros(10))
+        particle_filter.step(0, locations, np.arange(10), np.arange(10) < 5)
+
+        # The particles are propagated in place rather than copied in and out of shared memory
+        states = particle_filter.states
+        particle_filter.predict(locations)
+        assert particle_filter.states is states
+        assert states is propagator.shared_arrays['states'][propagator.current['states']].array
+
+        # Resampling gathers the particles into the other block of shared memory
+        particle_filter.resample()
+        assert particle_filter.states is propagator.shared_arrays['states'][propagator.current['states']].array
+        assert not np.shares_memory(particle_filter.states, states)
+
+        particle_filter.close()
+        assert particle_filter.states.shape == (100, 10)
+
+
+def test_parallel_blocks_of_points():
+    grid_filter = GridParticleFilter(np.array([[0.5, 0.2], [0.9, 0.1], [0.3, 0.3]]), 70, seed=2)
+    grid_filter.add_individuals(6)
+    grid_filter.states[:] = np.random.default_rng(1).random((210, 6)) < 0.5
+    locations = SubpopulationIndex(np.array([0, 0, 0, 1, 1, 1]))
+
+    # The blocks don't fall on multiples of the block size, as each point's particles start a new block
+    block_seeds, block_starts = grid_filter.blocks()
+    assert block_starts.tolist() == [0, 64, 70, 134, 140, 204]
+
+    states = np.array(grid_filter.states)
+    propagate_blocks(states, grid_filter.parameters, locations, block_seeds, block_starts)
+    with ParallelPropagator(4) as propagator:
+        parallel_states = propagator.propagate(grid_filter.states, grid_filter.parameters, locations, block_seeds,
+                                               block_starts)
+        assert np.array_equal(parallel_states, states)
@@ -0,0 +1,198 @@
+import numpy as np
+
+from model.particle_filter import ParticleFilter, exclude_locations, propagate, weighted_sum
+from model.subpopulations import SubpopulationIndex
+
+
+def test_exclude_locations():
+    codes = exclude_locations(np.array([0, 1, 2, 0, 3, -1]), ["Germany", "dead", "France", "Unknown"])
+    assert codes.tolist() == [0, -1, 2, 0, -1, -1]
+
+
+def test_propagate_no_transmission():
+    states = np.array([[True, False, False],
+                       [False, False, False]])
+    parameters = np.array([[0.0, 0.0],
+                           [0.0, 0.0]])
+    locations = SubpopulationIndex(np.array([0, 0, 1]))
+
+    new_states = propagate(states, parameters, locations, np.random.default_rng(1))
+    assert np.array_equal(new_states, states)
+
+
+def test_propagate_excluded_keeps_state():
+    states = np.array([[True, False, True]])
+    parameters = np.array([[100.0, 1.0]])
+    locations = SubpopulationIndex(np.array([0, 0, -1]))
+
+    new_states = propagate(states, parameters, locations, np.random.default_rng(1))
+
+    # The infected individual recovers, the susceptible individual is infected and the excluded one is unchanged
+    assert new_states.tolist() == [[False, True, True]]
+
+
+def test_add_individuals():
+    particle_filter = ParticleFilter(num_particles=4, num_individuals=2, seed=1)
+    particle_filter.add_individuals(3)
+    assert particle_filter.states.shape == (4, 5)
+    assert not np.any(particle_filter.states)
+
+
+def test_update_weights_favour_matching_particles():
+    parameters = np.full((2, 2), 0.5)
+    particle_filter = ParticleFilter(num_particles=2, num_individuals=2, parameters=parameters, seed=1)
+    particle_filter.states[0] = [True, False]
+    particle_filter.states[1] = [False, True]
+
+    particle_filter.update(np.array([0, 1]), np.array([True, False]))
+
+    assert particle_filter.weights[0] > 0.99
+    assert np.isclose(np.sum(particle_filter.weights), 1.0)
+
+
+def test_blocked_estimate_and_likelihood():
+    rng = np.random.default_rng(3)
+    particle_filter = ParticleFilter(num_particles=150, num_individuals=20, seed=3)
+    particle_filter.states[:] = rng.random((150, 20)) < 0.3
+    weights = rng.random(150)
+    observed_individuals = np.array([1, 4, 5, 19])
+    observed_infected = np.array([True, False, True, False])
+
+    assert np.allclose(weighted_sum(weights, particle_filter.states), weights @ particle_filter.states)
+
+    # Observing a subset of the individuals matches a filter of only those individuals
+    subset = ParticleFilter(num_particles=150, num_individuals=4, seed=3)
+    subset.states[:] = particle_filter.states[:, observed_individuals]
+    assert np.allclose(particle_filter.log_likelihood(observed_individuals, observed_infected),
+                       subset.log_likelihood(np.arange(4), observed_infected))
+
+
+def test_step_and_estimate():
+    particle_filter = ParticleFilter(num_particles=200, num_individuals=10, seed=2)
+    locations = SubpopulationIndex(np.array([0, 0, 0, 0, 0, 1, 1, 1, 1, -1]))
+
+    particle_filter.step(0, locations, np.arange(10), np.arange(10) < 3)
+    particle_filter.step(1, locations, np.arange(10), np.arange(10) < 4)
+
+    infection_probability, parameter_means = particle_filter.estimate()
+    assert infection_probability.shape == (10,)
+    assert np.all((infection_probability >= 0.0) & (infection_probability <= 1.0 + 1e-9))
+    assert set(parameter_means.keys()) == set(ParticleFilter.PARAMETER_NAMES)
+    assert particle_filter.timestep == 1
+
+
+def test_initialise_from_observations():
+    particle_filter = ParticleFilter(num_particles=1000, num_individuals=3, false_positive_rate=0.0,
+                                     false_negative_rate=0.0, seed=3)
+    particle_filter.initialise(np.array([0, 2]), np.array([True, False]))
+
+    assert np.all(particle_filter.states[:, 0])
+    assert not np.any(particle_filter.states[:, 1:])
+
+
+def test_resample_only_below_threshold():
+    parameters = np.full((4, 2), 0.5)
+    particle_filter = ParticleFilter(num_particles=4, num_individuals=1, parameters=parameters,
+                                     resampling_threshold=0.5, seed=4)
+    particle_filter.step(0, SubpopulationIndex(np.array([0])), np.array([0]), np.array([True]))
+
+    # All particles agree, so the effective sample size stays high and the weights are kept
+    particle_filter.states[:] = True
+    particle_filter.weights = np.array([0.4, 0.3, 0.2, 0.1])
+    particle_filter.parameters[:, 1] = 0.0
+    particle_filter.step(1, SubpopulationIndex(np.array([0])), np.array([0]), np.array([True]))
+    assert np.allclose(particle_filter.weights, [0.4, 0.3, 0.2, 0.1])
+
+    # A single particle explains the observation, so the particles are resampled
+    particle_filter.weights = np.full(4, 0.25)
+    particle_filter.states[:] = [[True], [False], [False], [False]]
+    particle_filter.parameters[:, 0] = 0.0
+    particle_filter.update(np.array([0]), np.array([True]))
+    assert particle_filter.effective_sample_size() < 2.0
+    particle_filter.resample()
+    assert np.all(particle_filter.states)
+    assert np.allclose(particle_filter.weights, 0.25)
+
+
+def test_update_large_number_of_observations():
+    parameters = np.full((3, 2), 0.5)
+    particle_filter = ParticleFilter(num_particles=3, num_individuals=200000, parameters=parameters, seed=5)
+    observed_infected = np.arange(200000) % 10 == 0
+    particle_filter.states[0] = observed_infected
+    particle_filter.states[1] = np.arange(200000) % 10 == 1
+    particle_filter.states[2] = observed_infected
+    particle_filter.states[2, :1000] = ~observed_infected[:1000]
+
+    # The product of the per-individual likelihoods underflows, but the weights are still well defined
+    particle_filter.update(np.arange(200000), observed_infected)
+    assert np.allclose(particle_filter.weights, [1.0, 0.0, 0.0])
+    assert np.isfinite(particle_filter.log_marginal_likelihood)
+
+
+def test_log_likelihood():
+    parameters = np.full((2, 2), 0.5)
+    particle_filter = ParticleFilter(num_particles=2, num_individuals=3, parameters=parameters,
+                                     false_positive_rate=0.1, false_negative_rate=0.2, seed=6)
+    particle_filter.states[0] = [True, False, True]
+    particle_filter.states[1] = [False, False, False]
+
+    log_likelihood = particle_filter.log_likelihood(np.array([0, 1, 2]), np.array([True, True, False]))
+    assert np.allclose(log_likelihood, [np.log(0.8 * 0.1 * 0.2), np.log(0.1 * 0.1 * 0.9)])
+
+
+def test_update_log_marginal_likelihood():
+    parameters = np.full((2, 2), 0.5)
+    particle_filter = ParticleFilter(num_particles=2, num_individuals=1, parameters=parameters,
+                                     false_positive_rate=0.1, false_negative_rate=0.2, seed=7)
+    particle_filter.states[0] = [True]
+
+    particle_filter.update(np.array([0]), np.array([True]))
+    assert np.isclose(particle_filter.log_marginal_likelihood, np.log(0.5 * 0.8 + 0.5 * 0.1))
+
+
+def test_update_impossible_observations():
+    parameters = np.full((2, 2), 0.5)
+    particle_filter = ParticleFilter(num_particles=2, num_individuals=1, parameters=parameters,
+                                     false_positive_rate=0.0, false_negative_rate=0.0, seed=8)
+
+    try:
+        particle_filter.update(np.array([0]), np.array([True]))
+        assert False
+    except ValueError:
+        pass
+
+
+def test_predictive_log_likelihood():
+    num_particles = 20000
+    particle_filter = ParticleFilter(num_particles=num_particles, num_individuals=4,
+                                     parameters=np.tile([[0.8, 0.3]], (num_particles, 1)), seed=1)
+    particle_filter.states[:] = [True, False, False, True]
+    subpopulations = SubpopulationIndex(np.array([0, 0, 1, -1]))
+    observed_individuals = np.array([0, 1, 3])
+    observed_infected = np.array([True, True, False])
+
+    log_predictive = particle_filter.predictive_log_likelihood(subpopulations, observed_individuals,
+                                                               observed_infected)
+    assert np.allclose(log_predictive, log_predictive[0])
+
+    # The predictive likelihood is the expected likelihood of the observations after propagating the particles
+    particle_filter.predict(subpopulations)
+    likelihood = np.exp(particle_filter.log_likelihood(observed_individuals, observed_infected))
+    assert np.isclose(np.exp(log_predictive[0]), np.mean(likelihood), rtol=0.05)
+
+
+def test_auxiliary_step():
+    particle_filter = ParticleFilter(num_particles=50, num_individuals=3, seed=1, auxiliary=True)
+    subpopulations = SubpopulationIndex(np.array([0, 0, 1]))
+    observed_individuals = np.arange(3)
+
+    particle_filter.step(0, subpopulations, observed_individuals, np.array([True, False, False]))
+    particle_filter.step(1, subpopulations, observed_individuals, np.array([True, True, False]))
+
+    assert particle_filter.first_stage_log_likelihood is None
+    assert np.isfinite(particle_filter.log_marginal_likelihood)
+    assert np.isclose(np.sum(particle_filter.weights), 1.0)
+
+    # The variant is restored from a checkpoint
+    restored = ParticleFilter.from_checkpoint(*particle_filter.to_checkpoint())
+    assert restored.auxiliary
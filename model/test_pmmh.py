@@ -0,0 +1,78 @@
+import numpy as np
+
+from etl.loader import TimestepData
+from model.pmmh import PMMH, create_pmmh
+from model.sweep import precompute
+
+
+def create_timesteps():
+    data = [TimestepData(0,
+                         individuals={'id': np.array(['1', '2', '3', '4'], dtype=object),
+                                      'location': np.array(['A', 'A', 'B', 'B'], dtype=object)},
+                         infections={'individual_id': np.array(['1'], dtype=object),
+                                     'infection_strain': np.array(['c-1'], dtype=object)})]
+    for timestep in range(1, 5):
+        data.append(TimestepData(timestep,
+                                 infections={'individual_id': np.array(['2', '3'], dtype=object),
+                                             'infection_strain': np.array(['c-1', 'None'], dtype=object)}))
+    return precompute(data)
+
+
+def test_run_filter_is_determined_by_seeds():
+    sampler = PMMH(create_timesteps(), 20, [0.1, 0.1], seed=1)
+    seeds = sampler.draw_seeds(5)
+
+    state = sampler.run_filter(np.array([0.4, 0.2]), seeds)
+    assert np.isfinite(state.log_likelihood)
+    assert state.infection_probability.shape == (4,)
+
+    # The same parameters and seeds give the same estimate
+    assert sampler.run_filter(np.array([0.4, 0.2]), seeds).log_likelihood == state.log_likelihood
+    assert sampler.num_runs == 2
+
+
+def test_propose_keeps_seeds():
+    sampler = PMMH(create_timesteps(), 20, [0.1, 0.1], correlation=1.0, seed=1)
+    state = sampler.run_filter(np.array([0.4, 0.2]), sampler.draw_seeds(5))
+
+    parameters, seeds = sampler.propose(state)
+    assert np.array_equal(seeds, state.seeds)
+    assert not np.array_equal(parameters, state.parameters)
+
+    sampler.correlation = 0.0
+    _, seeds = sampler.propose(state)
+    assert not np.any(seeds == state.seeds)
+
+
+def test_run():
+    sampler = create_pmmh(create_timesteps(), {'num_particles': 20, 'seed': 2},
+                          {'prior': {'transmission_rate': (0.0, 2.0), 'recovery_probability': (0.0, 1.0)}})
+    result = sampler.run(30)
+
+    assert result.samples.shape == (30, 2)
+    assert 0 < result.num_accepted <= 30
+
+    # The filter is run once per iteration (and for the initial state), except for proposals outside the prior
+    assert sampler.num_runs <= 31
+
+    # Every sample is within the prior and the chain stays put when a proposal is rejected
+    assert np.all((result.samples[:, 0] >= 0.0) & (result.samples[:, 0] <= 2.0))
+    assert np.all((result.samples[:, 1] >= 0.0) & (result.samples[:, 1] <= 1.0))
+    changes = np.any(np.diff(result.samples, axis=0) != 0, axis=1)
+    assert np.sum(changes) <= result.num_accepted
+
+    assert set(result.posterior_means(burn_in=10).keys()) == {'transmission_rate', 'recovery_probability'}
+
+
+def test_step_leaves_impossible_state():
+    sampler = PMMH(create_timesteps(), 20, [0.1, 0.1], seed=3)
+    state = sampler.run_filter(np.array([0.4, 0.2]), sampler.draw_seeds(5))
+    state.log_likelihood = -np.inf
+
+    # The first proposal within the prior (under which the data is possible) is accepted
+    for _ in range(10):
+        state, accepted = sampler.step(state)
+        if accepted:
+            break
+    assert accepted
+    assert np.isfinite(state.log_likelihood)
@@ -0,0 +1,54 @@
+import numpy as np
+
+from model.resampling import effective_sample_size, resample, residual, SCHEMES
+
+
+def test_effective_sample_size():
+    assert np.isclose(effective_sample_size(np.full(10, 0.1)), 10.0)
+    assert np.isclose(effective_sample_size(np.array([1.0, 0.0, 0.0])), 1.0)
+
+
+def test_schemes_return_valid_indices():
+    weights = np.array([0.1, 0.2, 0.3, 0.4])
+    for scheme in SCHEMES.keys():
+        indices = resample(weights, np.random.default_rng(1), scheme)
+        assert indices.shape == (4,)
+        assert np.all((indices >= 0) & (indices < 4))
+
+
+def test_schemes_ignore_zero_weights():
+    weights = np.array([0.0, 0.5, 0.0, 0.5, 0.0])
+    for scheme in SCHEMES.keys():
+        indices = resample(weights, np.random.default_rng(2), scheme)
+        assert set(indices.tolist()) <= {1, 3}
+
+
+def test_schemes_proportional_to_weights():
+    weights = np.array([0.1, 0.2, 0.3, 0.4])
+    for scheme in SCHEMES.keys():
+        indices = resample(weights, np.random.default_rng(3), scheme, num_samples=100000)
+        frequencies = np.bincount(indices, minlength=4) / 100000
+        assert np.allclose(frequencies, weights, atol=0.01)
+
+
+def test_residual_deterministic_copies():
+    weights = np.array([0.5, 0.25, 0.25])
+    indices = residual(weights, np.random.default_rng(4), num_samples=4)
+    assert indices.tolist() == [0, 0, 1, 2]
+
+
+def test_unknown_scheme():
+    try:
+        resample(np.array([1.0]), np.random.default_rng(5), 'unknown')
+        assert False
+    except ValueError:
+        pass
+
+
+def test_schemes_return_sorted_indices():
+    weights = np.random.default_rng(6).random(50)
+    weights /= np.sum(weights)
+    for scheme in SCHEMES.keys():
+        indices = resample(weights, np.random.default_rng(7), scheme, num_samples=80)
+        assert indices.shape == (80,)
+        assert np.all(np.diff(indices) >= 0)
@@ -0,0 +1,92 @@
+import numpy as np
+
+from etl.loader import TimestepData
+from model.inference import InferenceEngine, create_particle_filter
+from model.particle_filter import ParticleFilter
+from model.smoother import FixedLagSmoother
+
+
+def set_timestep(particle_filter, timestep, states, weights, ancestors=None):
+    particle_filter.timestep = timestep
+    particle_filter.states = np.array(states, dtype=bool)
+    particle_filter.weights = np.array(weights, dtype=np.float64)
+    particle_filter.ancestors = None if ancestors is None else np.array(ancestors)
+
+
+def test_smoothed_estimate_without_resampling():
+    particle_filter = ParticleFilter(num_particles=2, num_individuals=3, seed=1)
+    smoother = FixedLagSmoother(1)
+
+    set_timestep(particle_filter, 0, [[True, False, False], [False, True, False]], [0.5, 0.5])
+    assert smoother.update(particle_filter) is None
+
+    set_timestep(particle_filter, 1, [[True, True, False], [False, False, False]], [0.8, 0.2])
+    timestep, infection_probability = smoother.update(particle_filter)
+
+    # The later weights are applied to the earlier states
+    assert timestep == 0
+    assert np.allclose(infection_probability, [0.8, 0.2, 0.0])
+
+
+def test_smoothed_estimate_of_several_blocks():
+    rng = np.random.default_rng(2)
+    particle_filter = ParticleFilter(num_particles=150, num_individuals=20, seed=2)
+    smoother = FixedLagSmoother(1)
+
+    states = rng.random((150, 20)) < 0.4
+    set_timestep(particle_filter, 0, states, np.full(150, 1 / 150))
+    smoother.update(particle_filter)
+    weights = rng.random(150)
+    set_timestep(particle_filter, 1, states, weights / np.sum(weights))
+    _, infection_probability = smoother.update(particle_filter)
+
+    assert np.allclose(infection_probability, particle_filter.weights @ states)
+
+
+def test_smoothed_estimate_follows_ancestors():
+    particle_filter = ParticleFilter(num_particles=3, num_individuals=2, seed=1)
+    smoother = FixedLagSmoother(2)
+
+    set_timestep(particle_filter, 0, [[True, False], [False, True], [False, False]], [1 / 3] * 3)
+    smoother.update(particle_filter)
+    set_timestep(particle_filter, 1, [[True, False], [True, False], [False, True]], [1 / 3] * 3, ancestors=[0, 0, 1])
+    smoother.update(particle_filter)
+    set_timestep(particle_filter, 2, [[False, False]] * 3, [0.5, 0.25, 0.25], ancestors=[2, 2, 0])
+    timestep, infection_probability = smoother.update(particle_filter)
+
+    # The particles at timestep 2 descend from particles 1, 1 and 0 at timestep 0
+    assert timestep == 0
+    assert np.allclose(infection_probability, [0.25, 0.75])
+
+    # The remaining timesteps are smoothed over fewer later timesteps
+    flushed = smoother.flush(particle_filter.weights)
+    assert [timestep for timestep, _ in flushed] == [1, 2]
+    assert np.allclose(flushed[0][1], [0.25, 0.75])
+    assert np.allclose(flushed[1][1], [0.0, 0.0])
+
+
+def test_resampling_composes_ancestors():
+    particle_filter = ParticleFilter(num_particles=3, num_individuals=1, seed=1)
+    particle_filter.resample(np.array([2, 2, 1]))
+    particle_filter.resample(np.array([1, 0, 0]))
+    assert particle_filter.ancestors.tolist() == [2, 2, 2]
+
+
+def test_engine_smoothed_estimates_lag():
+    engine = InferenceEngine(create_particle_filter({'num_particles': 20, 'seed': 1}), smoothing_lag=2)
+
+    engine.process(TimestepData(0,
+                                individuals={'id': np.array(['1', '2'], dtype=object),
+                                             'location': np.array(['A', 'A'], dtype=object)},
+                                infections={'individual_id': np.array(['1'], dtype=object),
+                                            'infection_strain': np.array(['c-1'], dtype=object)}))
+    for timestep in range(1, 4):
+        engine.process(TimestepData(timestep))
+
+    assert [timestep for timestep, _ in engine.smoothed_estimates] == [0, 1]
+
+    engine.flush_smoothed()
+    assert [timestep for timestep, _ in engine.smoothed_estimates] == [0, 1, 2, 3]
+
+    # The smoothed estimate of the last timestep is its filtered estimate
+    assert np.allclose(engine.smoothed_estimates[-1][1], engine.estimates[-1][1])
@@ -0,0 +1,86 @@
+import numpy as np
+
+from etl.loader import TimestepLoader
+from model.inference import InferenceEngine, create_particle_filter
+from model.streaming import StreamingInference
+
+
+def write_timestep(individuals_folder, infections_folder, timestep):
+    (individuals_folder / ("individual_%04d.csv" % timestep)).write_text(
+        "id,location\n0001,A\n0002,A\n%04d,B\n" % (timestep + 3))
+    (infections_folder / ("infection_%04d.csv" % timestep)).write_text(
+        "individual_id,infection_strain\n0001,c-1\n0002,%s\n" % ("c-1" if timestep % 2 else "None"))
+
+
+def create_streaming(tmp_path, window=None):
+    individuals_folder = tmp_path / "individuals"
+    infections_folder = tmp_path / "infections"
+    individuals_folder.mkdir(exist_ok=True)
+    infections_folder.mkdir(exist_ok=True)
+
+    loader = TimestepLoader(str(individuals_folder), str(infections_folder), ",", "\"", "utf-8", max_workers=1)
+    engine = InferenceEngine(create_particle_filter({'num_particles': 20, 'seed': 3}), window=window)
+    return StreamingInference(loader, engine), individuals_folder, infections_folder
+
+
+def test_advance_processes_only_new_timesteps(tmp_path):
+    streaming, individuals_folder, infections_folder = create_streaming(tmp_path)
+
+    for timestep in range(3):
+        write_timestep(individuals_folder, infections_folder, timestep)
+    assert streaming.advance() == [0, 1, 2]
+    assert streaming.advance() == []
+
+    for timestep in range(3, 5):
+        write_timestep(individuals_folder, infections_folder, timestep)
+    assert streaming.advance() == [3, 4]
+    assert streaming.engine.last_timestep == 4
+
+
+def test_streaming_matches_batch(tmp_path):
+    streaming, individuals_folder, infections_folder = create_streaming(tmp_path)
+    for timestep in range(4):
+        write_timestep(individuals_folder, infections_folder, timestep)
+
+    streaming.advance([0, 1])
+    streaming.advance()
+
+    batch = InferenceEngine(create_particle_filter({'num_particles': 20, 'seed': 3}))
+    for data in streaming.loader.load():
+        batch.process(data)
+
+    assert np.array_equal(streaming.engine.particle_filter.states, batch.particle_filter.states)
+
+
+def test_memory_bounded_by_window(tmp_path):
+    streaming, individuals_folder, infections_folder = create_streaming(tmp_path, window=2)
+    for timestep in range(6):
+        write_timestep(individuals_folder, infections_folder, timestep)
+    streaming.watch(poll_seconds=0.01, max_polls=1)
+
+    assert [timestep for timestep, _, _ in streaming.engine.estimates] == [4, 5]
+    assert streaming.engine.infection_history.timesteps == [4, 5]
+
+
+def test_advance_already_processed(tmp_path):
+    streaming, individuals_folder, infections_folder = create_streaming(tmp_path)
+    write_timestep(individuals_folder, infections_folder, 0)
+    streaming.advance()
+
+    try:
+        streaming.advance([0])
+        assert False
+    except ValueError:
+        pass
+
+
+def test_watch_reports_advances(tmp_path):
+    streaming, individuals_folder, infections_folder = create_streaming(tmp_path)
+    for timestep in range(2):
+        write_timestep(individuals_folder, infections_folder, timestep)
+
+    advances = []
+    streaming.watch(poll_seconds=0.01, max_polls=2, on_advance=advances.append)
+
+    # The second check finds no new timesteps
+    assert advances == [[0, 1]]
@@ -0,0 +1,65 @@
+import numpy as np
+
+from model.subpopulations import SubpopulationIndex
+
+
+def test_members_and_sizes():
+    index = SubpopulationIndex(np.array([1, 0, -1, 1, 3]))
+
+    assert index.num_locations == 4
+    assert index.members(0).tolist() == [1]
+    assert index.members(1).tolist() == [0, 3]
+    assert index.members(2).tolist() == []
+    assert index.members(-1).tolist() == []
+    assert index.location_sizes().tolist() == [1, 2, 0, 1]
+
+
+def test_segment_sums_and_gather():
+    index = SubpopulationIndex(np.array([1, 0, -1, 1, 3]))
+    states = np.array([[True, True, True, True, False],
+                       [False, False, True, True, True]])
+
+    # The excluded individual isn't counted in any location
+    counts = index.segment_sums(states)
+    assert counts.tolist() == [[1, 2, 0, 0],
+                               [0, 1, 0, 1]]
+
+    # The excluded individual has a value of zero
+    assert index.gather(counts).tolist() == [[2, 1, 0, 2, 0],
+                                             [1, 0, 0, 1, 1]]
+
+
+def test_update_locations():
+    index = SubpopulationIndex(np.array([0, 0, 1]))
+    index.set_locations(np.array([0, 1, 1, -1, 0]))
+
+    assert index.size == 5
+    assert index.members(0).tolist() == [0, 4]
+    assert index.members(1).tolist() == [1, 2]
+    assert index.active.tolist() == [True, True, True, False, True]
+
+    index.update(np.array([0]), np.array([-1]))
+    assert index.members(0).tolist() == [4]
+    assert index.location_sizes().tolist() == [1, 2]
+
+
+def test_incremental_update_matches_rebuild():
+    rng = np.random.default_rng(3)
+    index = SubpopulationIndex(rng.integers(-1, 6, 200))
+    index.num_locations
+
+    for _ in range(20):
+        rows = rng.choice(index.size, 15, replace=False)
+        index.update(rows, rng.integers(-1, 6, 15))
+        index.add_individuals(int(rng.integers(0, 3)))
+
+        # The index is updated without a full rebuild and matches an index built from scratch
+        assert not index._stale
+        rebuilt = SubpopulationIndex(index.locations.copy())
+        assert rebuilt.num_locations == index.num_locations
+        assert np.array_equal(index.order, rebuilt.order)
+        assert np.array_equal(index.offsets, rebuilt.offsets)
+        assert np.array_equal(index.segments, rebuilt.segments)
+
+    states = rng.random((3, index.size)) < 0.5
+    assert np.array_equal(index.segment_sums(states), rebuilt.segment_sums(states))
@@ -0,0 +1,105 @@
+import numpy as np
+
+from etl.loader import TimestepData
+from model.particle_filter import ParticleFilter
+from model.sweep import GridParticleFilter, create_grid, precompute, sweep
+
+
+def create_data():
+    return [
+        TimestepData(0,
+                     individuals={'id': np.array(['1', '2', '3', '4'], dtype=object),
+                                  'location': np.array(['A', 'A', 'B', 'B'], dtype=object)},
+                     infections={'individual_id': np.array(['1'], dtype=object),
+                                 'infection_strain': np.array(['c-1'], dtype=object)}),
+        TimestepData(1,
+                     infections={'individual_id': np.array(['2'], dtype=object),
+                                 'infection_strain': np.array(['c-1'], dtype=object)}),
+        TimestepData(2,
+                     individuals={'id': np.array(['1', '2', '3', '4', '5'], dtype=object),
+                                  'location': np.array(['A', 'A', 'B', 'dead', 'B'], dtype=object)},
+                     infections={'individual_id': np.array(['1'], dtype=object),
+                                 'infection_strain': np.array(['None'], dtype=object)})
+    ]
+
+
+def test_precompute():
+    timesteps = precompute(create_data())
+
+    assert [sweep_timestep.timestep for sweep_timestep in timesteps] == [0, 1, 2]
+    assert timesteps[0].infected.tolist() == [True, False, False, False]
+    assert timesteps[1].infected.tolist() == [True, True, False, False]
+    assert timesteps[2].infected.tolist() == [False, True, False, False, False]
+
+    # The index is only rebuilt when the locations change
+    assert timesteps[1].subpopulations is timesteps[0].subpopulations
+    assert timesteps[2].subpopulations.locations.tolist() == [0, 0, 1, -1, 1]
+
+
+def test_grid_particle_filter_update():
+    grid = np.array([[0.2, 0.5], [0.8, 0.1]])
+    grid_filter = GridParticleFilter(grid, 3, seed=4)
+    grid_filter.add_individuals(4)
+    grid_filter.states = np.random.default_rng(1).random((6, 4)) < 0.5
+
+    observed_individuals = np.arange(4)
+    observed_infected = np.array([True, False, True, False])
+    grid_filter.update(observed_individuals, observed_infected)
+
+    # Each block of particles is weighted as a separate filter would be
+    for point in range(2):
+        block = slice(point * 3, (point + 1) * 3)
+        single_filter = ParticleFilter(3, 4, parameters=np.repeat(grid[[point]], 3, axis=0))
+        single_filter.states = grid_filter.states[block]
+        single_filter.update(observed_individuals, observed_infected)
+
+        assert np.allclose(grid_filter.weights[block], single_filter.weights)
+        assert np.isclose(grid_filter.log_marginal_likelihood[point], single_filter.log_marginal_likelihood)
+        assert np.isclose(grid_filter.effective_sample_size()[point], single_filter.effective_sample_size())
+
+    # Resampling a point only changes the particles of that point
+    states = grid_filter.states.copy()
+    grid_filter.resample_points(np.array([1]))
+    assert np.array_equal(grid_filter.states[:3], states[:3])
+    assert np.allclose(grid_filter.weights[3:], 1.0 / 3)
+
+    # Resampling with the indices of the selected particles (as for a ParticleFilter)
+    states = grid_filter.states.copy()
+    grid_filter.resample(np.array([2, 2, 0, 3, 5, 5]))
+    assert np.array_equal(grid_filter.states, states[[2, 2, 0, 3, 5, 5]])
+    assert np.allclose(grid_filter.weights, 1.0 / 3)
+
+
+def test_create_grid_missing_parameter():
+    try:
+        create_grid({'transmission_rate': [0.1, 0.5]})
+        assert False
+    except ValueError as error:
+        assert 'recovery_probability' in str(error)
+
+
+def test_sweep():
+    timesteps = precompute(create_data())
+    values = create_grid({'transmission_rate': [0.1, 0.5, 0.9],
+                          'recovery_probability': {'min': 0.1, 'max': 0.9, 'num': 2}})
+    assert values['recovery_probability'].tolist() == [0.1, 0.9]
+
+    surface = sweep(timesteps, values, 20, 4, {'seed': 1})
+    assert surface.log_marginal_likelihood.shape == (3, 2)
+    assert np.all(np.isfinite(surface.log_marginal_likelihood))
+
+    point, log_marginal_likelihood = surface.best()
+    assert log_marginal_likelihood == np.max(surface.log_marginal_likelihood)
+    assert len(list(surface.rows())) == 6
+
+
+def test_sweep_independent_of_batches():
+    timesteps = precompute(create_data())
+    values = create_grid({'transmission_rate': [0.1, 0.5, 0.9], 'recovery_probability': [0.2, 0.6]})
+
+    # The random numbers of a point depend on the seed and the index of the point rather than the batch
+    surface = sweep(timesteps, values, 70, 4, {'seed': 3})
+    assert np.array_equal(sweep(timesteps, values, 70, 1, {'seed': 3}).log_marginal_likelihood,
+                          surface.log_marginal_likelihood)
+    assert not np.array_equal(sweep(timesteps, values, 70, 4, {'seed': 4}).log_marginal_likelihood,
+                              surface.log_marginal_likelihood)
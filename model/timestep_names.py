@@ -1,5 +1,7 @@
 import logging
 
+import numpy as np
+
 from etl.csv_reader import DelimitedSource
 from logger import logger
 
@@ -44,20 +46,12 @@ class TimestepNames(object):
                                  encapsulator=encapsulator,
                                  encoding=encoding)
 
-        # Walk through each row of data
-        num_timesteps_processed = 0
-        for line in reader.read():
-
-            # Check the required fields are present
-            assert TimestepNames.TIMESTEP_FIELD in line.keys()
-            assert TimestepNames.TIMESTEP_NAME_FIELD in line.keys()
-
-            # Extract the timestep and name
-            timestep = int(line[TimestepNames.TIMESTEP_FIELD])
-            name = line[TimestepNames.TIMESTEP_NAME_FIELD]
-
-            self.timestep_to_name[timestep] = name
+        # Read the columns (checking the required fields are present)
+        columns = reader.read_columns(required_fields=[TimestepNames.TIMESTEP_FIELD,
+                                                       TimestepNames.TIMESTEP_NAME_FIELD])
+        timesteps = columns[TimestepNames.TIMESTEP_FIELD].astype(np.int64)
+        names = columns[TimestepNames.TIMESTEP_NAME_FIELD]
 
-            num_timesteps_processed += 1
+        self.timestep_to_name.update(zip(timesteps.tolist(), names.tolist()))
 
-        module_logger.info("Processed %d timesteps from file" % num_timesteps_processed)
+        module_logger.info("Processed %d timesteps from file" % len(timesteps))
@@ -9,7 +9,6 @@
 # Quail have a non-linear flight model (with imprecise measurements).
 # 1-D model, discrete time steps.
 
-import matplotlib.pyplot as plt
 import numpy as np
 from scipy import stats
 
@@ -121,6 +120,7 @@ def resample(x, p):
 
 
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt
 
     # Initialise the variables
     x_initial = 0.1        # initial state (position) of the quail
@@ -0,0 +1,362 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+
+import numpy as np
+
+from logger import logger
+
+# Initialise the module logger
+logger.initialise_logger("generator", log_level=logging.INFO)
+module_logger = logging.getLogger('generator')
+
+# Header of the individuals and infections files
+INDIVIDUALS_FIELDS = ['id', 'name', 'dob', 'dod', 'location']
+INFECTIONS_FIELDS = ['individual_id', 'infection_strain']
+
+# Format of a row of the individuals and infections files (the ID and name are formatted from the row number)
+INDIVIDUALS_ROW_FORMAT = "%08d,Person %d,%s,%s,%s\n"
+INFECTIONS_ROW_FORMAT = "%08d,%s\n"
+
+# Number of rows formatted and written at a time
+CHUNK_SIZE = 100000
+
+# Location of an individual who has died and strain of an individual who isn't infected
+DEAD = -1
+NOT_INFECTED = -1
+
+
+class DatasetSpec(object):
+    """
+    Specification of a synthetic data set.
+    """
+
+    def __init__(self, num_individuals, num_timesteps, num_locations=100, num_strains=3, infected_fraction=0.02,
+                 transmission_rate=0.5, recovery_probability=0.3, import_probability=0.0001, birth_rate=0.001,
+                 death_rate=0.001, infected_death_rate=0.01, move_probability=0.01, start_month='2019-03',
+                 seed=None):
+        """
+        Initialise the specification.
+
+        :param num_individuals: Number of individuals at the first timestep.
+        :param num_timesteps: Number of timesteps (each of which is a month).
+        :param num_locations: Number of locations the individuals live in.
+        :param num_strains: Number of infection strains.
+        :param infected_fraction: Fraction of the individuals infected at the first timestep.
+        :param transmission_rate: Rate of transmission within a location (a susceptible individual is infected with
+            probability 1 - exp(-rate * infected / individuals) of their location).
+        :param recovery_probability: Probability an infected individual recovers between timesteps.
+        :param import_probability: Probability a susceptible individual is infected from outside the population.
+        :param birth_rate: Expected number of births per living individual per timestep.
+        :param death_rate: Probability an individual dies between timesteps.
+        :param infected_death_rate: Additional probability an infected individual dies between timesteps.
+        :param move_probability: Probability an individual moves location between timesteps.
+        :param start_month: Month of the first timestep (YYYY-MM).
+        :param seed: Seed for the random number generator.
+        """
+
+        # Preconditions
+        assert type(num_individuals) == int and num_individuals > 0
+        assert type(num_timesteps) == int and num_timesteps > 0
+        assert type(num_locations) == int and num_locations > 0
+        assert type(num_strains) == int and num_strains > 0
+        for probability in [infected_fraction, recovery_probability, import_probability, death_rate,
+                            infected_death_rate, move_probability]:
+            assert 0.0 <= probability <= 1.0
+        assert transmission_rate >= 0.0
+        assert birth_rate >= 0.0
+
+        self.num_individuals = num_individuals
+        self.num_timesteps = num_timesteps
+        self.num_locations = num_locations
+        self.num_strains = num_strains
+        self.infected_fraction = infected_fraction
+        self.transmission_rate = transmission_rate
+        self.recovery_probability = recovery_probability
+        self.import_probability = import_probability
+        self.birth_rate = birth_rate
+        self.death_rate = death_rate
+        self.infected_death_rate = infected_death_rate
+        self.move_probability = move_probability
+        self.start_month = np.datetime64(start_month, 'M')
+        self.seed = seed
+
+
+class Population(object):
+    """
+    State of a synthetic population, held as an array per attribute (rather than as rows) so that millions of
+    individuals can be simulated. The rows are only formatted as strings a chunk at a time when they are written.
+    """
+
+    def __init__(self, spec, rng):
+        """
+        Create the population of the first timestep.
+
+        :param spec: DatasetSpec.
+        :param rng: NumPy random number generator.
+        """
+
+        self.spec = spec
+        self.rng = rng
+
+        num_individuals = spec.num_individuals
+        month_start = spec.start_month.astype('datetime64[D]')
+        self.dob = month_start - rng.integers(0, 36500, num_individuals)
+        self.dod = np.full(num_individuals, np.datetime64('NaT'), dtype='datetime64[D]')
+        self.location = rng.integers(0, spec.num_locations, num_individuals).astype(np.int32)
+
+        infected = rng.random(num_individuals) < spec.infected_fraction
+        self.strain = np.where(infected, rng.integers(0, spec.num_strains, num_individuals),
+                               NOT_INFECTED).astype(np.int16)
+
+    @property
+    def size(self):
+        return self.location.shape[0]
+
+    def advance(self, month):
+        """
+        Advance the population by a timestep: deaths, migration, the spread of the strains and births.
+
+        :param month: Month of the new timestep (datetime64[M]).
+        """
+
+        spec = self.spec
+        rng = self.rng
+        day = month.astype('datetime64[D]')
+        alive = self.location != DEAD
+
+        # Deaths (more likely if infected)
+        death_probability = np.where(self.strain != NOT_INFECTED, spec.death_rate + spec.infected_death_rate,
+                                     spec.death_rate)
+        died = alive & (rng.random(self.size) < death_probability)
+        self.dod[died] = day + rng.integers(0, 28, int(np.sum(died)))
+        self.location[died] = DEAD
+        self.strain[died] = NOT_INFECTED
+        alive &= ~died
+
+        # Migration between locations
+        moved = alive & (rng.random(self.size) < spec.move_probability)
+        self.location[moved] = rng.integers(0, spec.num_locations, int(np.sum(moved)))
+
+        self._spread(alive)
+
+        # Births (in the location of a living individual)
+        alive_rows = np.flatnonzero(alive)
+        num_births = rng.poisson(spec.birth_rate * alive_rows.shape[0]) if alive_rows.shape[0] > 0 else 0
+        if num_births > 0:
+            self.dob = np.concatenate([self.dob, day + rng.integers(0, 28, num_births)])
+            self.dod = np.concatenate([self.dod, np.full(num_births, np.datetime64('NaT'), dtype='datetime64[D]')])
+            self.location = np.concatenate([self.location, self.location[rng.choice(alive_rows, num_births)]])
+            self.strain = np.concatenate([self.strain, np.full(num_births, NOT_INFECTED, dtype=np.int16)])
+
+    def _spread(self, alive):
+        """
+        Spread the strains within each location and let the infected individuals recover.
+
+        :param alive: Boolean array, True if the individual is alive.
+        """
+
+        spec = self.spec
+        rng = self.rng
+        infected = self.strain != NOT_INFECTED
+
+        # Number of living individuals and of the individuals infected with each strain in each location
+        locations = self.location[alive]
+        num_alive = np.bincount(locations, minlength=spec.num_locations)
+        infected_rows = np.flatnonzero(infected)
+        num_infected = np.bincount(self.location[infected_rows] * spec.num_strains + self.strain[infected_rows],
+                                   minlength=spec.num_locations * spec.num_strains).reshape(spec.num_locations,
+                                                                                           spec.num_strains)
+        cumulative_infected = np.cumsum(num_infected, axis=1)
+        total_infected = cumulative_infected[:, -1]
+
+        # Probability a susceptible individual in each location is infected
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pressure = np.where(num_alive > 0, spec.transmission_rate * total_infected / num_alive, 0.0)
+        p_infection = 1.0 - np.exp(-pressure)
+
+        # Recovery of the individuals infected at the previous timestep
+        recovered = infected & (rng.random(self.size) < spec.recovery_probability)
+        self.strain[recovered] = NOT_INFECTED
+
+        # Infections within the locations, with a strain chosen in proportion to the infected in the location
+        susceptible_rows = np.flatnonzero(alive & ~infected)
+        susceptible_locations = self.location[susceptible_rows]
+        new_rows = susceptible_rows[rng.random(susceptible_rows.shape[0]) < p_infection[susceptible_locations]]
+        new_locations = self.location[new_rows]
+        positions = rng.random(new_rows.shape[0]) * total_infected[new_locations]
+        self.strain[new_rows] = np.argmax(cumulative_infected[new_locations] > positions[:, None], axis=1)
+
+        # Infections from outside the population
+        imported = alive & (self.strain == NOT_INFECTED) & (rng.random(self.size) < spec.import_probability)
+        self.strain[imported] = rng.integers(0, spec.num_strains, int(np.sum(imported)))
+
+    def write_individuals(self, filepath):
+        """
+        Write the individuals file of the timestep (including the individuals who have died).
+
+        :param filepath: Location of the file.
+        """
+
+        # Name of each location (indexed by location, with the last name that of the dead)
+        location_names = np.append(np.char.mod("location-%d", np.arange(self.spec.num_locations)), "dead")
+
+        def rows(start, stop):
+            location = self.location[start:stop]
+            dod = self.dod[start:stop]
+            return [np.arange(start, stop),
+                    np.arange(start, stop),
+                    _format_dates(self.dob[start:stop]),
+                    np.where(np.isnat(dod), "None", _format_dates(dod)),
+                    location_names[location]]
+
+        _write_csv(filepath, INDIVIDUALS_FIELDS, INDIVIDUALS_ROW_FORMAT, self.size, rows)
+
+    def write_infections(self, filepath):
+        """
+        Write the infections file of the timestep (the infection state of each living individual).
+
+        :param filepath: Location of the file.
+        """
+
+        alive_rows = np.flatnonzero(self.location != DEAD)
+
+        # Name of each strain (indexed by strain, with the last name that of no infection)
+        strain_names = np.append(np.char.mod("strain-%d", np.arange(self.spec.num_strains)), "None")
+
+        def rows(start, stop):
+            chunk_rows = alive_rows[start:stop]
+            return [chunk_rows, strain_names[self.strain[chunk_rows]]]
+
+        _write_csv(filepath, INFECTIONS_FIELDS, INFECTIONS_ROW_FORMAT, alive_rows.shape[0], rows)
+
+
+def generate_dataset(folder, spec):
+    """
+    Generate a synthetic data set: an individuals and an infections file per timestep, the timestep names and a
+    config that refers to them.
+
+    :param folder: Folder in which to write the data set (created if it doesn't exist).
+    :param spec: DatasetSpec.
+    :return: Location of the config of the data set.
+    """
+
+    rng = np.random.default_rng(spec.seed)
+    individuals_folder = os.path.join(folder, "individuals")
+    infections_folder = os.path.join(folder, "infections")
+    os.makedirs(individuals_folder, exist_ok=True)
+    os.makedirs(infections_folder, exist_ok=True)
+
+    module_logger.info("Generating %d timesteps of %d individuals in folder: %s" %
+                       (spec.num_timesteps, spec.num_individuals, folder))
+
+    population = Population(spec, rng)
+    for timestep in range(spec.num_timesteps):
+        if timestep > 0:
+            population.advance(spec.start_month + timestep)
+
+        population.write_individuals(os.path.join(individuals_folder, "individual_%04d.csv" % timestep))
+        population.write_infections(os.path.join(infections_folder, "infection_%04d.csv" % timestep))
+
+        module_logger.info("Generated timestep %d: %d individuals, %d alive, %d infected" %
+                           (timestep, population.size, np.count_nonzero(population.location != DEAD),
+                            np.count_nonzero(population.strain != NOT_INFECTED)))
+
+    return write_config(folder, spec.num_timesteps, spec.start_month)
+
+
+def write_config(folder, num_timesteps, start_month=np.datetime64('2019-03')):
+    """
+    Write the timestep names and the config of a data set.
+
+    :param folder: Folder of the data set.
+    :param num_timesteps: Number of timesteps.
+    :param start_month: Month of the first timestep (datetime64[M]).
+    :return: Location of the config.
+    """
+
+    # Each timestep is named after its month (e.g. March 2019)
+    months = start_month + np.arange(num_timesteps)
+    names = np.array([month.astype(datetime.date).strftime("%B %Y") for month in months])
+
+    timestep_names_path = os.path.join(folder, "timestep_names.csv")
+    _write_csv(timestep_names_path, ['timestep', 'name'], "%d,%s\n", num_timesteps,
+               lambda start, stop: [np.arange(start, stop), names[start:stop]])
+
+    config = {
+        "paths": {
+            "individuals": os.path.join(folder, "individuals"),
+            "infections": os.path.join(folder, "infections"),
+            "timestep_names": timestep_names_path
+        },
+        "individuals": {
+            "dob": {"type": "date"},
+            "dod": {"type": "date"}
+        }
+    }
+
+    config_path = os.path.join(folder, "config.json")
+    with open(config_path, 'w') as fp:
+        json.dump(config, fp, indent=2)
+
+    return config_path
+
+
+def _format_dates(dates):
+    """
+    Format dates as DD/MM/YYYY strings (each distinct date is formatted once).
+
+    :param dates: datetime64[D] array.
+    :return: Array of strings.
+    """
+
+    dates, inverse = np.unique(dates, return_inverse=True)
+
+    months = dates.astype('datetime64[M]')
+    day = (dates - months.astype('datetime64[D]')).astype(np.int64) + 1
+    month = months.astype(np.int64) % 12 + 1
+    year = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+
+    formatted = np.char.zfill(day.astype(str), 2)
+    for separator, part in [('/', np.char.zfill(month.astype(str), 2)), ('/', year.astype(str))]:
+        formatted = np.char.add(np.char.add(formatted, separator), part)
+    return formatted[inverse]
+
+
+def _write_csv(filepath, field_names, row_format, num_rows, rows):
+    """
+    Write a CSV file, formatting a chunk of rows at a time (so only a chunk of the rows is held as strings).
+
+    :param filepath: Location of the file.
+    :param field_names: Names of the fields.
+    :param row_format: %-format of a row (including the newline).
+    :param num_rows: Number of rows.
+    :param rows: Function taking the first row and the row after the last row of a chunk and returning a list of
+        arrays (one per field).
+    """
+
+    with open(filepath, 'w', encoding='utf-8') as fp:
+        fp.write(",".join(field_names) + "\n")
+        for start in range(0, num_rows, CHUNK_SIZE):
+            chunk = [column.tolist() for column in rows(start, min(start + CHUNK_SIZE, num_rows))]
+            fp.write("".join(map(row_format.__mod__, zip(*chunk))))
+
+
+if __name__ == '__main__':
+
+    # Configure the logging of every module once
+    logger.configure_logging()
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic data set")
+    parser.add_argument('folder', help="Folder in which to write the data set")
+    parser.add_argument('--individuals', type=int, default=1000, help="Number of individuals at the first timestep")
+    parser.add_argument('--timesteps', type=int, default=12, help="Number of timesteps")
+    parser.add_argument('--locations', type=int, default=100, help="Number of locations")
+    parser.add_argument('--strains', type=int, default=3, help="Number of infection strains")
+    parser.add_argument('--seed', type=int, help="Seed for the random number generator")
+    args = parser.parse_args()
+
+    print(generate_dataset(args.folder, DatasetSpec(args.individuals, args.timesteps, num_locations=args.locations,
+                                                    num_strains=args.strains, seed=args.seed)))
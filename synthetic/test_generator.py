@@ -0,0 +1,45 @@
+import json
+import os
+
+import numpy as np
+
+from etl.loader import TimestepLoader
+from synthetic.generator import DatasetSpec, generate_dataset
+
+
+def test_generate_dataset(tmp_path):
+    config_path = generate_dataset(str(tmp_path), DatasetSpec(50, 3, num_locations=5, seed=1))
+
+    with open(config_path) as fp:
+        config = json.load(fp)
+    assert os.path.isfile(config["paths"]["timestep_names"])
+
+    loader = TimestepLoader(config["paths"]["individuals"], config["paths"]["infections"], ",", "\"", "utf-8",
+                            max_workers=1)
+    assert loader.timesteps == [0, 1, 2]
+
+    data = next(loader.load([0]))
+    assert len(data.individuals["id"]) == 50
+    assert set(data.individuals["location"]) <= {"location-%d" % i for i in range(5)}
+    assert np.array_equal(data.individuals["id"], data.infections["individual_id"])
+
+
+def test_generate_dataset_deaths(tmp_path):
+    spec = DatasetSpec(200, 4, num_locations=3, death_rate=0.2, birth_rate=0.1, seed=2)
+    config_path = generate_dataset(str(tmp_path), spec)
+
+    with open(config_path) as fp:
+        config = json.load(fp)
+
+    loader = TimestepLoader(config["paths"]["individuals"], config["paths"]["infections"], ",", "\"", "utf-8",
+                            max_workers=1)
+    data = list(loader.load())[-1]
+
+    # Individuals who have died have a date of death and are in the dead location
+    dead = data.individuals["location"] == "dead"
+    assert np.any(dead)
+    assert np.all((data.individuals["dod"] != "None") == dead)
+
+    # Births add individuals and only the living individuals are in the infections file
+    assert len(data.individuals["id"]) > 200
+    assert np.array_equal(data.individuals["id"][~dead], data.infections["individual_id"])